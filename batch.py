@@ -0,0 +1,188 @@
+# Solving many CNF files in one run (see `solver.py --batch`).
+#
+# The files are named by paths, which can be
+#
+#   - CNF files,
+#   - directories, which stand for every `*.cnf` file below them,
+#   - glob patterns (`**` matches any number of directories), or
+#   - manifests, written `@file`: a text file listing one path per line (blank
+#     lines and lines starting with `#` are skipped), relative to the manifest.
+#
+# Up to `jobs` files are solved at once, each in its own process forked from
+# this one, so no file pays for starting the interpreter and importing the
+# solver, a file that runs out of time can be killed on its own, and one file's
+# memory is returned before the next starts. Results are yielded in the order
+# the files finish, one dict per file:
+#
+#     {"file": "a.cnf", "status": "sat", "time": 0.01, "model": [1, -2, 3],
+#      "stats": {"decisions": 2, ...}}
+#
+# where status is 'sat', 'unsat', 'unknown' (when the configuration's limits
+# ran out, with a "reason"), 'timeout' or 'error' (with an "error" message).
+# With a proof directory, each UNSAT file also gets a DRAT or LRAT proof there,
+# named after the file, and its path is the result's "proof".
+# With `cache`, files are loaded through their binary caches (see cnfcache.py,
+# which needs NumPy and is only imported then).
+
+import glob
+import multiprocessing
+import os
+import time
+from dataclasses import replace
+from multiprocessing.connection import wait
+from typing import Callable, Dict, Iterator, List, Optional
+from config import Config
+from dimacs import DimacsError, load
+from dpll import solve
+from limits import UNKNOWNResult
+from propagation import Propagator
+from stats import COUNTERS
+
+# Every file named by `paths`, in order and without duplicates
+def expand(paths: List[str]) -> List[str]:
+    files: Dict[str, None] = {}
+    for path in paths:
+        if path.startswith('@'):
+            manifest = path[1:]
+            base = os.path.dirname(manifest)
+            with open(manifest) as f:
+                lines = [ line.strip() for line in f ]
+            entries = [ os.path.join(base, line) for line in lines
+                        if line and not line.startswith('#') ]
+            files.update(dict.fromkeys(expand(entries)))
+        elif os.path.isdir(path):
+            found = glob.glob(os.path.join(glob.escape(path), '**', '*.cnf'), recursive=True)
+            files.update(dict.fromkeys(sorted(found)))
+        elif glob.has_magic(path):
+            files.update(dict.fromkeys(sorted(glob.glob(path, recursive=True))))
+        else:
+            files[path] = None
+    return list(files)
+
+# The proof file for each input in `proof_dir`, named after the input (with a
+# number added when two inputs have the same name)
+def proof_paths(files: List[str], proof_dir: str, config: Config) -> Dict[str, str]:
+    extension = config.proof_format + ('.bin' if config.binary_proof else '')
+    paths: Dict[str, str] = {}
+    taken = set()
+    for file in files:
+        stem = os.path.basename(file)
+        if stem.endswith('.cnf'):
+            stem = stem[:-len('.cnf')]
+        name, n = f'{stem}.{extension}', 1
+        while name in taken:
+            n += 1
+            name = f'{stem}-{n}.{extension}'
+        taken.add(name)
+        paths[file] = os.path.join(proof_dir, name)
+    return paths
+
+# The statistics as a JSON-able dict
+def stats_record(stats) -> Dict[str, object]:
+    record: Dict[str, object] = { name: getattr(stats, name) for name in COUNTERS }
+    if stats.times:
+        record['times'] = dict(stats.times)
+    return record
+
+# A result as a JSON-able dict (see above), without the file and time
+def result_record(result, config: Config) -> Dict[str, object]:
+    record: Dict[str, object]
+    if isinstance(result, UNKNOWNResult):
+        record = { 'status': 'unknown', 'reason': result.reason }
+    else:
+        record = { 'status': 'sat' if result.sat() else 'unsat' }
+    if result.sat():
+        record['model'] = [ v if value else -v for v, value in sorted(result.assignments.items()) ]
+    elif config.proof_file is not None and record['status'] == 'unsat':
+        record['proof'] = config.proof_file
+    record['stats'] = stats_record(result.stats)
+    return record
+
+# Load one file with `loader`, solve it and send its result through
+# `connection`
+def _solve_file(path: str, config: Config, loader: Callable[[str], Propagator],
+                connection) -> None:
+    try:
+        start = time.perf_counter()
+        result = solve(loader(path), config)
+        elapsed = time.perf_counter() - start
+        record = result_record(result, config)
+        record['time'] = elapsed
+    except (DimacsError, OSError, ValueError) as e:
+        record = { 'status': 'error', 'error': str(e) }
+    except Exception as e:
+        record = { 'status': 'error', 'error': repr(e) }
+    connection.send(record)
+    connection.close()
+
+# Solve every file, `jobs` at a time, yielding each result as soon as it is
+# ready. A file that takes more than `timeout` seconds is killed.
+def solve_files(files: List[str], config: Optional[Config] = None, jobs: int = 1,
+                timeout: Optional[float] = None,
+                proof_dir: Optional[str] = None,
+                cache: bool = False) -> Iterator[Dict[str, object]]:
+    config = config or Config()
+    if jobs < 1:
+        raise ValueError('Batch solving needs at least one job')
+    proofs: Dict[str, str] = {}
+    if proof_dir is not None:
+        os.makedirs(proof_dir, exist_ok=True)
+        proofs = proof_paths(files, proof_dir, config)
+
+    loader: Callable[[str], Propagator] = load
+    if cache:
+        # Imported here, before forking, so that each file does not import it
+        # (and NumPy) again
+        from cnfcache import load_cached
+        loader = load_cached
+    context = multiprocessing.get_context()
+    pending = list(reversed(files))
+    # The running processes, by the end of their result pipe
+    running: Dict[object, tuple] = {}
+    try:
+        while pending or running:
+            while pending and len(running) < jobs:
+                file = pending.pop()
+                file_config = config
+                if file in proofs:
+                    file_config = replace(config, proof_file=proofs[file])
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=_solve_file,
+                                          args=(file, file_config, loader, sender),
+                                          daemon=True)
+                process.start()
+                sender.close()
+                running[receiver] = (file, process, time.monotonic())
+
+            wait_for = None
+            if timeout is not None:
+                first = min(started for _, _, started in running.values())
+                wait_for = max(0.0, first + timeout - time.monotonic())
+            ready = wait(list(running), wait_for)
+
+            now = time.monotonic()
+            for receiver in list(running):
+                file, process, started = running[receiver]
+                if receiver in ready:
+                    try:
+                        record = receiver.recv()
+                    except EOFError:
+                        record = { 'status': 'error', 'error': 'the solver process died' }
+                elif timeout is not None and now - started >= timeout:
+                    record = { 'status': 'timeout', 'time': timeout }
+                else:
+                    continue
+                del running[receiver]
+                process.terminate()
+                process.join()
+                receiver.close()
+                if record['status'] != 'unsat' and file in proofs:
+                    # Only refutations have proofs worth keeping
+                    if os.path.exists(proofs[file]):
+                        os.remove(proofs[file])
+                yield { 'file': file, **record }
+    finally:
+        for receiver, (_, process, _) in running.items():
+            process.terminate()
+            process.join()
+            receiver.close()
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from batch import expand, proof_paths, solve_files
+from config import Config
+from drat_test import check_drat
+from generators import pigeonhole, write_dimacs
+
+SAT = [ [1, 2], [-1, 2], [-2, 3] ]
+SOLVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver.py')
+
+@pytest.fixture
+def inputs(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    write_dimacs(SAT, str(tmp_path / 'sat.cnf'))
+    write_dimacs(pigeonhole(3), str(tmp_path / 'sub' / 'php.cnf'))
+    write_dimacs(pigeonhole(2), str(tmp_path / 'php.cnf'))
+    (tmp_path / 'notes.txt').write_text('not a formula')
+    return tmp_path
+
+def test_expand(inputs):
+    root = str(inputs)
+    (inputs / 'list').write_text('# a manifest\n\nsat.cnf\nsub/php.cnf\n')
+    assert expand([ root ]) == [ f'{root}/php.cnf', f'{root}/sat.cnf', f'{root}/sub/php.cnf' ]
+    assert expand([ f'{root}/**/php.cnf' ]) == [ f'{root}/php.cnf', f'{root}/sub/php.cnf' ]
+    # Files named twice are solved once
+    assert expand([ f'@{root}/list', f'{root}/sat.cnf', 'other.cnf' ]) == \
+        [ f'{root}/sat.cnf', f'{root}/sub/php.cnf', 'other.cnf' ]
+
+def test_proof_paths():
+    paths = proof_paths([ 'a/x.cnf', 'b/x.cnf', 'y' ], 'proofs', Config(proof_format='lrat'))
+    assert paths == { 'a/x.cnf': 'proofs/x.lrat', 'b/x.cnf': 'proofs/x-2.lrat',
+                      'y': 'proofs/y.lrat' }
+
+def test_solve_files(inputs):
+    files = expand([ str(inputs) ]) + [ str(inputs / 'notes.txt'), str(inputs / 'missing.cnf') ]
+    proof_dir = str(inputs / 'proofs')
+    records = list(solve_files(files, Config(learn=True), jobs=2, proof_dir=proof_dir))
+    by_file = { os.path.relpath(r['file'], inputs): r for r in records }
+    assert sorted(by_file) == sorted(os.path.relpath(f, inputs) for f in files)
+
+    sat = by_file['sat.cnf']
+    assert sat['status'] == 'sat'
+    assert all(any(l in sat['model'] for l in clause) for clause in SAT)
+    assert 'proof' not in sat and sat['stats']['decisions'] >= 0
+
+    for name, holes in [ ('php.cnf', 2), ('sub/php.cnf', 3) ]:
+        record = by_file[name]
+        assert record['status'] == 'unsat' and record['stats']['conflicts'] > 0
+        check_drat(pigeonhole(holes), record['proof'])
+    assert by_file['notes.txt']['status'] == by_file['missing.cnf']['status'] == 'error'
+    # Only the UNSAT files keep a proof
+    assert sorted(os.listdir(proof_dir)) == [ 'php-2.drat', 'php.drat' ]
+
+def test_timeout(tmp_path):
+    write_dimacs(pigeonhole(10), str(tmp_path / 'hard.cnf'))
+    write_dimacs(SAT, str(tmp_path / 'easy.cnf'))
+    records = list(solve_files([ str(tmp_path / 'hard.cnf'), str(tmp_path / 'easy.cnf') ],
+                               jobs=2, timeout=0.5))
+    # The easy file finishes first, and the hard one is killed
+    assert [ r['status'] for r in records ] == [ 'sat', 'timeout' ]
+
+def test_command_line(inputs):
+    output = subprocess.run([ sys.executable, SOLVER, '--batch', '--jobs', '2',
+                              str(inputs / '*.cnf') ],
+                            capture_output=True, text=True, check=True).stdout
+    records = [ json.loads(line) for line in output.splitlines() ]
+    assert sorted((os.path.basename(r['file']), r['status']) for r in records) == \
+        [ ('php.cnf', 'unsat'), ('sat.cnf', 'sat') ]
+
+    usage = subprocess.run([ sys.executable, SOLVER, 'a.cnf', 'b.cnf' ],
+                           capture_output=True, text=True)
+    assert usage.returncode == 2 and 'requires --batch' in usage.stderr
@@ -0,0 +1,262 @@
+# A reproducible benchmark suite for the solver.
+#
+# A suite is a list of `Benchmark`s: a generator from `generators.py` with its
+# parameters (including the seed), so every run solves exactly the same
+# formulas. `run` solves each one the way `dpll` does, in a fresh process
+# (so that one benchmark's memory use cannot leak into the next, and a
+# benchmark that exceeds the timeout can be killed), and records
+#
+#   - the result ('sat', 'unsat', 'unknown' when the config's limits stopped
+#     the solver, 'timeout' or 'error')
+#   - the wall time, including loading the formula into the propagator
+#   - the solver's counters (see `stats.py`)
+#   - how far the peak resident memory rose above what the process started
+#     with, in KiB. A forked process starts out with its parent's pages, so
+#     the peak alone would mostly measure the parent; the rise can be 0 for a
+#     small benchmark that fits in memory the parent had already freed.
+#
+# `compare` matches two runs by benchmark name and flags regressions: a metric
+# that grew by more than a threshold (wall times also need to grow by more than
+# a noise floor), a benchmark that no longer finishes, or a changed answer.
+# Only 'sat' and 'unsat' are answers: an 'unknown' result is treated like a
+# timeout, and its metrics are not compared.
+#
+# From the command line:
+#
+#     python3 bench.py run --suite default --learn -o new.json
+#     python3 bench.py compare old.json new.json
+#
+# `compare` exits with status 1 if it found any regression.
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass, field, fields, is_dataclass
+from typing import Dict, List, Optional
+from config import Config
+from dpll import solve
+from generators import coloring, parity, pigeonhole, random_ksat, to_clauses, Formula
+from heuristics import HEURISTICS
+from limits import UNKNOWNResult
+from propagation import Propagator
+from restarts import RESTARTS
+from stats import COUNTERS
+
+FAMILIES = {
+    'ksat': random_ksat,
+    'pigeonhole': pigeonhole,
+    'coloring': coloring,
+    'parity': parity,
+}
+
+@dataclass(frozen=True)
+class Benchmark:
+    family: str
+    params: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return '-'.join([ self.family ] + [ f'{k}={v}' for k, v in sorted(self.params.items()) ])
+
+    def formula(self) -> Formula:
+        return FAMILIES[self.family](**self.params)
+
+def _suite(ksat, holes, coloring_sizes, parity_sizes, seeds) -> List[Benchmark]:
+    return ([ Benchmark('ksat', { 'num_vars': n, 'seed': s }) for n in ksat for s in seeds ] +
+            [ Benchmark('pigeonhole', { 'holes': n }) for n in holes ] +
+            [ Benchmark('coloring', { 'num_vertices': n, 'seed': s })
+              for n in coloring_sizes for s in seeds ] +
+            [ Benchmark('parity', { 'num_vars': n, 'seed': s })
+              for n in parity_sizes for s in seeds ])
+
+SUITES = {
+    # A second or so, for checking that nothing is broken
+    'quick': _suite([ 20, 30 ], [ 4 ], [ 10 ], [ 6 ], [ 0 ]),
+    # About a minute with clause learning
+    'default': _suite([ 75, 100, 125 ], [ 6, 7, 8 ], [ 50, 100, 150 ], [ 12, 14, 16 ], [ 0, 1, 2 ]),
+}
+
+# Seconds a benchmark may run before it is killed
+TIMEOUT = 60.0
+
+# Solve one benchmark and send its measurements through `connection`
+def _measure(benchmark: Benchmark, config: Config, connection) -> None:
+    try:
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        clauses = to_clauses(benchmark.formula())
+        start = time.perf_counter()
+        result = solve(Propagator(clauses), config)
+        wall = time.perf_counter() - start
+        if isinstance(result, UNKNOWNResult):
+            answer = 'unknown'
+        else:
+            answer = 'sat' if result.sat() else 'unsat'
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        record = { 'result': answer, 'wall': wall, 'peak_memory_kb': peak - baseline }
+        record.update((name, getattr(result.stats, name)) for name in COUNTERS)
+        connection.send(record)
+    except Exception as e:
+        connection.send({ 'result': 'error', 'error': repr(e) })
+    finally:
+        connection.close()
+
+def run_benchmark(benchmark: Benchmark, config: Optional[Config] = None,
+                  timeout: float = TIMEOUT) -> Dict[str, object]:
+    config = config or Config()
+    context = multiprocessing.get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure, args=(benchmark, config, sender), daemon=True)
+    process.start()
+    sender.close()
+
+    record: Dict[str, object] = { 'name': benchmark.name, 'family': benchmark.family,
+                                  'params': dict(benchmark.params) }
+    if receiver.poll(timeout):
+        try:
+            record.update(receiver.recv())
+        except EOFError:
+            record.update(result='error', error='the benchmark process died')
+    else:
+        record.update(result='timeout', wall=timeout)
+    process.terminate()
+    process.join()
+    receiver.close()
+    return record
+
+# The options of `config` that can be written to JSON. A cancel token or a
+# progress callback only matters to the process that ran the benchmarks.
+def _config_record(config: Config) -> Dict[str, object]:
+    record: Dict[str, object] = {}
+    for option in fields(config):
+        if option.name in ('cancel', 'progress'):
+            continue
+        value = getattr(config, option.name)
+        record[option.name] = asdict(value) if is_dataclass(value) else value
+    return record
+
+def run(benchmarks: List[Benchmark], config: Optional[Config] = None,
+        timeout: float = TIMEOUT, suite: str = 'custom', verbose: bool = False) -> Dict[str, object]:
+    config = config or Config()
+    options = _config_record(config)
+    results = []
+    for benchmark in benchmarks:
+        record = run_benchmark(benchmark, config, timeout)
+        if verbose:
+            print(f"{record['name']:<40} {record['result']:<8} {record.get('wall', 0):8.3f}s",
+                  file=sys.stderr)
+        results.append(record)
+    return {
+        'suite': suite,
+        'config': options,
+        'python': platform.python_version(),
+        'timeout': timeout,
+        'results': results,
+    }
+
+# The metrics that `compare` checks, all of which are better when lower
+METRICS = ('wall', 'decisions', 'propagations', 'conflicts', 'peak_memory_kb')
+
+@dataclass(frozen=True)
+class Change:
+    name: str
+    # 'regression', 'improvement' or 'mismatch' (a different answer, which is
+    # always a bug)
+    kind: str
+    metric: str
+    old: object
+    new: object
+
+    def __str__(self) -> str:
+        if isinstance(self.old, (int, float)) and isinstance(self.new, (int, float)) and self.old:
+            delta = f' ({(self.new - self.old) / self.old:+.1%})'
+        else:
+            delta = ''
+        return f'{self.kind:<11} {self.name:<40} {self.metric:<15} {self.old} -> {self.new}{delta}'
+
+# Compare the benchmarks two runs have in common. A metric changes when it
+# differs by more than `threshold` (relative); wall times must also differ by
+# more than `min_time` seconds.
+def compare(old: Dict[str, object], new: Dict[str, object], threshold: float = 0.2,
+            min_time: float = 0.05) -> List[Change]:
+    before = { record['name']: record for record in old['results'] }
+    changes: List[Change] = []
+    for record in new['results']:
+        name = record['name']
+        if name not in before:
+            continue
+        previous = before[name]
+        answers = { previous['result'], record['result'] }
+        if answers == { 'sat', 'unsat' }:
+            changes.append(Change(name, 'mismatch', 'result', previous['result'], record['result']))
+            continue
+        if previous['result'] != record['result']:
+            # A benchmark that started or stopped timing out, hitting its
+            # limits or failing
+            finished = previous['result'] in ('sat', 'unsat')
+            changes.append(Change(name, 'regression' if finished else 'improvement', 'result',
+                                  previous['result'], record['result']))
+            continue
+        if record['result'] not in ('sat', 'unsat'):
+            continue
+
+        for metric in METRICS:
+            a, b = previous.get(metric), record.get(metric)
+            if a is None or b is None or a == b:
+                continue
+            if metric == 'wall' and abs(b - a) <= min_time:
+                continue
+            if b > a * (1 + threshold):
+                changes.append(Change(name, 'regression', metric, a, b))
+            elif a > b * (1 + threshold):
+                changes.append(Change(name, 'improvement', metric, a, b))
+    return changes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run a benchmark suite')
+    run_parser.add_argument('--suite', choices=sorted(SUITES), default='default')
+    run_parser.add_argument('-o', '--output', help='write the results to this JSON file',
+                            metavar='FILE')
+    run_parser.add_argument('--timeout', type=float, default=TIMEOUT,
+                            help='seconds before a benchmark is killed')
+    run_parser.add_argument('-l', '--learn', help='use conflict-driven clause learning',
+                            action='store_true')
+    run_parser.add_argument('--heuristic', choices=sorted(HEURISTICS), default='first')
+    run_parser.add_argument('--restart', choices=sorted(RESTARTS), default='none')
+    run_parser.add_argument('--seed', type=int, help="seed for the heuristic's initial order")
+
+    compare_parser = commands.add_parser('compare', help='compare two runs')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help='the relative change that counts (default 0.2)')
+    compare_parser.add_argument('--min-time', type=float, default=0.05,
+                                help='the smallest wall time change that counts, in seconds')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        config = Config(learn=args.learn, heuristic=args.heuristic, restart=args.restart,
+                        seed=args.seed)
+        report = run(SUITES[args.suite], config, args.timeout, args.suite, verbose=True)
+        text = json.dumps(report, indent=2)
+        if args.output is None:
+            print(text)
+        else:
+            with open(args.output, 'w') as f:
+                f.write(text + '\n')
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        changes = compare(old, new, args.threshold, args.min_time)
+        for change in changes:
+            print(change)
+        if any(change.kind != 'improvement' for change in changes):
+            sys.exit(1)
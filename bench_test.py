@@ -0,0 +1,78 @@
+import json
+from bench import SUITES, Benchmark, compare, run, run_benchmark
+from config import Config
+from limits import CancelToken, Limits
+
+def test_names_are_unique():
+    for suite in SUITES.values():
+        names = [ b.name for b in suite ]
+        assert len(set(names)) == len(names)
+    assert Benchmark('ksat', { 'seed': 1, 'num_vars': 20 }).name == 'ksat-num_vars=20-seed=1'
+
+def test_run():
+    benchmarks = [ Benchmark('pigeonhole', { 'holes': 3 }),
+                   Benchmark('parity', { 'num_vars': 6, 'satisfiable': True }),
+                   Benchmark('pigeonhole', { 'holes': 6 }) ]
+    report = run(benchmarks, Config(learn=True), suite='test')
+    # The report survives a trip through JSON
+    report = json.loads(json.dumps(report))
+    assert report['config']['learn']
+    php, xor, bigger = report['results']
+    assert php['name'] == 'pigeonhole-holes=3'
+    assert php['result'] == 'unsat' and xor['result'] == 'sat'
+    for record in report['results']:
+        assert record['wall'] > 0
+        assert record['decisions'] > 0 and record['propagations'] > 0
+        assert record['peak_memory_kb'] >= 0
+    assert php['conflicts'] > 0
+    # The memory is the benchmark's own: the smallest ones may fit in what
+    # the process already had, but not a few thousand learned clauses
+    assert bigger['peak_memory_kb'] > 0
+
+def test_run_records_json_safe_config():
+    calls = []
+    config = Config(learn=True, limits=Limits(conflicts=10000), cancel=CancelToken(),
+                    progress=calls.append)
+    report = run([ Benchmark('pigeonhole', { 'holes': 3 }) ], config)
+    report = json.loads(json.dumps(report))
+    assert report['results'][0]['result'] == 'unsat'
+    assert report['config']['limits']['conflicts'] == 10000
+    assert 'cancel' not in report['config'] and 'progress' not in report['config']
+
+def test_timeout():
+    record = run_benchmark(Benchmark('pigeonhole', { 'holes': 10 }), timeout=0.2)
+    assert record['result'] == 'timeout'
+
+def test_unknown():
+    benchmark = Benchmark('pigeonhole', { 'holes': 8 })
+    record = run_benchmark(benchmark, Config(learn=True, limits=Limits(conflicts=10)))
+    assert record['result'] == 'unknown' and record['conflicts'] == 10
+
+def test_error():
+    record = run_benchmark(Benchmark('pigeonhole', { 'pigeons': 3 }))
+    assert record['result'] == 'error' and 'pigeons' in record['error']
+
+def report(*records):
+    return { 'results': [ dict(name=name, result=result, wall=wall, decisions=decisions)
+                          for name, result, wall, decisions in records ] }
+
+def test_compare():
+    old = report(('a', 'sat', 1.0, 100), ('b', 'unsat', 1.0, 100), ('c', 'sat', 0.01, 100),
+                 ('d', 'unsat', 2.0, 100), ('e', 'sat', 1.0, 100), ('f', 'timeout', 60, None),
+                 ('h', 'unknown', 1.0, 100), ('i', 'unsat', 1.0, 100))
+    new = report(('a', 'sat', 1.1, 100), ('b', 'unsat', 2.0, 90), ('c', 'sat', 0.03, 100),
+                 ('d', 'timeout', 60, None), ('e', 'unsat', 1.0, 100), ('f', 'sat', 1.0, 5),
+                 ('g', 'sat', 1.0, 100), ('h', 'unknown', 3.0, 300), ('i', 'unknown', 1.0, 50))
+    changes = { (c.name, c.metric): c.kind for c in compare(old, new) }
+    # Within the threshold ('a'), below the noise floor ('c'), only in one run
+    # ('g') and stopped by the limits both times ('h') are not changes
+    assert changes == {
+        ('b', 'wall'): 'regression',
+        ('d', 'result'): 'regression',
+        ('e', 'result'): 'mismatch',
+        ('f', 'result'): 'improvement',
+        ('i', 'result'): 'regression',
+    }
+    changes = { (c.name, c.metric): c.kind for c in compare(old, new, threshold=0.05) }
+    assert changes[('a', 'wall')] == 'regression'
+    assert changes[('b', 'decisions')] == 'improvement'
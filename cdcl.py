@@ -0,0 +1,130 @@
+# Conflict analysis for conflict-driven clause learning (CDCL).
+#
+# When propagation falsifies a clause, `analyze` walks the trail backwards and
+# resolves the conflicting clause with the reasons of the literals assigned at
+# the current decision level, until a single literal of that level is left (the
+# first unique implication point, or "UIP"). The result is a learned clause
+# that is implied by the formula, and that becomes unit as soon as the solver
+# backjumps to the second-highest decision level among its literals.
+#
+# Every resolution step is recorded as a `ResolvedClause`, so the learned
+# clause comes with a proof tree whose leaves are clauses of the formula (or
+# earlier learned clauses). Literals that are false at level 0 are resolved
+# away with their unit proofs, and decisions stay in the learned clause as
+# literals, so a proof of the empty clause is a complete resolution proof of
+# the formula as the propagator was given it.
+#
+# That includes any units added as `Assumption`s: cube-and-conquer (see
+# `cube.py`) adds a cube's literals this way, so the lemmas learned while
+# solving a cube, and its final refutation, can have `Assumption` leaves. They
+# are only sound under that cube, which is why each cube is solved by a fresh
+# propagator and nothing it learns is shared with other cubes; the refutation
+# is returned with its assumptions, which are taken out with
+# `remove_assumption` as the cubes are merged.
+#
+# While the propagator is logging to a proof file, no proof trees are built.
+# For LRAT, the clauses that were resolved are instead returned as hints: the
+# learned clause follows from them by unit propagation, in the order given.
+
+from typing import List, Optional, Set, Tuple
+from defns import *
+from encoding import decode
+from proof import resolved
+from propagation import Propagator
+
+# The literal block distance of a clause: how many different decision levels
+# its literals were assigned at. Clauses with a low LBD ("glue" clauses) tend
+# to be the most useful ones to learn.
+def lbd(propagator: Propagator, lits) -> int:
+    levels = propagator.levels
+    return len({ levels[lit >> 1] for lit in lits })
+
+# Resolve `proof` (whose literals are `lits`) with the clause `other` on the
+# variable of `pivot`, updating `lits` in place.
+def _resolve(proof: Clause, lits: Set[int], other: Clause,
+             other_lits, pivot: int) -> ResolvedClause:
+    lits.discard(pivot)
+    lits.discard(pivot ^ 1)
+    lits.update(l for l in other_lits if l >> 1 != pivot >> 1)
+    return resolved(map(decode, lits), proof, other)
+
+# Analyze a conflict at the current (non-zero) decision level. Returns the
+# learned clause, with the asserting literal first and a literal of the
+# backjump level second, the level to backjump to, the clause's proof (None
+# while logging), its LRAT hints, the variables that took part in the conflict,
+# and the refs of the clauses it was derived from: the conflicting clause and
+# the reasons it was resolved with, in reverse trail order.
+def analyze(propagator: Propagator, conflict: int) \
+        -> Tuple[List[int], int, Optional[Clause], List[int], Set[int], List[int]]:
+    arena, levels, reasons = propagator.arena, propagator.levels, propagator.reasons
+    trail = propagator.trail
+    current = propagator.decision_level()
+    log = propagator.log
+    lrat = log is not None and log.lrat
+    # The conflicting clause and the reasons resolved with it
+    antecedents: List[int] = [ conflict ]
+
+    seen: Set[int] = set()
+    learnt: List[int] = [ 0 ]
+    fixed: List[int] = []
+    # Literals at the current level that have not been resolved away yet
+    pending = 0
+    # Reasons resolved with so far
+    steps = 0
+
+    proof = propagator.clause_proof(conflict) if log is None else None
+    lits = set(arena.literals(conflict))
+    reason_lits = arena.literals(conflict)
+    index = len(trail) - 1
+    while True:
+        for lit in reason_lits:
+            variable = lit >> 1
+            if variable in seen:
+                continue
+            seen.add(variable)
+            if levels[variable] == current:
+                pending += 1
+            elif levels[variable] > 0:
+                learnt.append(lit)
+            else:
+                fixed.append(lit)
+
+        # Find the next literal of the current level to resolve on
+        while trail[index] >> 1 not in seen:
+            index -= 1
+        uip = trail[index]
+        index -= 1
+        pending -= 1
+        if pending == 0:
+            break
+
+        reason = reasons[uip >> 1]
+        steps += 1
+        antecedents.append(reason)
+        reason_lits = [ lit for lit in arena.literals(reason) if lit != uip ]
+        if log is None:
+            proof = _resolve(proof, lits, propagator.clause_proof(reason),
+                             reason_lits, uip)
+
+    learnt[0] = uip ^ 1
+    propagator.stats.resolutions += steps + len(fixed)
+
+    hints: List[int] = []
+    if log is None:
+        # Resolve away the literals that are false at level 0
+        for lit in fixed:
+            proof = _resolve(proof, lits, propagator.unit_proof(lit >> 1), (), lit)
+    elif lrat:
+        hints = propagator.fixed_hints(lit >> 1 for lit in fixed)
+        # The resolved reasons, then the conflicting clause
+        hints.extend(propagator.ids[ref] for ref in reversed(antecedents))
+
+    # Backjump to the highest level among the other literals, and watch a
+    # literal of that level
+    level = 0
+    if len(learnt) > 1:
+        best = max(range(1, len(learnt)), key=lambda i: levels[learnt[i] >> 1])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        level = levels[learnt[1] >> 1]
+
+    return learnt, level, proof, hints, seen, antecedents
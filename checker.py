@@ -0,0 +1,107 @@
+# Checking resolution proofs.
+#
+# An UNSAT result holds a proof of the empty clause: a DAG of `ResolvedClause`s
+# (see proof.py) whose leaves are clauses of the formula. The proof is valid
+# when
+#
+#   - every leaf is an `Axiom` of the original formula (optionally, the leaves
+#     may also include `Assumption`s, or `Lemma`s whose proofs live elsewhere),
+#   - every `ResolvedClause` resolves its two children on exactly one pivot:
+#     the children contain exactly one complementary pair of literals, and the
+#     node's literals are all of theirs except that pair.
+#
+# Proofs are far too deep to walk recursively, and the same subproof is shared
+# by many nodes, so the proof is first flattened with `proof.pack`, which
+# visits each distinct node once, iteratively. Each resolution step can then be
+# checked on its own, knowing only the literals of the node and its children.
+# Proofs with at least SHARD_SIZE steps can be split into shards of that size
+# and checked by a pool of worker processes.
+
+import multiprocessing
+from typing import List, Optional, Set, Tuple
+from defns import *
+from proof import Lemma, pack
+
+# Steps per shard when checking in parallel
+SHARD_SIZE = 1 << 15
+
+class ProofError(ValueError):
+    pass
+
+# A resolution step: the literals of a node and of its two children
+Step = Tuple[FrozenSet[Literal], FrozenSet[Literal], FrozenSet[Literal]]
+
+def _literals(literals: FrozenSet[Literal]) -> str:
+    return ' '.join(map(str, sorted(literals, key=lambda l: (l.variable, l.sign)))) or 'X'
+
+# Why a resolution step is invalid, or None if it is valid
+def step_error(step: Step) -> Optional[str]:
+    literals, lits1, lits2 = step
+    pivots = [ l for l in lits1 if -l in lits2 ]
+    if len(pivots) != 1:
+        return (f'{_literals(lits1)} and {_literals(lits2)} have {len(pivots)} '
+                f'complementary literals instead of one')
+    pivot = pivots[0]
+    if literals != (lits1 | lits2) - { pivot, -pivot }:
+        return (f'{_literals(literals)} is not the resolvent of {_literals(lits1)} '
+                f'and {_literals(lits2)}')
+    return None
+
+# Check a shard of steps, starting at `offset` in the whole list. Returns the
+# position and error of the first invalid step, if any.
+def _check_shard(shard: Tuple[int, List[Step]]) -> Optional[Tuple[int, str]]:
+    offset, steps = shard
+    for i, step in enumerate(steps):
+        error = step_error(step)
+        if error is not None:
+            return offset + i, error
+    return None
+
+# Why the proof of `clause` is invalid, or None if it is valid. `workers` > 1
+# checks large proofs in that many processes.
+def proof_error(clause: Clause, formula: Set[Clause], assumptions: bool = False,
+                lemmas: bool = False, workers: int = 1) -> Optional[str]:
+    nodes = pack(clause)
+    literals = [ node[0].literals if len(node) == 1 else node[0] for node in nodes ]
+    steps: List[Step] = []
+    for node in nodes:
+        if len(node) == 1:
+            leaf = node[0]
+            if isinstance(leaf, Axiom):
+                if leaf not in formula:
+                    return f'{_literals(leaf.literals)} is not a clause of the formula'
+            elif isinstance(leaf, Assumption):
+                if not assumptions:
+                    return f'the proof uses the assumption {leaf}'
+            elif isinstance(leaf, Lemma):
+                if not lemmas:
+                    return f'the proof uses the unchecked lemma {leaf}'
+            else:
+                return f'unexpected leaf {type(leaf).__name__} {_literals(leaf.literals)}'
+        else:
+            steps.append((node[0], literals[node[1]], literals[node[2]]))
+
+    shards = [ (i, steps[i:i + SHARD_SIZE]) for i in range(0, len(steps), SHARD_SIZE) ]
+    if workers > 1 and len(shards) > 1:
+        with multiprocessing.get_context().Pool(min(workers, len(shards))) as pool:
+            for failure in pool.imap(_check_shard, shards):
+                if failure is not None:
+                    break
+    else:
+        failure = next(filter(None, map(_check_shard, shards)), None)
+    if failure is not None:
+        return f'resolution step {failure[0]}: {failure[1]}'
+    return None
+
+# Check the proof of `clause`, raising a `ProofError` if it is invalid
+def check_proof(clause: Clause, formula: Set[Clause], assumptions: bool = False,
+                lemmas: bool = False, workers: int = 1) -> None:
+    error = proof_error(clause, formula, assumptions, lemmas, workers)
+    if error is not None:
+        raise ProofError(error)
+
+# Check that `clause` is a valid proof of the empty clause from `formula` alone
+def check_refutation(clause: Clause, formula: Set[Clause], workers: int = 1) -> None:
+    if len(clause) != 0:
+        raise ProofError(f'the proof is of {_literals(clause.literals)}, not the empty clause')
+    check_proof(clause, formula, workers=workers)
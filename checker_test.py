@@ -0,0 +1,79 @@
+import pytest
+from unittest import mock
+import checker
+from checker import ProofError, check_proof, check_refutation, proof_error
+from config import Config
+from defns import *
+from dpll import dpll
+from generators import pigeonhole
+from proof import Lemma, pack
+
+x, y = Literal(1, True), Literal(2, True)
+
+def test_valid():
+    formula = cnf([ [1, 2], [-1, 2], [-2] ])
+    a, b, c = (Axiom(l) for l in ([ x, y ], [ -x, y ], [ -y ]))
+    step = ResolvedClause([ y ], a, b)
+    check_refutation(ResolvedClause([], step, c), formula)
+
+@pytest.mark.parametrize('proof, error', [
+    (Axiom([ x ]), 'not a clause of the formula'),
+    (ResolvedClause([], Axiom([ x, y ]), Axiom([ -x, -y ])), 'instead of one'),
+    (ResolvedClause([], Axiom([ x, y ]), Axiom([ -x ])), 'not the resolvent'),
+    (ResolvedClause([], Axiom([ x ]), Axiom([ y ])), 'instead of one'),
+    (ResolvedClause([], Assumption(x), Axiom([ -x ])), 'assumption'),
+    (ResolvedClause([], Lemma([ x ], 'shared'), Axiom([ -x ])), 'lemma'),
+])
+def test_invalid(proof, error):
+    formula = cnf([ [1], [1, 2], [-1, -2], [-1], [-1, 2], [2] ])
+    if isinstance(proof, Axiom):
+        formula = cnf([ [2] ])
+    assert error in proof_error(proof, formula)
+    with pytest.raises(ProofError):
+        check_proof(proof, formula)
+
+def test_allowed_leaves():
+    formula = cnf([ [-1] ])
+    assert proof_error(ResolvedClause([], Assumption(x), Axiom([ -x ])), formula,
+                       assumptions=True) is None
+    assert proof_error(ResolvedClause([], Lemma([ x ], 'shared'), Axiom([ -x ])), formula,
+                       lemmas=True) is None
+
+def test_not_a_refutation():
+    with pytest.raises(ProofError, match='not the empty clause'):
+        check_refutation(Axiom([ x ]), cnf([ [1] ]))
+
+# A refutation of x1, x1 -> x2, ..., x(n-1) -> xn, -xn that is n steps deep
+def chain(n: int):
+    formula = cnf([ [1] ] + [ [-i, i + 1] for i in range(1, n) ] + [ [-n] ])
+    proof = Axiom([ Literal(1, True) ])
+    for i in range(1, n):
+        proof = ResolvedClause([ Literal(i + 1, True) ], proof,
+                               Axiom([ Literal(i, False), Literal(i + 1, True) ]))
+    return ResolvedClause([], proof, Axiom([ Literal(n, False) ])), formula
+
+def test_deep():
+    proof, formula = chain(100000)
+    check_refutation(proof, formula)
+
+def test_shared_subproofs():
+    formula = cnf(pigeonhole(5))
+    proof = dpll(formula, Config(learn=True)).clause
+    # Counting the tree's nodes path by path would take far longer than
+    # checking each distinct node once
+    nodes = pack(proof)
+    size = []
+    for node in nodes:
+        size.append(1 if len(node) == 1 else 1 + size[node[1]] + size[node[2]])
+    assert size[-1] > 10 * len(nodes)
+    check_refutation(proof, formula)
+
+def test_shards():
+    proof, formula = chain(1000)
+    with mock.patch.object(checker, 'SHARD_SIZE', 100):
+        check_refutation(proof, formula, workers=2)
+        # Break a step in the last shard
+        bad = ResolvedClause([], ResolvedClause([ Literal(1000, True), y ], proof.clause1.clause1,
+                                                proof.clause1.clause2),
+                             Axiom([ Literal(1000, False) ]))
+        assert 'resolution step 998' in proof_error(bad, formula, workers=2)
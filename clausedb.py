@@ -0,0 +1,91 @@
+# The learned-clause database.
+#
+# Every conflict adds a learned clause, and propagation slows down as they pile
+# up, so the CDCL search periodically throws most of them away. The database
+# keeps two scores for each learned clause:
+#
+#   - its LBD (see `cdcl.lbd`), fixed when the clause is learned. Clauses with
+#     an LBD of at most GLUE ("glue" clauses) connect few decision levels and
+#     are kept forever.
+#   - its activity, which is bumped whenever the clause takes part in a
+#     conflict and decays over time, like VSIDS does for variables.
+#
+# Every so many conflicts (FIRST, then INCREMENT more each time), `reduce`
+# deletes the worse half of the other learned clauses: highest LBD first, and
+# least active among equal LBDs. Clauses that are the reason for a current
+# assignment are never deleted, since conflict analysis and proofs still need
+# them. Once deleted clauses take up more than half of the clause arena, it is
+# compacted, so memory stays bounded on long runs.
+#
+# The clauses of the formula itself are not in the database and never deleted.
+
+from typing import Dict, Iterable
+from propagation import Propagator
+
+class ClauseDB:
+    # Clauses with at most this LBD are never deleted
+    GLUE = 2
+    # Conflicts before the first reduction, and how many more to wait after
+    # each one
+    FIRST = 2000
+    INCREMENT = 300
+    DECAY = 0.999
+    RESCALE = 1e20
+
+    def __init__(self, propagator: Propagator):
+        self.propagator = propagator
+        # The LBD and activity of each deletable learned clause, by ref
+        self.lbds: Dict[int, int] = {}
+        self.activity: Dict[int, float] = {}
+        self.increment = 1.0
+        self.conflicts = 0
+        self.reductions = 0
+        self.limit = self.FIRST
+
+    # Record a clause learned at the last conflict
+    def learned(self, ref: int, lbd: int) -> None:
+        if lbd > self.GLUE:
+            self.lbds[ref] = lbd
+            self.activity[ref] = self.increment
+
+    # Bump the activity of the clauses that took part in a conflict
+    def bump(self, refs: Iterable[int]) -> None:
+        activity = self.activity
+        for ref in refs:
+            if ref in activity:
+                activity[ref] += self.increment
+                if activity[ref] > self.RESCALE:
+                    self._rescale()
+
+    def _rescale(self) -> None:
+        for ref in self.activity:
+            self.activity[ref] /= self.RESCALE
+        self.increment /= self.RESCALE
+
+    def conflict(self) -> None:
+        self.conflicts += 1
+        self.increment /= self.DECAY
+
+    def due(self) -> bool:
+        return self.conflicts >= self.limit
+
+    # Delete the worse half of the deletable clauses that are not locked
+    def reduce(self) -> None:
+        propagator, lbds, activity = self.propagator, self.lbds, self.activity
+        candidates = [ ref for ref in lbds if not propagator.locked(ref) ]
+        candidates.sort(key=lambda ref: (-lbds[ref], activity[ref]))
+        deleted = candidates[:len(candidates) // 2]
+        propagator.delete_clauses(deleted)
+        for ref in deleted:
+            del lbds[ref]
+            del activity[ref]
+
+        self.reductions += 1
+        propagator.stats.reductions += 1
+        self.limit = self.conflicts + self.FIRST + self.INCREMENT * self.reductions
+
+        arena = propagator.arena
+        if arena.garbage * 2 > arena.end:
+            moved = propagator.compact()
+            self.lbds = { moved.get(ref, ref): lbd for ref, lbd in lbds.items() }
+            self.activity = { moved.get(ref, ref): a for ref, a in activity.items() }
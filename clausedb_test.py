@@ -0,0 +1,97 @@
+import pytest
+from unittest import mock
+from hypothesis import given, settings
+from clausedb import ClauseDB
+from config import Config
+from checker import check_refutation
+from defns import *
+from dpll import dpll, solve
+from dpll_test import formulas
+from drat_test import check_drat, check_lrat, propagator, read_proof
+from generators import pigeonhole
+from cdcl import analyze
+from encoding import ClauseArena, from_dimacs
+
+def test_arena_delete_and_compact():
+    arena = ClauseArena()
+    refs = [ arena.add([ 2 * i + 2, 2 * i + 5 ]) for i in range(4) ]
+    arena.delete(refs[0])
+    arena.delete(refs[2])
+    assert list(arena.refs()) == [ refs[1], refs[3] ] and len(arena) == 2
+    assert arena.garbage == 6
+    moved = arena.compact()
+    assert moved == { refs[1]: 0, refs[3]: 3 }
+    assert [ list(arena.literals(ref)) for ref in arena.refs() ] == [ [ 4, 7 ], [ 8, 11 ] ]
+    assert arena.end == 6 and arena.garbage == 0
+
+def test_only_resolved_reasons_are_bumped():
+    p = propagator([ [-1, 2], [-3, 4], [-4, -2, 5], [-4, -5] ])
+    refs = list(p.arena.refs())
+    p.decide(from_dimacs(1))
+    assert p.propagate() is None
+    p.decide(from_dimacs(3))
+    conflict = p.propagate()
+    assert conflict == refs[3]
+    learnt, level, proof, hints, involved, antecedents = analyze(p, conflict)
+    # 2 takes part at level 1 and 4 is the UIP, but neither reason is resolved
+    assert { 2, 4 } <= involved
+    assert antecedents == [ refs[3], refs[2] ]
+
+    db = ClauseDB(p)
+    for ref in refs:
+        db.learned(ref, 3)
+    db.bump(antecedents)
+    assert [ db.activity[ref] for ref in refs ] == [ 1.0, 1.0, 2.0, 2.0 ]
+
+# Reduce (and compact) after a handful of conflicts
+def often():
+    return mock.patch.multiple(ClauseDB, FIRST=10, INCREMENT=2, GLUE=1)
+
+def test_reduce_keeps_locked_clauses():
+    p = propagator(pigeonhole(5))
+    reductions = []
+    original = ClauseDB.reduce
+
+    def reduce(self):
+        before = dict(self.lbds)
+        locked = { ref for ref in before if p.locked(ref) }
+        original(self)
+        # Every reason is still there, and at most half of the others went
+        live = set(p.arena.refs())
+        assert all(p.reasons[lit >> 1] in live for lit in p.trail
+                   if isinstance(p.reasons[lit >> 1], int))
+        assert len(before) - len(self.lbds) == (len(before) - len(locked)) // 2
+        reductions.append(len(before))
+
+    with often(), mock.patch.object(ClauseDB, 'reduce', reduce):
+        assert not solve(p, Config(learn=True, heuristic='vsids')).sat()
+    assert reductions
+
+def test_memory_stays_bounded():
+    sizes = {}
+    for reduce_db in (False, True):
+        p = propagator(pigeonhole(6))
+        with often():
+            result = solve(p, Config(learn=True, heuristic='vsids', reduce_db=reduce_db))
+        assert not result.sat()
+        sizes[reduce_db] = p.arena.end
+    assert sizes[True] < sizes[False] / 2
+
+@pytest.mark.parametrize('format', [ 'drat', 'lrat' ])
+def test_proof_file_with_deletions(tmp_path, format):
+    formula = pigeonhole(5)
+    path = str(tmp_path / 'proof')
+    with often():
+        solve(propagator(formula), Config(learn=True, heuristic='vsids', proof_file=path,
+                                          proof_format=format))
+    assert any(step[0] == 'd' for step in read_proof(path, format == 'lrat', False))
+    (check_lrat if format == 'lrat' else check_drat)(formula, path)
+
+@given(formulas)
+@settings(deadline=None, max_examples=300)
+def test_pbt(formula):
+    with often():
+        result = dpll(formula, Config(learn=True, heuristic='vsids', restart='luby'))
+    assert result.sat() == dpll(formula).sat()
+    if not result.sat():
+        check_refutation(result.clause, formula)
@@ -0,0 +1,184 @@
+# A binary cache of parsed CNF files.
+#
+# Solving the same large CNF file again and again pays every time for parsing
+# its text (see dimacs.py) and adding its clauses one by one. `load_cached`
+# instead parses a file once and writes its clauses next to it, in
+# `<file>.cache`, in a binary format that later runs map into memory and hand
+# to the propagator in bulk (see `Propagator.add_block`):
+#
+#     header   HEADER (see below), 88 bytes
+#     refs     int64[clauses]             where each clause starts in `block`
+#     block    int32[clauses + literals]  each clause's size, then its packed
+#                                         literals (see encoding.py)
+#     dropped  int64[dropped]             positions of the tautologies left out
+#
+# in native byte order. `block` is laid out exactly as the clause arena is, so
+# loading copies it once, straight from the mapped file into the arena, and
+# only the refs are read clause by clause (to watch each clause's literals).
+# Repeated literals are removed from each clause as it is written, and
+# tautologies left out, so that the clauses can be added without checking them
+# again. Caches of an older layout are rebuilt.
+#
+# The header records the source file's size, modification time and SHA-256
+# digest. A cache whose source has the same size and modification time is used
+# as it is; otherwise the source is hashed, and the cache is rebuilt only if the
+# digest changed. A cache that cannot be written (say, in a read-only directory)
+# is simply skipped.
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterator, List, Optional
+import numpy as np
+from dimacs import DimacsReader, load
+from encoding import from_dimacs
+from propagation import Propagator
+
+MAGIC = b'CNFC'
+VERSION = 2
+# Magic, version, byte order, variables, clauses, literals, dropped clauses,
+# source size, source modification time (ns) and source digest
+HEADER = struct.Struct('=4sHHqqqqqq32s')
+BYTE_ORDER = 1 if sys.byteorder == 'little' else 2
+
+def cache_path(path: str) -> str:
+    return path + '.cache'
+
+# The SHA-256 digest of a file
+def digest(path: str) -> bytes:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.digest()
+
+# A cache file mapped into memory. The arrays are views of the mapping, so they
+# are only valid until `close`.
+class CachedCNF:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except ValueError:
+            self._mapped.close()
+            raise
+
+    def _parse(self) -> None:
+        mapped = self._mapped
+        if len(mapped) < HEADER.size:
+            raise ValueError(f'{self.path}: truncated header')
+        self.header = HEADER.unpack_from(mapped)
+        (magic, version, order, self.num_vars, self.num_clauses, num_literals, num_dropped,
+         self.source_size, self.source_mtime, self.source_digest) = self.header
+        if magic != MAGIC or version != VERSION or order != BYTE_ORDER:
+            raise ValueError(f'{self.path}: not a CNF cache of this version')
+        offset = HEADER.size
+        size = 8 * self.num_clauses + 4 * (self.num_clauses + num_literals) + 8 * num_dropped
+        if len(mapped) != offset + size:
+            raise ValueError(f'{self.path}: truncated cache')
+        self.refs = np.frombuffer(mapped, np.int64, self.num_clauses, offset)
+        offset += self.refs.nbytes
+        self.block = np.frombuffer(mapped, np.int32, self.num_clauses + num_literals, offset)
+        offset += self.block.nbytes
+        # An int64 array after int32s may be misaligned, so it is copied
+        self.dropped = np.frombuffer(mapped, np.int64, num_dropped, offset).copy()
+
+    # Whether this is a cache of `source` as it is now. A source that was only
+    # touched has its new modification time recorded, so it is not hashed again.
+    def matches(self, source: str) -> bool:
+        status = os.stat(source)
+        if (status.st_size, status.st_mtime_ns) == (self.source_size, self.source_mtime):
+            return True
+        if status.st_size != self.source_size or digest(source) != self.source_digest:
+            return False
+        try:
+            with open(self.path, 'r+b') as f:
+                f.write(HEADER.pack(*self.header[:8], status.st_mtime_ns, self.source_digest))
+        except OSError:
+            pass
+        return True
+
+    # Each clause as a list of DIMACS ints
+    def clauses(self) -> Iterator[List[int]]:
+        block = self.block
+        for ref in self.refs.tolist():
+            yield [ (lit >> 1) if lit & 1 else -(lit >> 1)
+                    for lit in block[ref + 1:ref + 1 + block[ref]].tolist() ]
+
+    # Load the clauses into a new propagator, copying the mapped block into its
+    # arena
+    def propagator(self) -> Propagator:
+        propagator = Propagator(num_vars=self.num_vars)
+        propagator.add_block(self.block, self.refs.tolist(), self.num_vars,
+                             self.dropped.tolist())
+        return propagator
+
+    def close(self) -> None:
+        del self.refs, self.block
+        self._mapped.close()
+
+    def __enter__(self) -> 'CachedCNF':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# Parse a DIMACS file and write its cache to `path` (by default, next to it)
+def write_cache(source: str, path: Optional[str] = None) -> str:
+    path = path or cache_path(source)
+    status = os.stat(source)
+    reader = DimacsReader(source)
+    refs = array('q')
+    block = array('i')
+    dropped = array('q')
+    num_vars = reader.header.num_vars if reader.header is not None else 0
+    for position, clause in enumerate(reader, start=1):
+        lits = list(dict.fromkeys(map(from_dimacs, clause)))
+        unique = set(lits)
+        if any(lit ^ 1 in unique for lit in unique):
+            dropped.append(position)
+            continue
+        if lits:
+            num_vars = max(num_vars, max(lits) >> 1)
+        refs.append(len(block))
+        block.append(len(lits))
+        block.extend(lits)
+    header = HEADER.pack(MAGIC, VERSION, BYTE_ORDER, num_vars, len(refs), len(block) - len(refs),
+                         len(dropped), status.st_size, status.st_mtime_ns, digest(source))
+
+    # Written to a temporary file first, so that readers never see half a cache
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(header)
+            f.write(refs.tobytes())
+            f.write(block.tobytes())
+            f.write(dropped.tobytes())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return path
+
+# Load a DIMACS file into a propagator through its cache, writing (or
+# rewriting) the cache if it is missing or stale
+def load_cached(source: str) -> Propagator:
+    path = cache_path(source)
+    try:
+        with CachedCNF(path) as cached:
+            if cached.matches(source):
+                return cached.propagator()
+    except (OSError, ValueError):
+        pass
+    try:
+        write_cache(source, path)
+    except OSError:
+        # The cache is only an optimization
+        return load(source)
+    with CachedCNF(path) as cached:
+        return cached.propagator()
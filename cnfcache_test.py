@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import pytest
+from hypothesis import given, settings, strategies as st
+from cnfcache import CachedCNF, cache_path, load_cached, write_cache
+from config import Config
+from dimacs import DimacsError, load
+from dpll import solve
+from drat_test import check_lrat
+from generators import random_ksat, write_dimacs
+
+# What loading a formula amounts to: its clauses, the ids of LRAT proofs, and
+# what propagation makes of it (bulk loading leaves assigning the units to
+# propagation, and watches literals in their order in the file)
+def state(propagator):
+    arena = propagator.arena
+    clauses = sorted(sorted(arena.literals(ref)) for ref in arena.refs())
+    conflict = propagator.pending is not None or propagator.propagate() is not None
+    return (clauses, propagator.added, propagator.dropped, propagator.num_vars, conflict,
+            None if conflict else sorted(propagator.trail))
+
+def write(tmp_path, formula, name='formula.cnf'):
+    path = str(tmp_path / name)
+    write_dimacs(formula, path)
+    return path
+
+clauses = st.lists(st.integers(1, 6).flatmap(lambda v: st.sampled_from([ v, -v ])), max_size=4)
+
+@given(st.lists(clauses, max_size=20))
+@settings(max_examples=100, deadline=None)
+def test_same_as_parsing(tmp_path_factory, formula):
+    # Repeated literals, tautologies, units and empty clauses included
+    path = write(tmp_path_factory.mktemp('cache'), formula)
+    write_cache(path)
+    with CachedCNF(cache_path(path)) as cached:
+        assert state(cached.propagator()) == state(load(path))
+        assert list(cached.clauses()) == [ list(dict.fromkeys(clause)) for clause in formula
+                                           if not any(-n in clause for n in clause) ]
+
+def test_load_cached(tmp_path):
+    path = write(tmp_path, random_ksat(50, 3, 4.0, seed=1))
+    first = load_cached(path)
+    assert os.path.exists(cache_path(path))
+    # The clauses are laid out as in the arena, in the mapped file itself
+    with CachedCNF(cache_path(path)) as cached:
+        assert not cached.block.flags.owndata
+        assert list(cached.block) == list(load_cached(path).arena.data[:len(cached.block)])
+    assert state(load_cached(path)) == state(first) == state(load(path))
+    assert solve(load_cached(path)).sat() == solve(load(path)).sat()
+
+def test_stale_cache(tmp_path):
+    path = write(tmp_path, [ [1, 2] ])
+    load_cached(path)
+    # Same size, different clauses: the digest tells them apart
+    write_dimacs([ [1, 3] ], path)
+    os.utime(path, ns=(0, 0))
+    assert state(load_cached(path)) == state(load(path))
+    # Only touched: the cache is kept, and remembers the new time
+    cached_at = os.stat(cache_path(path)).st_mtime_ns
+    os.utime(path, ns=(10 ** 18, 10 ** 18))
+    assert state(load_cached(path)) == state(load(path))
+    with CachedCNF(cache_path(path)) as cached:
+        assert cached.source_mtime == 10 ** 18
+    assert os.stat(cache_path(path)).st_mtime_ns >= cached_at
+
+def test_corrupt_cache(tmp_path):
+    path = write(tmp_path, [ [1, -2], [2] ])
+    with open(cache_path(path), 'wb') as f:
+        f.write(b'CNFC garbage')
+    assert state(load_cached(path)) == state(load(path))
+    with pytest.raises(ValueError):
+        CachedCNF(path)
+
+def test_unwritable_directory(tmp_path, monkeypatch):
+    path = write(tmp_path, [ [1, -2], [2] ])
+    def fail(*args):
+        raise PermissionError('read-only')
+    monkeypatch.setattr(os, 'replace', fail)
+    assert state(load_cached(path)) == state(load(path))
+    assert not os.path.exists(cache_path(path))
+    assert os.listdir(tmp_path) == [ 'formula.cnf' ]
+
+def test_invalid_input(tmp_path):
+    path = str(tmp_path / 'bad.cnf')
+    with open(path, 'w') as f:
+        f.write('p cnf 2 1\n1 x 0\n')
+    with pytest.raises(DimacsError):
+        load_cached(path)
+
+def test_lrat_ids_count_dropped_tautologies(tmp_path):
+    formula = [ [1, -1], [1, 2], [-1, 2], [3, -3, 2], [1, -2], [-1, -2] ]
+    path = write(tmp_path, formula)
+    proof = str(tmp_path / 'proof.lrat')
+    result = solve(load_cached(path), Config(learn=True, proof_file=proof, proof_format='lrat'))
+    assert not result.sat()
+    check_lrat(formula, proof)
+
+def test_numpy_is_only_imported_for_the_cache():
+    # The CLI and batch solving work without NumPy unless asked to use caches
+    code = 'import sys, solver, batch; print("numpy" in sys.modules)'
+    output = subprocess.run([ sys.executable, '-c', code ], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+    assert output.strip() == 'False'
@@ -0,0 +1,182 @@
+# Connected-component decomposition.
+#
+# Two clauses are connected if they share a variable, and a formula whose
+# clauses fall into several connected components is SAT exactly when each
+# component is. Searching them as one formula wastes work: a conflict in one
+# component can undo decisions made in another that had nothing to do with it.
+# `solve_components` instead solves every component on its own, in turn or in
+# a pool of worker processes, and merges the models of the components into one
+# model. The first component found UNSAT decides the answer, since a refutation
+# of some of the formula's clauses refutes the whole formula.
+#
+# The components are found by union-find over the variables of every clause.
+# Components of fewer than MIN_CLAUSES clauses are bundled together, so that a
+# formula that falls apart into many tiny pieces does not pay for a propagator
+# and a heuristic per piece.
+#
+# With `propagate_first`, the formula is first simplified by unit propagation
+# at level 0: satisfied clauses are dropped and false literals removed (see
+# `Propagator.residual`), which can split components that were connected only
+# through the variables that propagation assigned. The components are found
+# once, before searching: they are not split again as the search assigns
+# variables.
+#
+# As in cube.py, an UNSAT proof comes back from a worker in its packed form
+# (see `proof.pack`).
+
+import multiprocessing
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple, Union
+from defns import *
+from config import Config
+from dpll import solve
+from limits import Budget, UNKNOWNResult
+from preprocess import Preprocessor
+from proof import pack, unpack
+from propagation import Propagator
+from stats import Stats
+
+# The fewest clauses a bundle of small components is made of
+MIN_CLAUSES = 64
+
+# The refs of the clauses of each connected component, in the order their first
+# clauses were added. An empty clause is a component of its own.
+def components(propagator: Propagator) -> List[List[int]]:
+    arena = propagator.arena
+    parent = list(range(propagator.num_vars + 1))
+
+    def find(variable: int) -> int:
+        while parent[variable] != variable:
+            parent[variable] = parent[parent[variable]]
+            variable = parent[variable]
+        return variable
+
+    for ref in arena.refs():
+        lits = arena.literals(ref)
+        if len(lits) > 1:
+            root = find(lits[0] >> 1)
+            for lit in lits[1:]:
+                other = find(lit >> 1)
+                if other != root:
+                    parent[other] = root
+
+    groups: Dict[int, List[int]] = {}
+    for ref in arena.refs():
+        size = arena.size(ref)
+        key = find(arena.data[ref + 1] >> 1) if size else ~ref
+        groups.setdefault(key, []).append(ref)
+    return list(groups.values())
+
+# The components to solve, smallest first, with the small ones bundled together
+def _tasks(groups: List[List[int]]) -> List[List[int]]:
+    tasks: List[List[int]] = []
+    bundle: List[int] = []
+    for refs in sorted(groups, key=len):
+        if len(refs) >= MIN_CLAUSES:
+            tasks.append(refs)
+            continue
+        bundle.extend(refs)
+        if len(bundle) >= MIN_CLAUSES:
+            tasks.append(bundle)
+            bundle = []
+    if bundle:
+        tasks.insert(0, bundle)
+    return tasks
+
+# A propagator holding just the given clauses of `source`, with their proofs
+def _component(source: Propagator, refs: List[int]) -> Propagator:
+    propagator = Propagator()
+    for ref in refs:
+        propagator.add_literals(list(source.arena.literals(ref)), source.proofs.get(ref))
+    return propagator
+
+# The formula that every worker solves components of, and how (set by `_start`)
+_source: Optional[Propagator] = None
+_config: Optional[Config] = None
+
+def _start(source: Propagator, config: Config) -> None:
+    global _source, _config
+    _source, _config = source, config
+
+# Solve one component in a worker. The search's statistics come last.
+def _solve_component(refs: List[int]) -> Tuple[str, object, Stats]:
+    result = solve(_component(_source, refs), _config)
+    if isinstance(result, UNKNOWNResult):
+        return 'unknown', result.reason, result.stats
+    if result.sat():
+        return 'sat', result.assignments, result.stats
+    return 'unsat', pack(result.clause), result.stats
+
+# Solve a formula one connected component at a time, with `workers` processes
+# (or in this process, with one). The result's statistics add up every
+# component that was solved. Limits (see `limits.py`) apply to each component
+# on its own; if any component runs out, the result is UNKNOWN unless another
+# is UNSAT.
+def solve_components(propagator: Propagator, config: Optional[Config] = None,
+                     workers: int = 1,
+                     propagate_first: bool = False) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    config = config or Config()
+    if workers < 1:
+        raise ValueError('Solving components needs at least one worker')
+    if config.proof_file is not None:
+        raise ValueError('Solving components cannot write a proof file')
+
+    preprocessor = None
+    if config.preprocess:
+        preprocessor = Preprocessor(propagator)
+        propagator = preprocessor.run()
+    variables = list(propagator.variables)
+
+    assignments: Dict[int, bool] = {}
+    if propagate_first:
+        propagator.budget = Budget.start(config.limits, config.cancel, propagator.stats)
+        conflict = propagator.propagate()
+        if propagator.stopped is not None:
+            return UNKNOWNResult(propagator.stopped, propagator.stats.snapshot())
+        if conflict is not None:
+            return UNSATResult(propagator.conflict_proof(conflict), propagator.stats.snapshot())
+        assignments.update(propagator.assignments())
+        stats = propagator.stats.snapshot()
+        propagator = Propagator(propagator.residual())
+    else:
+        stats = propagator.stats.snapshot()
+
+    tasks = _tasks(components(propagator))
+    config = replace(config, preprocess=False)
+    result: Union[UNSATResult, None] = None
+    unknown: Optional[str] = None
+    if workers == 1 or len(tasks) == 1:
+        _start(propagator, config)
+        outcomes = map(_solve_component, tasks)
+        pool = None
+    else:
+        context = multiprocessing.get_context()
+        pool = context.Pool(workers, initializer=_start, initargs=(propagator, config))
+        outcomes = pool.imap_unordered(_solve_component, tasks)
+    try:
+        for kind, value, component_stats in outcomes:
+            stats.add(component_stats)
+            if kind == 'unsat':
+                result = UNSATResult(unpack(value), stats)
+                break
+            if kind == 'unknown':
+                unknown = unknown or value
+            else:
+                assignments.update(value)
+    finally:
+        _start(None, None)
+        if pool is not None:
+            # Terminates the workers still solving other components
+            pool.terminate()
+            pool.join()
+
+    if result is not None:
+        return result
+    if unknown is not None:
+        return UNKNOWNResult(unknown, stats)
+    # Variables whose clauses were all satisfied by propagation can be anything
+    for variable in variables:
+        assignments.setdefault(variable, True)
+    if preprocessor is not None:
+        preprocessor.reconstruct(assignments)
+    return SATResult(assignments, stats)
@@ -0,0 +1,76 @@
+import pytest
+from checker import check_refutation
+from components import _tasks, components, solve_components
+from config import Config
+from defns import *
+from dpll_test import satisfies
+from generators import pigeonhole, random_ksat
+from limits import Limits
+from propagation import Propagator
+
+# The formulas side by side, over disjoint variables
+def disjoint(*formulas):
+    union, offset = [], 0
+    for formula in formulas:
+        union += [ [ n + offset if n > 0 else n - offset for n in clause ] for clause in formula ]
+        offset += max(abs(n) for clause in formula for n in clause)
+    return union
+
+def test_components():
+    propagator = Propagator(cnf([ [1, 2], [3], [4, -5], [-2, 6], [5, 7] ]))
+    groups = [ { tuple(sorted(propagator.arena.literals(ref))) for ref in refs }
+               for refs in components(propagator) ]
+    assert sorted(map(len, groups)) == [ 1, 2, 2 ]
+    # The unit clause [3], packed
+    assert { (7,) } in groups
+
+def test_tasks_bundle_small_components():
+    groups = [ [ i ] for i in range(100) ] + [ list(range(200, 300)) ]
+    tasks = _tasks(groups)
+    assert sorted(ref for task in tasks for ref in task) == sorted(sum(groups, []))
+    assert len(tasks) == 3 and all(len(task) >= 36 for task in tasks)
+
+@pytest.mark.parametrize('workers, propagate_first', [ (1, False), (2, False), (2, True) ])
+def test_sat(workers, propagate_first):
+    formula = cnf(disjoint(*[ random_ksat(40, 3, 3.5, seed) for seed in range(4) ],
+                           [ [1], [-1, 2] ]))
+    result = solve_components(Propagator(formula), Config(learn=True), workers, propagate_first)
+    assert result.sat() and satisfies(result.assignments, formula)
+    assert result.stats.decisions > 0
+
+@pytest.mark.parametrize('workers, propagate_first', [ (1, False), (2, False), (1, True) ])
+def test_unsat(workers, propagate_first):
+    formula = cnf(disjoint(random_ksat(30, 3, 3.0, seed=1), pigeonhole(4), [ [1, 2], [-2] ]))
+    result = solve_components(Propagator(formula), Config(), workers, propagate_first)
+    assert not result.sat()
+    check_refutation(result.clause, formula)
+
+def test_propagate_first_splits_after_propagation():
+    # Only the unit on 1 connects the two halves
+    formula = cnf([ [1], [-1, 2, 3], [-2, 3], [-1, 4, 5], [-4, -5] ])
+    propagator = Propagator(formula)
+    assert len(components(propagator)) == 1
+    propagator.propagate()
+    assert len(components(Propagator(propagator.residual()))) == 2
+    result = solve_components(Propagator(formula), propagate_first=True)
+    assert result.sat() and satisfies(result.assignments, formula)
+
+def test_propagate_first_long_implication_chain():
+    # Reducing the clauses at the end of the chain builds proofs thousands of
+    # resolutions deep
+    chain = [ [1] ] + [ [-i, i + 1] for i in range(1, 3000) ] + [ [-3000, 3001, 3002], [3003, 3004] ]
+    formula = cnf(chain)
+    result = solve_components(Propagator(formula), propagate_first=True)
+    assert result.sat() and satisfies(result.assignments, formula)
+
+def test_preprocess_and_limits():
+    formula = cnf(disjoint(random_ksat(50, 3, 3.5, seed=2), random_ksat(50, 3, 3.5, seed=3)))
+    result = solve_components(Propagator(formula), Config(preprocess=True))
+    assert result.sat() and satisfies(result.assignments, formula)
+    hard = cnf(disjoint(pigeonhole(8), [ [1, 2] ]))
+    result = solve_components(Propagator(hard), Config(limits=Limits(conflicts=10)))
+    assert result.reason == 'conflicts'
+
+def test_rejects_proof_file(tmp_path):
+    with pytest.raises(ValueError):
+        solve_components(Propagator(cnf([ [1] ])), Config(proof_file=str(tmp_path / 'p')))
@@ -0,0 +1,70 @@
+# Options that control how `dpll` searches for a solution. The defaults give
+# the classic DPLL search; pass a `Config` to `dpll` to change them, e.g.
+#
+#     > dpll(formula, Config(learn=True))
+#
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Optional
+if TYPE_CHECKING:
+    from limits import CancelToken, Limits
+
+# The local search algorithms (see `localsearch.py`, which needs NumPy and is
+# only imported when one is used)
+LOCAL_SEARCH_ALGORITHMS = ('walksat', 'probsat')
+
+@dataclass(frozen=True)
+class Config:
+    # Learn a clause from every conflict and backjump non-chronologically
+    # (CDCL), instead of chronological backtracking with `remove_assumption`
+    learn: bool = False
+
+    # The branching heuristic: 'first', 'moms', 'jw' or 'vsids' (see
+    # `heuristics.py`)
+    heuristic: str = 'first'
+
+    # Randomize the heuristic's initial scores with this seed, and override
+    # the sign it picks: 'default', 'true', 'false' or 'random'
+    seed: Optional[int] = None
+    polarity: str = 'default'
+
+    # When the CDCL search restarts: 'none', 'luby', 'geometric' or 'glucose'
+    # (see `restarts.py`)
+    restart: str = 'none'
+    # Decide variables with the sign they had last (by default, only when
+    # restarting)
+    phase_saving: Optional[bool] = None
+
+    # Periodically delete most of the learned clauses (see `clausedb.py`)
+    reduce_db: bool = True
+
+    # Simplify the formula before searching (see `preprocess.py`)
+    preprocess: bool = False
+
+    # Search for a model by local search, 'walksat' or 'probsat', instead of
+    # systematically (see `localsearch.py`). Local search cannot prove a
+    # formula UNSAT: it gives up with an `UNKNOWNResult` after `flips` flips
+    # (by default, only when `limits` run out).
+    local_search: Optional[str] = None
+    # Pick the phase of every variable with a short run of local search before
+    # searching systematically
+    phase_init: Optional[str] = None
+    flips: Optional[int] = None
+
+    # Stream the learned clauses to this file as a 'drat' or 'lrat' proof
+    # (see `drat.py`) instead of keeping the proof in memory. Requires `learn`.
+    proof_file: Optional[str] = None
+    proof_format: str = 'drat'
+    # Write the proof in the binary variant of its format
+    binary_proof: bool = False
+
+    # Time each phase of the search (see `stats.py`); counters are always kept
+    stats: bool = False
+    # Called with the solver's `Stats` every `progress_interval` seconds or so
+    # while it searches
+    progress: Optional[Callable] = None
+    progress_interval: float = 1.0
+
+    # Stop the search with an `UNKNOWNResult` when it runs out of these
+    # `Limits`, or when this `CancelToken` is cancelled (see `limits.py`)
+    limits: Optional['Limits'] = None
+    cancel: Optional['CancelToken'] = None
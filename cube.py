@@ -0,0 +1,241 @@
+# Cube-and-conquer: split a formula into many independent subproblems and solve
+# them in parallel.
+#
+# A cube is a partial assignment, given to the solver as a set of `Assumption`s.
+# `split` builds a binary tree of cubes: starting from the empty cube, it picks
+# a variable by lookahead (trying both signs and counting how much each one
+# propagates) and splits the cube into one cube per sign, down to a given depth.
+# Branches that already fail by propagation are not split any further. The
+# leaves cover every assignment, so the formula is SAT if and only if one of
+# them is.
+#
+# The cubes are then solved by a pool of worker processes, each running the
+# ordinary search (`dpll_internal`, or `cdcl_internal` with `learn`) on the
+# formula plus the cube's assumptions. The first SAT cube wins. If every cube
+# is UNSAT, their refutations are merged back up the tree: at a split on `x`,
+# removing the assumption from the refutations of both children gives proofs
+# of `-x` and `x` (see `remove_assumption`), and resolving those refutes the
+# parent. At the root this is a proof of the empty clause without assumptions.
+#
+# The workers are not sent the `Propagator` itself: under the spawn and
+# forkserver start methods it would be pickled, and the proofs of preprocessed
+# clauses can nest deeply enough to exceed the recursion limit. They are sent
+# the clauses laid out as in the arena and the proofs packed together (see
+# `proof.pack_all`), and each worker rebuilds the propagator for every cube.
+
+import math
+import multiprocessing
+from array import array
+from typing import Dict, List, Optional, Tuple, Union
+from defns import *
+from config import Config
+from dpll import cdcl_internal, dpll_internal, remove_assumption
+from encoding import decode
+from limits import UNKNOWNResult
+from preprocess import Preprocessor
+from proof import Packed, leaf, pack, pack_all, resolved, unpack, unpack_all
+from propagation import Propagator
+from stats import Stats
+
+# A cube, as the packed literals assumed on the way down the tree
+Cube = Tuple[int, ...]
+
+# How many of the most frequent variables lookahead considers at each split
+CANDIDATES = 32
+
+# Pick the variable to split on below the current assignment: the one whose two
+# signs propagate the most (a branch that fails outright counts as propagating
+# everything). Returns None if every candidate is assigned.
+def lookahead(propagator: Propagator, candidates: List[int]) -> Optional[int]:
+    level = propagator.decision_level()
+    best, best_score = None, -1
+    for variable in candidates:
+        if propagator.is_assigned(variable):
+            continue
+        counts = []
+        for lit in (variable << 1, (variable << 1) | 1):
+            before = len(propagator.trail)
+            propagator.decide(lit)
+            conflict = propagator.propagate()
+            counts.append(propagator.num_vars if conflict is not None
+                          else len(propagator.trail) - before)
+            propagator.backtrack(level)
+        # Prefer variables that shrink both branches
+        score = counts[0] * counts[1] + counts[0] + counts[1]
+        if score > best_score:
+            best, best_score = variable, score
+    return best
+
+# Split the formula into cubes of up to `depth` literals, in depth-first order.
+# The propagator is left at level 0.
+def split(propagator: Propagator, depth: int) -> List[Cube]:
+    occurrences: Dict[int, int] = dict.fromkeys(propagator.variables, 0)
+    arena = propagator.arena
+    for ref in arena.refs():
+        for lit in arena.literals(ref):
+            occurrences[lit >> 1] += 1
+    candidates = sorted(occurrences, key=occurrences.get, reverse=True)[:CANDIDATES]
+
+    cubes: List[Cube] = []
+    stack: List[Cube] = [ () ]
+    while stack:
+        cube = stack.pop()
+        # Replay the cube. Each of its literals was unassigned when it was
+        # picked, so it is again.
+        propagator.backtrack(0)
+        conflict = propagator.propagate()
+        for lit in cube:
+            if conflict is not None:
+                break
+            propagator.decide(lit)
+            conflict = propagator.propagate()
+
+        variable = None
+        if conflict is None and len(cube) < depth:
+            variable = lookahead(propagator, candidates)
+        if variable is None:
+            cubes.append(cube)
+        else:
+            # Pushed in reverse so that the positive branch comes out first
+            stack.append(cube + (variable << 1,))
+            stack.append(cube + ((variable << 1) | 1,))
+    propagator.backtrack(0)
+    return cubes
+
+# A refutation of the cube `parent`, given refutations of `parent + (lit,)` and
+# `parent + (lit ^ 1,)`
+def _combine(lit: int, refutation: Clause, other: Clause) -> Clause:
+    without = remove_assumption(Assumption(decode(lit)), refutation)
+    if not without.literals:
+        return without
+    other_without = remove_assumption(Assumption(decode(lit ^ 1)), other)
+    if not other_without.literals:
+        return other_without
+    return resolved([], without, other_without)
+
+# Merge the refutations of every cube into a refutation of the empty cube
+def merge(refutations: Dict[Cube, Clause]) -> Clause:
+    refutations = dict(refutations)
+    for length in range(max(map(len, refutations)), 0, -1):
+        for cube in [ c for c in refutations if len(c) == length ]:
+            if cube not in refutations:
+                # Already merged with its sibling
+                continue
+            lit = cube[-1]
+            sibling = cube[:-1] + (lit ^ 1,)
+            refutations[cube[:-1]] = _combine(lit, refutations.pop(cube),
+                                              refutations.pop(sibling))
+    return refutations[()]
+
+# The formula as it is sent to the workers: its clauses laid out as in the
+# arena (see `ClauseArena.extend`) with the offset of each, its number of
+# variables, and the proofs of the clauses that are not axioms, packed with the
+# position of each one's root and the offset of its clause
+Shipped = Tuple[array, List[int], int, Packed, List[int], List[int]]
+
+def ship(propagator: Propagator) -> Shipped:
+    arena = propagator.arena
+    block = array('i')
+    offsets: List[int] = []
+    proofs: List[Clause] = []
+    owners: List[int] = []
+    for ref in arena.refs():
+        offset = len(block)
+        offsets.append(offset)
+        block.append(arena.size(ref))
+        block.extend(arena.literals(ref))
+        proof = propagator.proofs.get(ref)
+        if proof is not None and not isinstance(proof, Axiom):
+            proofs.append(proof)
+            owners.append(offset)
+    nodes, roots = pack_all(proofs)
+    return block, offsets, propagator.num_vars, nodes, roots, owners
+
+# The formula that every worker solves cubes of, its proofs by clause ref, and
+# how to solve it (set by `_start`)
+_formula: Optional[Tuple[array, List[int], int]] = None
+_proofs: Dict[int, Clause] = {}
+_config: Optional[Config] = None
+
+def _start(shipped: Shipped, config: Config) -> None:
+    global _formula, _proofs, _config
+    block, offsets, num_vars, nodes, roots, owners = shipped
+    _formula = block, offsets, num_vars
+    _proofs = dict(zip(owners, unpack_all(nodes, roots)))
+    _config = config
+
+# Solve the formula under a cube's assumptions. An UNSAT result is returned as a
+# packed proof (see `proof.pack`), along with whether it used any assumptions.
+# The search's statistics come last.
+def _solve_cube(cube: Cube) -> Tuple[Cube, str, object, Stats]:
+    block, offsets, num_vars = _formula
+    # The arena starts out empty, so each clause's ref is its offset
+    propagator = Propagator(num_vars=num_vars)
+    propagator.add_block(block, offsets, num_vars)
+    propagator.proofs.update(_proofs)
+    for lit in cube:
+        propagator.add_literals([ lit ], leaf(Assumption(decode(lit))))
+    propagator.stats.timing = _config.stats
+
+    search = cdcl_internal if _config.learn else dpll_internal
+    result = search(propagator, {}, _config)
+    if isinstance(result, UNKNOWNResult):
+        return cube, 'unknown', result.reason, propagator.stats
+    if result.sat():
+        return cube, 'sat', result.assignments, propagator.stats
+    nodes = pack(result.clause)
+    assumed = any(len(node) == 1 and isinstance(node[0], Assumption) for node in nodes)
+    return cube, 'unsat', (nodes, assumed), propagator.stats
+
+# Solve a formula by cube-and-conquer with `workers` processes. The formula is
+# split into cubes of up to `depth` literals (by default, enough for about
+# eight cubes per worker). The result's statistics add up the splitting and
+# every cube that was solved. Limits (see `limits.py`) apply to each cube on its
+# own; if any cube runs out, the result is UNKNOWN unless another cube is SAT.
+def cube_and_conquer(propagator: Propagator, workers: int, config: Optional[Config] = None,
+                     depth: Optional[int] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    config = config or Config()
+    if workers < 1:
+        raise ValueError('Cube-and-conquer needs at least one worker')
+    if config.proof_file is not None:
+        raise ValueError('Cube-and-conquer cannot write a proof file')
+    if depth is None:
+        depth = math.ceil(math.log2(8 * workers))
+
+    preprocessor = None
+    if config.preprocess:
+        preprocessor = Preprocessor(propagator)
+        propagator = preprocessor.run()
+
+    cubes = split(propagator, depth)
+    refutations: Dict[Cube, Clause] = {}
+    result: Union[SATResult, UNSATResult, None] = None
+    unknown: Optional[str] = None
+    stats = propagator.stats.snapshot()
+
+    context = multiprocessing.get_context()
+    with context.Pool(workers, initializer=_start, initargs=(ship(propagator), config)) as pool:
+        for cube, kind, value, cube_stats in pool.imap_unordered(_solve_cube, cubes):
+            stats.add(cube_stats)
+            if kind == 'unknown':
+                unknown = unknown or value
+                continue
+            if kind == 'sat':
+                result = SATResult(value, stats)
+                break
+            nodes, assumed = value
+            refutation = unpack(nodes)
+            if not assumed:
+                # The cube's assumptions were not needed: the formula is UNSAT
+                result = UNSATResult(refutation, stats)
+                break
+            refutations[cube] = refutation
+        # Leaving the block terminates the workers still solving other cubes
+
+    if result is None and unknown is not None:
+        return UNKNOWNResult(unknown, stats)
+    if result is None:
+        result = UNSATResult(merge(refutations), stats)
+    if preprocessor is not None and result.sat():
+        preprocessor.reconstruct(result.assignments)
+    return result
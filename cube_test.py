@@ -0,0 +1,64 @@
+import itertools
+import multiprocessing
+import pickle
+import pytest
+import cube
+from checker import check_refutation
+from config import Config
+from cube import cube_and_conquer, merge, ship, split
+from defns import *
+from encoding import encode
+from generators import pigeonhole
+from propagation import Propagator
+from proof import leaf, resolved
+
+def test_cubes_cover_every_assignment():
+    formula = cnf([ [1, 2, -3], [-1, 4], [2, -4, 5], [-2, -5, 6], [3, -6], [1, 6] ])
+    cubes = split(Propagator(formula), 3)
+    assert len(cubes) > 1
+    for values in itertools.product([ False, True ], repeat=6):
+        lits = { (v << 1) | value for v, value in enumerate(values, start=1) }
+        assert sum(all(lit in lits for lit in cube) for cube in cubes) == 1
+
+@pytest.mark.parametrize('config', [ Config(), Config(learn=True, heuristic='vsids') ])
+def test_unsat(config):
+    formula = cnf(pigeonhole(4))
+    result = cube_and_conquer(Propagator(formula), 2, config, depth=3)
+    assert not result.sat()
+    check_refutation(result.clause, formula)
+
+def test_sat():
+    formula = cnf([ [1, 2], [-1, 3], [-3, -2], [2, 4], [-4, 5, 1], [-5, -1] ])
+    result = cube_and_conquer(Propagator(formula), 2, Config(preprocess=True), depth=3)
+    assert result.sat()
+    assert all(any(result.assignments[l.variable] == l.sign for l in clause)
+               for clause in formula)
+
+def test_spawned_workers(monkeypatch):
+    # A derived unit clause whose proof is far deeper than the recursion limit
+    n = 5000
+    proof = leaf(Axiom([ Literal(1, True) ]))
+    for i in range(1, n):
+        step = Axiom([ Literal(i, False), Literal(i + 1, True) ])
+        proof = resolved([ Literal(i + 1, True) ], step, proof)
+    propagator = Propagator(cnf([ [-n, 1, 2], [-n, -1, 2], [-n, 1, -2], [-n, -1, -2] ]))
+    propagator.add_literals([ encode(Literal(n, True)) ], proof)
+    pickle.dumps(ship(propagator))
+
+    # Spawned workers do not inherit the formula, so it has to be pickled
+    spawn = multiprocessing.get_context('spawn')
+    monkeypatch.setattr(cube.multiprocessing, 'get_context', lambda: spawn)
+    result = cube_and_conquer(propagator, 2, Config(), depth=1)
+    assert not result.sat()
+    check_refutation(result.clause, cnf([ [1], [-n, 1, 2], [-n, -1, 2], [-n, 1, -2], [-n, -1, -2] ]
+                                        + [ [-i, i + 1] for i in range(1, n) ]))
+
+def test_merge_skips_unused_assumptions():
+    a, b = Axiom([ Literal(1, True) ]), Axiom([ Literal(1, False) ])
+    refutation = ResolvedClause([], a, b)
+    assert merge({ (5,): refutation, (4,): refutation }) is refutation
+    assert merge({ (): refutation }) is refutation
+
+def test_rejects_proof_file(tmp_path):
+    with pytest.raises(ValueError):
+        cube_and_conquer(Propagator(cnf([ [1] ])), 1, Config(proof_file=str(tmp_path / 'p')))
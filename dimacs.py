@@ -0,0 +1,226 @@
+# Streaming parser for DIMACS CNF files.
+#
+# A DIMACS file looks like
+#
+#     c comments start with a c
+#     p cnf <number of variables> <number of clauses>
+#     1 -3 0
+#     2 3 -1 0
+#
+# where each clause is a list of non-zero integers terminated by 0. Rather than
+# reading the whole file into memory, the file is memory-mapped (or, if that is
+# not possible, read in chunks) and parsed one block of lines at a time, so
+# clauses are yielded as they are read and memory use does not depend on the
+# size of the file. Each block is split and converted to ints in bulk, which
+# keeps the per-literal work out of Python loops.
+#
+# The `p cnf` header is used to check the input and to size the solver's clause
+# store up front (see `load`). Malformed input raises a `DimacsError` that
+# points at the offending line.
+
+import io
+import mmap
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Union
+from encoding import from_dimacs
+from propagation import Propagator
+
+# How many bytes of the file to parse at a time
+CHUNK_SIZE = 1 << 20
+
+class DimacsError(ValueError):
+    def __init__(self, path: str, line: int, message: str):
+        super().__init__(f'{path}:{line}: {message}')
+        self.path = path
+        self.line = line
+
+@dataclass(frozen=True)
+class Header:
+    num_vars: int
+    num_clauses: int
+
+# Split a file into blocks of roughly `CHUNK_SIZE` bytes that end on a line
+# boundary, starting at byte `start`
+def _blocks(f: BinaryIO, start: int) -> Iterator[bytes]:
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Empty files and some special files cannot be mapped
+        mapped = None
+
+    if mapped is not None:
+        with mapped:
+            position = start
+            while position < len(mapped):
+                end = mapped.find(b'\n', position + CHUNK_SIZE)
+                end = len(mapped) if end < 0 else end + 1
+                yield mapped[position:end]
+                position = end
+        return
+
+    f.seek(start)
+    rest = b''
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        chunk = rest + chunk
+        cut = chunk.rfind(b'\n') + 1
+        if cut:
+            yield chunk[:cut]
+        rest = chunk[cut:]
+    if rest:
+        yield rest
+
+class DimacsReader:
+    # Open a DIMACS file and read its header. Iterating over the reader then
+    # yields each clause as a list of non-zero ints. With `data`, the DIMACS
+    # text is read from memory instead, and `path` only names it in errors.
+    def __init__(self, path: str, data: Optional[bytes] = None):
+        self.path = path
+        self.data = data
+        self.header: Optional[Header] = None
+        # Where the clauses start, in bytes and in lines
+        self._start = 0
+        self._line = 1
+
+        with self._open() as f:
+            for line in f:
+                stripped = line.strip()
+                if stripped.startswith(b'p'):
+                    self.header = self._parse_header(stripped)
+                elif stripped and not stripped.startswith(b'c'):
+                    break
+                self._start += len(line)
+                self._line += 1
+
+    def _parse_header(self, line: bytes) -> Header:
+        fields = line.split()
+        if len(fields) != 4 or fields[1] != b'cnf':
+            raise DimacsError(self.path, self._line,
+                              f'expected "p cnf <variables> <clauses>", got {line.decode(errors="replace")!r}')
+        try:
+            header = Header(int(fields[2]), int(fields[3]))
+        except ValueError:
+            raise DimacsError(self.path, self._line,
+                              f'invalid header {line.decode(errors="replace")!r}') from None
+        if header.num_vars < 0 or header.num_clauses < 0:
+            raise DimacsError(self.path, self._line, 'negative count in header')
+        return header
+
+    def _open(self) -> BinaryIO:
+        # In-memory text cannot be mapped, so it is read in chunks
+        return open(self.path, 'rb') if self.data is None else io.BytesIO(self.data)
+
+    # Parse the ints on each line of a block that contains comments or other
+    # special lines, or that failed to parse in bulk
+    def _parse_lines(self, block: bytes, line: int) -> List[int]:
+        ints: List[int] = []
+        for offset, text in enumerate(block.splitlines()):
+            stripped = text.strip()
+            if not stripped or stripped.startswith(b'c'):
+                continue
+            if stripped.startswith(b'%'):
+                # Some benchmark sets mark the end of the clauses with '%'
+                self._done = True
+                break
+            if stripped.startswith(b'p'):
+                raise DimacsError(self.path, line + offset, 'unexpected header')
+            for token in stripped.split():
+                try:
+                    ints.append(int(token))
+                except ValueError:
+                    raise DimacsError(self.path, line + offset,
+                                      f'invalid literal {token.decode(errors="replace")!r}') from None
+        return ints
+
+    # Point at the first variable of a block that exceeds the header's count,
+    # if `ints` (the block's parsed literals) has one
+    def _check_range(self, ints: List[int], block: bytes, line: int) -> None:
+        limit = self.header.num_vars
+        if ints and (max(ints) > limit or -min(ints) > limit):
+            for offset, text in enumerate(block.splitlines()):
+                stripped = text.strip()
+                if stripped.startswith(b'c'):
+                    continue
+                if stripped.startswith(b'%'):
+                    break
+                for token in stripped.split():
+                    try:
+                        variable = abs(int(token))
+                    except ValueError:
+                        raise DimacsError(self.path, line + offset,
+                                          f'invalid literal {token.decode(errors="replace")!r}') from None
+                    if variable > limit:
+                        raise DimacsError(self.path, line + offset,
+                                          f'variable {variable} exceeds the {limit} declared in the header')
+
+    def __iter__(self) -> Iterator[List[int]]:
+        self._done = False
+        line = self._line
+        count = 0
+        carry: List[int] = []
+
+        with self._open() as f:
+            for block in _blocks(f, self._start):
+                if b'c' in block or b'p' in block or b'%' in block:
+                    ints = self._parse_lines(block, line)
+                else:
+                    try:
+                        ints = list(map(int, block.split()))
+                    except ValueError:
+                        ints = self._parse_lines(block, line)
+                if self.header is not None:
+                    self._check_range(ints, block, line)
+                line += block.count(b'\n')
+
+                # Split into clauses delimited by 0
+                i = 0
+                while True:
+                    try:
+                        n = ints.index(0, i)
+                    except ValueError:
+                        carry.extend(ints[i:])
+                        break
+                    clause = ints[i:n]
+                    if carry:
+                        clause = carry + clause
+                        carry = []
+                    count += 1
+                    yield clause
+                    i = n + 1
+
+                if self._done:
+                    break
+
+        # Allow a trailing clause without a terminator
+        if carry:
+            count += 1
+            yield carry
+
+        if self.header is not None and count != self.header.num_clauses:
+            raise DimacsError(self.path, line,
+                              f'found {count} clauses but the header declares {self.header.num_clauses}')
+
+# Parse a DIMACS file straight into a `Propagator`, without creating a
+# `Clause` object per clause. The header sizes the propagator's per-variable
+# state and reserves room in its clause arena.
+def load(path: str) -> Propagator:
+    reader = DimacsReader(path)
+    if reader.header is not None:
+        # Room for each clause's size and (a guess of) three literals
+        propagator = Propagator(num_vars=reader.header.num_vars,
+                                capacity=4 * reader.header.num_clauses)
+    else:
+        propagator = Propagator()
+
+    add = propagator.add_literals
+    for clause in reader:
+        add(list(map(from_dimacs, clause)))
+    return propagator
+
+# Parse DIMACS text held in memory (say, received over a socket) into a list of
+# clauses, checked as a file would be
+def parse(text: Union[str, bytes], name: str = '<input>') -> List[List[int]]:
+    data = text.encode() if isinstance(text, str) else text
+    return list(DimacsReader(name, data))
@@ -0,0 +1,66 @@
+import pytest
+import dimacs
+from dimacs import DimacsError, DimacsReader, Header, load, parse
+from dpll import solve
+
+def write(tmp_path, text: str) -> str:
+    path = tmp_path / 'formula.cnf'
+    path.write_text(text)
+    return str(path)
+
+def test_header_and_clauses(tmp_path):
+    reader = DimacsReader(write(tmp_path, 'c a comment\np cnf 3 2\n1 -3 0\n2 3 -1 0\n'))
+    assert reader.header == Header(3, 2)
+    assert list(reader) == [ [1, -3], [2, 3, -1] ]
+
+def test_clauses_across_lines_and_trailing_clause(tmp_path):
+    path = write(tmp_path, '1 -2\n3 0\n-1 2 0 4')
+    assert list(DimacsReader(path)) == [ [1, -2, 3], [-1, 2], [4] ]
+
+def test_comments_between_clauses(tmp_path):
+    path = write(tmp_path, 'p cnf 2 2\n1 0\nc middle\n-2 0\n')
+    assert list(DimacsReader(path)) == [ [1], [-2] ]
+
+def test_percent_end_marker(tmp_path):
+    path = write(tmp_path, 'p cnf 2 1\n1 2 0\n%\n0\n')
+    assert list(DimacsReader(path)) == [ [1, 2] ]
+
+def test_small_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(dimacs, 'CHUNK_SIZE', 4)
+    clauses = [ [i, -(i + 1), i + 2] for i in range(1, 200) ]
+    text = 'p cnf 201 199\n' + ''.join(' '.join(map(str, c)) + ' 0\n' for c in clauses)
+    assert list(DimacsReader(write(tmp_path, text))) == clauses
+
+def test_empty_file(tmp_path):
+    assert list(DimacsReader(write(tmp_path, ''))) == []
+
+def test_bad_header(tmp_path):
+    with pytest.raises(DimacsError, match='formula.cnf:2:'):
+        DimacsReader(write(tmp_path, 'c\np dnf 1 1\n1 0\n'))
+
+def test_bad_literal(tmp_path):
+    path = write(tmp_path, 'p cnf 2 2\n1 2 0\n1 x 0\n')
+    with pytest.raises(DimacsError, match=r":3: invalid literal 'x'"):
+        list(DimacsReader(path))
+
+def test_variable_out_of_range(tmp_path):
+    path = write(tmp_path, 'p cnf 2 2\n1 2 0\n1 -3 0\n')
+    with pytest.raises(DimacsError, match=':3: variable 3 exceeds'):
+        list(DimacsReader(path))
+
+def test_clause_count_mismatch(tmp_path):
+    path = write(tmp_path, 'p cnf 2 3\n1 2 0\n1 -2 0\n')
+    with pytest.raises(DimacsError, match='found 2 clauses'):
+        list(DimacsReader(path))
+
+def test_load_and_solve(tmp_path):
+    path = write(tmp_path, 'p cnf 2 4\n1 2 0\n-1 2 0\n1 -2 0\n-1 -2 0\n')
+    propagator = load(path)
+    assert propagator.num_vars == 2
+    assert not solve(propagator).sat()
+
+def test_parse_text():
+    assert parse('c in memory\np cnf 3 2\n1 -3 0\n2 3 -1 0\n') == [ [1, -3], [2, 3, -1] ]
+    assert parse(b'1 2 0 -1') == [ [1, 2], [-1] ]
+    with pytest.raises(DimacsError, match='request:2: variable 3 exceeds'):
+        parse('p cnf 2 1\n1 -3 0\n', 'request')
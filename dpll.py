@@ -1,8 +1,25 @@
 # Types make Python even MORE fun! But you aren't required to use type
 # hints beyond what we provide in the stencil. We use types here to help
 # you avoid some common bugs in your DPLL implementation's interface.
-from typing import Union, Dict, Set
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING, Union, Dict, List, Optional, Sequence, Set
 from defns import *
+from encoding import decode, negate
+from propagation import Propagator
+import proof
+from proof import Lemma, leaf
+from cdcl import analyze, lbd
+from config import Config
+from heuristics import Heuristic, make_heuristic
+from preprocess import Preprocessor
+from restarts import RestartPolicy, make_restarts
+from clausedb import ClauseDB
+from drat import ProofWriter
+from stats import Stats
+from limits import Budget, UNKNOWNResult
+if TYPE_CHECKING:
+    from portfolio import ClauseExchange
 
 # Take two proof trees and return the result of applying the resolve rule, which
 # results in a proof tree with the original two clauses as branches. Recall the
@@ -26,24 +43,15 @@ def resolve(c1: Clause, c2: Clause) -> ResolvedClause:
     # A implies B = !A || B
     # Find the variable (or, optionally, set of variables) that should be
     # resolved (FILL)
-    
-    if c1 is None:
-        print(c2, " c2")
-    elif c2 is None:
-        print(c1, "c1")
-    else:
-        print(c1)
-        print(c2)
-    
     result_literals = set()
     result_literals.update(c1.literals)
     result_literals.update(c2.literals)
     
         
     for lit in c1:
-        if Literal(lit.variable, (not lit.sign)) in c2:
+        if negate(lit) in c2:
             # Manually remove since set subtraction isnt working on frozen set
-            result_literals.discard(Literal(lit.variable, (not lit.sign)))
+            result_literals.discard(negate(lit))
             result_literals.discard(lit)
            # contained = True
             break      
@@ -60,58 +68,26 @@ def resolve(c1: Clause, c2: Clause) -> ResolvedClause:
     elif c2 is None:
         return ResolvedClause(result_literals, c1, c2)
     """  
-# The basic unit propagation algorithm is given in full, except for the
-# implementation of `resolve` above.
-
-# Propagate a single decision or inference and return the new formula.
-def unit_propagate_literal(formula: Set[Clause], unit: Clause) -> Set[Clause]:
-    new_formula: Set[Clause] = set()
-
-    # Get the literal that is being propagated
-    if len(unit) != 1:
-        raise Exception(f'Trying to propagate non-unit clause: {unit}')
-    literal = first(unit)
-
-    # Compute the new set of clauses
-    for clause in formula:
-        if literal in clause:
-            # Clause is satisfied, so we can ignore it
-            continue
-        elif -literal in clause:
-            # Negation is in the clause; this term won't be satisfied so we can
-            # remove it from the new clause
-            if clause is None:
-                print("clause is none")
-            elif unit is None:
-                print("unit is none")
-            new_formula.add(resolve(clause, unit))
-        else:
-            # The formula doesn't contain this variable, so we can leave it
-            # unchanged
-            new_formula.add(clause)
-
-    return new_formula
-
-# Get all the unit clauses in the formula
-def get_unit_clauses(formula: Set[Clause]) -> Set[Clause]:
-    return { c for c in formula if len(c) == 1 }
+# Unit propagation is done by the watched-literal `Propagator`, which only
+# visits the clauses watching a literal when that literal becomes false.
 
 # Propagate all unit clauses until no unit clauses are found and return the new
 # formula. Add the assignments that are propagated to the assignments dictionary
 # (mutated in-place).
-def unit_propagate(formula: Set[Clause], assignments: Dict[int, bool]) -> Set[Clause]:
-    while True:
-        unit_clauses = get_unit_clauses(formula)
-        if not unit_clauses:
-            break
-
-        for unit in unit_clauses:
-            formula = unit_propagate_literal(formula, unit)
-
-            literal = first(unit)
-            assignments[literal.variable] = literal.sign
+#
+# Satisfied clauses are dropped, and every remaining clause is replaced by a
+# proof of the clause with its false literals resolved away. If propagation
+# finds a conflict, the result contains a proof of the empty clause. The
+# clauses come back as a list, since putting proofs in a set would hash them
+# (see `Propagator.residual`).
+def unit_propagate(formula: Set[Clause], assignments: Dict[int, bool]) -> List[Clause]:
+    propagator = Propagator(formula)
+    conflict = propagator.propagate()
+    assignments.update(propagator.assignments())
 
-    return formula
+    if conflict is not None:
+        return [ propagator.conflict_proof(conflict) ]
+    return propagator.residual()
 
 # Given a clause (i.e. a proof tree), return a new clause (i.e. proof tree) that
 # does not contain any instance of the given assumption. Note that this may
@@ -128,120 +104,342 @@ def unit_propagate(formula: Set[Clause], assignments: Dict[int, bool]) -> Set[Cl
 # NOTE: You must re-resolve any resolved clause after you remove the assumption
 #       from its children.
 #
-def remove_assumption(assumption: Assumption, clause: Clause) -> Clause:
-    #always return clause when clause is not an instance of ResolvedClause
-   
-
-    if isinstance(clause, ResolvedClause):
-        if clause.clause1 == assumption:
-            if assumption is None:
-                print("assumption is none ln 125")
-            elif clause.clause2 is None:
-                print("clause2 is none ln 127")                
-            remove_assumption(assumption, clause.clause2)
-        elif clause.clause2 == assumption:
-            if assumption is None:
-                print("assumption is none ln 131")
-            elif clause.clause1 is None:
-                print("clause1 is none ln 133")   
-            remove_assumption(assumption, clause.clause1)
-        else:    
-            if assumption is None:
-                print("assumption is none ln137")
-            elif clause.clause1 is None:
-                print("clause1 is none ln 139") 
-            elif clause.clause2 is None:
-                print("clause2 is none ln 141")         
-            return resolve(remove_assumption(assumption, clause.clause1), remove_assumption(assumption, clause.clause2))
-    else:
-        return clause
-    
-    """
-    # Remove the assumption from the clause
-    # Using ResolvedClause as before in sat1
-    
-    # Extract the single literal from assumption
-    for l in assumption:
-        lit = l
-    
-    #Construct new set with everything in clause except for assumption
-    temp_collection = set()
-    for l in clause:
-        if l != lit:
-            temp_collection.add(l)
-    result = ResolvedClause(temp_collection)
-    return result
-    """
+# Proofs are shared DAGs (see proof.py): the rewrite visits each distinct node
+# once, keeps the subproofs that do not use the assumption as they are, and
+# memoizes its results across calls.
+def remove_assumption(assumption: Assumption, clause: Clause,
+                      stats: Optional[Stats] = None) -> Clause:
+    return proof.remove_assumption(assumption, clause, stats)
 
-# The core DPLL algorithm is given, except for the implementation of
-# `remove_assumption`.
+# The core DPLL algorithm. The search is iterative: assignments live on the
+# propagator's trail, grouped by decision level, and backtracking undoes them in
+# place instead of recursing on copies of the formula.
 
-# Pick a variable from the formula
-def select_variable(formula: Set[Clause]) -> int:
-    for clause in formula:
-        for literal in clause:
-            return literal.variable
-        
 # Starts the DPLL solving process, starting with no assignments. (Do not change
-# the input arguments or the return type of this method.)
-def dpll(formula: Set[Clause]) -> Union[SATResult, UNSATResult]:
-    return dpll_internal(formula, {})
+# the input arguments or the return type of this method.) An optional `Config`
+# selects how the search is done; only one with `limits` or `cancel` can make it
+# return an `UNKNOWNResult`.
+def dpll(formula: Set[Clause],
+         config: Optional[Config] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    return solve(Propagator(formula), config)
+
+# Solve a formula that has already been loaded into a `Propagator` (for
+# example straight from a DIMACS file, see `dimacs.load`). `exchange` shares
+# learned clauses with the other solvers of a portfolio (see `portfolio.py`).
+# The result carries the statistics of the search. With `config.limits` or
+# `config.cancel`, it can also be an `UNKNOWNResult` (see `limits.py`).
+def solve(propagator: Propagator, config: Optional[Config] = None,
+          exchange: Optional['ClauseExchange'] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    config = config or Config()
+    stats = _stats(config, propagator)
+    budget = Budget.start(config.limits, config.cancel, stats)
+
+    if config.proof_file is not None:
+        if config.local_search is not None:
+            raise ValueError('Local search cannot write a proof file')
+        # Only learned clauses are logged, and the ids in an LRAT proof refer
+        # to the clauses as they were loaded
+        if not config.learn or config.preprocess:
+            raise ValueError('A proof file can only be written with learn=True '
+                             'and without preprocessing')
+        with ProofWriter(config.proof_file, config.proof_format,
+                         config.binary_proof) as writer:
+            propagator.start_log(writer)
+            result = cdcl_internal(propagator, {}, config, exchange, budget)
+        return replace(result, stats=stats.snapshot())
+
+    preprocessor = None
+    if config.preprocess:
+        start = time.perf_counter()
+        preprocessor = Preprocessor(propagator)
+        propagator = preprocessor.run()
+        propagator.stats = stats
+        if stats.timing:
+            stats.time('preprocess', start)
+
+    if config.local_search is not None:
+        # NumPy is only needed for local search
+        from localsearch import local_search
+        result = local_search(propagator, config, budget)
+    elif config.learn:
+        result = cdcl_internal(propagator, {}, config, exchange, budget)
+    else:
+        result = dpll_internal(propagator, {}, config, budget)
+
+    # Assign the variables that preprocessing removed
+    if preprocessor is not None and result.sat():
+        preprocessor.reconstruct(result.assignments)
+    return replace(result, stats=stats.snapshot())
+
+# The search functions take either a set of clauses or a loaded `Propagator`
+Formula = Union[Set[Clause], Propagator]
+
+def _propagator(formula: Formula) -> Propagator:
+    return formula if isinstance(formula, Propagator) else Propagator(formula)
+
+# The branching heuristic that `config` asks for
+def _heuristic(config: Config, propagator: Propagator) -> Heuristic:
+    heuristic = make_heuristic(config.heuristic, propagator, config.seed, config.polarity)
+    heuristic.save_phases = (config.phase_saving if config.phase_saving is not None
+                             else config.restart != 'none')
+    if config.phase_init is not None:
+        from localsearch import initial_phases
+        for variable, value in initial_phases(propagator, config).items():
+            heuristic.phases[variable] = value
+    return heuristic
 
-def dpll_internal(formula: Set[Clause], assignments: Dict[int, bool]) -> Union[SATResult, UNSATResult]:
-    # Run DPLL on a given formula and return a `SATResult` or an `UNSATResult`.
+# The propagator's statistics, set up to time and report progress as `config`
+# asks
+def _stats(config: Config, propagator: Propagator) -> Stats:
+    stats = propagator.stats
+    stats.timing = config.stats
+    stats.progress = config.progress
+    stats.interval = config.progress_interval
+    return stats
 
-    # Perform unit propagation
-    formula = unit_propagate(formula, assignments)
+def dpll_internal(formula: Formula, assignments: Dict[int, bool],
+                  config: Optional[Config] = None,
+                  budget: Optional[Budget] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    # Run DPLL on a given formula and return a `SATResult` or an `UNSATResult`
+    # (or an `UNKNOWNResult`, if it runs out of budget).
+    config = config or Config()
+    propagator = _propagator(formula)
+    heuristic = _heuristic(config, propagator)
+    stats = propagator.stats
+    timing = stats.timing
+    if budget is None:
+        budget = Budget.start(config.limits, config.cancel, stats)
+    propagator.budget = budget
 
-    # If there are no more clauses, return a SATResult
-    if not formula:
+    while True:
+        # Perform unit propagation
+        if timing:
+            start = time.perf_counter()
+        conflict = propagator.propagate()
+        if timing:
+            stats.time('propagate', start)
+
+        if conflict is None:
+            if propagator.stopped is not None:
+                return UNKNOWNResult(propagator.stopped)
+            # Otherwise, pick a literal to branch on. If every variable has
+            # been assigned without a conflict, every clause is satisfied.
+            if timing:
+                start = time.perf_counter()
+            branch_on = heuristic.pick()
+            if timing:
+                stats.time('decide', start)
+            if branch_on is None:
+                assignments.update(propagator.assignments())
+                return SATResult(assignments)
+            if budget is not None:
+                reason = budget.exhausted()
+                if reason is not None:
+                    return UNKNOWNResult(reason)
+
+            # Assume the literal is true and keep propagating
+            propagator.decide(branch_on)
+            continue
+
+        heuristic.conflict(lit >> 1 for lit in propagator.arena.literals(conflict))
+        if stats.progress is not None:
+            stats.tick()
+        if budget is not None and propagator.decision_level() > 0:
+            reason = budget.exhausted()
+            if reason is not None:
+                return UNKNOWNResult(reason)
+        if timing:
+            start = time.perf_counter()
+
+        # We have derived the empty clause. Since ResolvedClauses are proof
+        # trees, this is a proof of the empty clause that may still depend on
+        # the assumptions made at each decision level.
+        proof = propagator.conflict_proof(conflict)
+
+        while True:
+            level = propagator.decision_level()
+            if level == 0:
+                # No assumptions are left, so the formula is UNSAT
+                if timing:
+                    stats.time('rewrite', start)
+                return UNSATResult(proof)
+
+            # Assuming the decision at this level produced UNSAT. Rewrite the
+            # proof of the empty clause without the assumption. This must
+            # result in either the empty clause or a proof that our assumption
+            # was false (i.e. a proof of the negation of our assumption).
+            decision = propagator.decision(level)
+            propagator.backtrack(level - 1)
+            proof = remove_assumption(Assumption(decode(decision)), proof, stats)
+
+            # If it is still a proof of the empty clause, the derivation was not
+            # contingent on our assumption, so we keep backtracking.
+            #
+            # NOTE: This is a taste for how CDCL makes things fast! We can skip
+            #       trying the false branch since we know that it will also be
+            #       UNSAT!
+            if len(proof) != 0:
+                break
+
+        # Otherwise, we have derived a proof of the opposite of our assumption,
+        # so it holds at the level below and we can continue solving from there.
+        if timing:
+            stats.time('rewrite', start)
+        propagator.assign(decision ^ 1, proof)
+
+# Conflict-driven clause learning. Instead of rewriting the proof for every
+# assumption on the way back up, each conflict is analyzed into a learned clause
+# (with its own resolution proof, see `cdcl.py`) and the search backjumps
+# straight to the level where that clause becomes unit.
+#
+# If the propagator is logging (see `Config.proof_file`), the learned clauses
+# are written to the proof file as they are found, and the result only holds a
+# `Lemma` pointing at the file.
+#
+# With an `exchange`, short learned clauses are exported to the other solvers of
+# a portfolio, and theirs are imported every `exchange.INTERVAL` conflicts by
+# restarting from level 0. Imported clauses are `Lemma` leaves in the proof.
+def cdcl_internal(formula: Formula, assignments: Dict[int, bool],
+                  config: Optional[Config] = None,
+                  exchange: Optional['ClauseExchange'] = None,
+                  budget: Optional[Budget] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    config = config or Config()
+    propagator = _propagator(formula)
+    heuristic = _heuristic(config, propagator)
+    clause_db = ClauseDB(propagator) if config.reduce_db else None
+    if budget is None:
+        budget = Budget.start(config.limits, config.cancel, propagator.stats)
+    result = cdcl_search(propagator, heuristic, make_restarts(config.restart),
+                         clause_db=clause_db, exchange=exchange, budget=budget)
+    if result.sat():
+        assignments.update(result.assignments)
         return SATResult(assignments)
+    return result
 
-    # If we have derived the unit clause, return an `UNSATResult` that
-    # references one of the empty clause that we have derived. Since
-    # ResolvedClauses are proof trees, this will be a proof of the empty clause.
-    for clause in formula:
-        if len(clause) == 0:
-            return UNSATResult(clause)
-
-    # Otherwise, pick a variable to branch on
-    branch_on = select_variable(formula)
-
-    # Add this assumption to the formula and try to solve
-    true_assumption = Assumption(Literal(branch_on, True))
-    true_result = dpll_internal(formula | { true_assumption }, assignments)
-
-    # If we now found a satisfying assignment, return it
-    if true_result.sat():
-        return true_result
-
-    # If assuming true produces UNSAT, we know that the true assignment is
-    # invalid; i.e. the assigning false must be valid or the given formula is
-    # UNSAT.
-    #
-    # Rewrite the proof of the empty clause that we derived when assuming true,
-    # but now remove the assumption. This must result in either the empty clause
-    # or a proof that our assumption was false (i.e. a proof of the negation of
-    # our assumption).
-    if true_assumption is None:
-        print("true_assumption is none ln 214")
-    elif true_result.clause is None:
-        print("true_assumption is none ln 216")
-    without_assumption = remove_assumption(true_assumption, true_result.clause)\
-
-    # If it is still a proof of the empty clause, we know that the derivation
-    # of the empty clause was not contingent on our assumption, so we can just
-    # return this new proof
-    #
-    # NOTE: This is a taste for how CDCL makes things fast! We can skip trying
-    #       the false branch since we know that it will also be UNSAT!
-    if len(without_assumption) == 0:      # ADDED NONE CHECK without_assumption is None or
-        return UNSATResult(without_assumption)
-    
-    # Otherwise, we have derived a proof of the opposite of our assumption, so
-    # we can now add it directly to the list of formulas and continue solving.
-    false_result = dpll_internal(formula | { without_assumption }, assignments)
+# The CDCL search loop, on a propagator and heuristic that may be reused across
+# calls (see `incremental.py`). Learned clauses only depend on the formula, so
+# they stay valid from one call to the next. `restarts` decides when to restart
+# the search from level 0 (see `restarts.py`), and `clause_db` which learned
+# clauses to keep (see `clausedb.py`).
+#
+# The search stops with an `UNKNOWNResult` once `budget` (if any) runs out.
+#
+# `assumptions` are packed literals that are decided, in order, before anything
+# else, one per decision level (a level stays empty if its assumption already
+# holds). If one of them turns out false, the result is a proof of the clause
+# that negates it and the assumptions it follows from, built by removing the
+# decided `Assumption`s from its unit proof.
+def cdcl_search(propagator: Propagator, heuristic: Heuristic,
+                restarts: Optional[RestartPolicy] = None,
+                assumptions: Sequence[int] = (),
+                clause_db: Optional[ClauseDB] = None,
+                exchange: Optional['ClauseExchange'] = None,
+                budget: Optional[Budget] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    restarts = restarts or RestartPolicy()
+    stats = propagator.stats
+    timing = stats.timing
+    conflicts = 0
+    propagator.budget = budget
+
+    while True:
+        if timing:
+            start = time.perf_counter()
+        conflict = propagator.propagate()
+        if timing:
+            stats.time('propagate', start)
+
+        if conflict is None:
+            if propagator.stopped is not None:
+                return UNKNOWNResult(propagator.stopped)
+            if restarts.due():
+                restarts.restarted()
+                if propagator.decision_level() > 0:
+                    stats.restarts += 1
+                    propagator.backtrack(0)
+                    continue
+
+            level = propagator.decision_level()
+            if level < len(assumptions):
+                lit = assumptions[level]
+                value = propagator.values[lit]
+                if value is False:
+                    return UNSATResult(_failed_proof(propagator, lit, assumptions[:level]))
+                if value:
+                    propagator.new_level()
+                else:
+                    propagator.decide(lit)
+                continue
+
+            if timing:
+                start = time.perf_counter()
+            branch_on = heuristic.pick()
+            if timing:
+                stats.time('decide', start)
+            if branch_on is None:
+                return SATResult(propagator.assignments())
+            if budget is not None:
+                reason = budget.exhausted()
+                if reason is not None:
+                    return UNKNOWNResult(reason)
+
+            propagator.decide(branch_on)
+            continue
+
+        # A conflict without any decisions means the formula is UNSAT. Every
+        # learned clause was derived from the formula alone, so this is a proof
+        # of the empty clause without assumptions.
+        if propagator.decision_level() == 0:
+            if propagator.log is not None:
+                propagator.log_conflict(conflict)
+                return UNSATResult(Lemma([], propagator.log.path))
+            return UNSATResult(propagator.conflict_proof(conflict))
+
+        if stats.progress is not None:
+            stats.tick()
+        if budget is not None:
+            reason = budget.exhausted()
+            if reason is not None:
+                return UNKNOWNResult(reason)
+        if timing:
+            start = time.perf_counter()
+        learnt, level, proof, hints, involved, antecedents = analyze(propagator, conflict)
+        heuristic.conflict(involved)
+        glue = lbd(propagator, learnt)
+        restarts.conflict(glue)
+        if clause_db is not None:
+            clause_db.bump(antecedents)
+            clause_db.conflict()
+        propagator.backtrack(level)
+        ref = propagator.learn(learnt, proof, hints)
+        if timing:
+            stats.time('analyze', start)
+        if clause_db is not None:
+            clause_db.learned(ref, glue)
+            if clause_db.due():
+                if timing:
+                    start = time.perf_counter()
+                clause_db.reduce()
+                if timing:
+                    stats.time('reduce', start)
+
+        conflicts += 1
+        if exchange is not None:
+            exchange.export(learnt)
+            if conflicts % exchange.INTERVAL == 0:
+                shared = exchange.collect()
+                if shared:
+                    propagator.backtrack(0)
+                    for lits in shared:
+                        propagator.add_literals(lits, leaf(Lemma(map(decode, lits),
+                                                                 exchange.SOURCE)))
 
-    # Either the false result is SAT, or the given formula is UNSAT. In either
-    # case, we just return the result.
-    return false_result
+# A proof that the assumption `lit`, which is false, is refuted by the formula
+# and the earlier assumptions: the clause of their negations
+def _failed_proof(propagator: Propagator, lit: int, earlier: Sequence[int]) -> Clause:
+    proof = propagator.unit_proof(lit >> 1)
+    if isinstance(proof, Assumption):
+        # `lit` contradicts an earlier assumption outright
+        return proof
+    for assumed in reversed(earlier):
+        proof = remove_assumption(Assumption(decode(assumed)), proof)
+    return proof
@@ -1,6 +1,10 @@
 from dpll import dpll
+from checker import proof_error
+from config import Config
+from heuristics import HEURISTICS, POLARITIES
+from restarts import RESTARTS
 from defns import *
-from typing import Set
+from typing import Dict, Iterable, Set
 from hypothesis import given, strategies as st, settings, event
 
 # NOTE: All the tests below are given; you only need to modify `validate_proof`.
@@ -17,11 +21,20 @@ def test_unsat():
     # equally-valid proof trees for a given formula.
     formula = cnf([ [1,2], [-1,2], [1,-2], [-1,-2] ])
     assert isinstance(dpll(formula), UNSATResult)
+    assert isinstance(dpll(formula, Config(learn=True)), UNSATResult)
 
 def test_sat():
     formula = cnf([ [1], [2], [2, 3] ])
     assert isinstance(dpll(formula), SATResult)
 
+def test_sat_many_decisions():
+    # Needs far more decision levels than Python's default recursion limit
+    formula = cnf([ [i, i + 1] for i in range(1, 3000) ])
+    result = dpll(formula)
+    assert isinstance(result, SATResult)
+    assert all(result.assignments[i] or result.assignments[i + 1]
+               for i in range(1, 3000))
+
 #########################################
 # Hypothesis PBT
 #########################################
@@ -71,8 +84,23 @@ formulas = st.iterables(axioms,
 @given(formulas)
 @settings(deadline=None, max_examples=MAX_EXAMPLES)
 def test_pbt(formula: Set[Axiom]):
-    result = dpll(formula)
-
+    check_result(formula, dpll(formula))
+
+configs = st.builds(Config,
+                    learn=st.booleans(),
+                    heuristic=st.sampled_from(sorted(HEURISTICS)),
+                    seed=st.none() | st.integers(0, 100),
+                    polarity=st.sampled_from(POLARITIES),
+                    restart=st.sampled_from(sorted(RESTARTS)),
+                    phase_saving=st.none() | st.booleans(),
+                    preprocess=st.booleans())
+
+@given(formulas, configs)
+@settings(deadline=None, max_examples=MAX_EXAMPLES // 5)
+def test_pbt_config(formula: Set[Axiom], config: Config):
+    check_result(formula, dpll(formula, config))
+
+def check_result(formula: Set[Axiom], result):
     if result.sat():
         event('sat') # Record a "sat" result for profiling and statistics
 
@@ -97,44 +125,26 @@ def test_pbt(formula: Set[Axiom]):
         # All validation must happen in the `validate_proof` method
         validate_proof(result.clause, formula)
 
+# Whether the assignments make some literal of every clause true
+def satisfies(assignments: Dict[int, bool], formula: Iterable[Clause]) -> bool:
+    return all(any(assignments[l.variable] == l.sign for l in clause) for clause in formula)
+
 # NOTE: Do not change the name or parameters of this method, or the autograder
 #       will not correctly evaluate your submission!
 def validate_proof(clause: Clause, original_formula: Set[Clause]):
-    # Recursively validate the proof tree, using `assert` statements.
+    # Validate the whole proof DAG, using `assert` statements.
     # What does it mean for a proof to be valid?
     # (1) It only uses valid axioms
     # (2) All resolved clauses are a valid application of the resolution rule.
-
-    if isinstance(clause, Axiom):
-        # What makes an Axiom valid to use in our proof? (FILL)
-        #assert  clause contains (x, -x)  
-        assert clause in original_formula     
-
-    elif isinstance(clause, ResolvedClause):
-        literals = clause.literals
-        clause1 = clause.clause1
-        clause2 = clause.clause2
-        
-        # assert literals - clause1 = !(assert literals - clause2)
-        count = 0
-        contained = False
-        for lit in clause1.literals:
-            if Literal(lit.variable, (not lit.sign)) in clause2:
-                contained = True
-                count += 1
-        if not contained:
-            print(clause1, " cls 1\n")
-            print(clause1, " cls 2")
-        assert contained is True
-        assert count == 1              
-        # What makes a ResolvedClause valid in our proof? (FILL)
-    else:
-        # NOTE: Our proof tree should not contain Assumptions, so we don't have
-        #       a case for that!
-        raise Exception(f'Expected ResolvedClause or Axiom, got {clause}')
+    #
+    # Each distinct node is checked once, without recursion (see checker.py).
+    # NOTE: Our proof tree should not contain Assumptions, so they are rejected.
+    error = proof_error(clause, original_formula)
+    assert error is None, error
 
 if __name__ == '__main__':
     test_sat()
     test_unsat()
     test_pbt()
+    test_pbt_config()
     print("Passes all test!")
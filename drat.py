@@ -0,0 +1,104 @@
+# Streaming DRAT and LRAT proof output.
+#
+# Instead of keeping a `ResolvedClause` proof tree in memory, the CDCL search
+# can write every learned (and deleted) clause to a proof file as it goes. Two
+# standard formats are supported, each as text or binary:
+#
+#   - DRAT lists the learned clauses, each of which can be checked by unit
+#     propagation (RUP) against the clauses before it, and the deleted ones:
+#
+#         1 -2 0
+#         d 3 4 -1 0
+#
+#   - LRAT also numbers every clause (the formula's clauses are numbered from 1
+#     in the order of the DIMACS file) and lists, for each learned clause, the
+#     clauses that unit propagation uses to derive it ("hints"), so checking is
+#     linear:
+#
+#         10 1 -2 0 3 7 9 0
+#         10 d 3 4 0
+#
+# The last learned clause of a refutation is the empty clause. Files in either
+# format can be checked by standard tools such as drat-trim or cake_lpr.
+
+from typing import BinaryIO, Iterable, List, Sequence
+from encoding import to_dimacs
+
+FORMATS = ('drat', 'lrat')
+
+# Variable-length encoding used by the binary formats: 7 bits per byte, least
+# significant first, with the high bit set on all but the last byte
+def _varint(n: int, out: bytearray) -> None:
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+# Packed literals (2 * variable + sign) to the binary encoding (see
+# `encoding.to_dimacs` for the text one)
+def _binary(lit: int) -> int:
+    # Binary DRAT uses 2 * variable + (1 if negative)
+    return lit ^ 1
+
+class ProofWriter:
+    def __init__(self, path: str, format: str = 'drat', binary: bool = False):
+        if format not in FORMATS:
+            raise ValueError(f'Unknown proof format: {format}')
+        self.path = path
+        self.lrat = format == 'lrat'
+        self.binary = binary
+        self.file: BinaryIO = open(path, 'wb', buffering=1 << 16)
+        # The id of the last clause that was added (needed by LRAT deletions)
+        self.last_id = 0
+
+    # Record a learned clause of packed literals. `id` and `hints` are only
+    # used by LRAT.
+    def add(self, lits: Sequence[int], id: int = 0, hints: Iterable[int] = ()) -> None:
+        self.last_id = max(self.last_id, id)
+        if self.binary:
+            out = bytearray(b'a')
+            if self.lrat:
+                _varint(2 * id, out)
+            for lit in lits:
+                _varint(_binary(lit), out)
+            out.append(0)
+            if self.lrat:
+                for hint in hints:
+                    _varint(2 * hint, out)
+                out.append(0)
+            self.file.write(out)
+        else:
+            fields: List[str] = []
+            if self.lrat:
+                fields.append(str(id))
+            fields.extend(str(to_dimacs(lit)) for lit in lits)
+            fields.append('0')
+            if self.lrat:
+                fields.extend(map(str, hints))
+                fields.append('0')
+            self.file.write((' '.join(fields) + '\n').encode())
+
+    # Record deleted clauses: LRAT identifies them by id, DRAT by literals
+    def delete(self, lits: Sequence[int], id: int = 0) -> None:
+        if self.binary:
+            out = bytearray(b'd')
+            if self.lrat:
+                _varint(2 * id, out)
+            else:
+                for lit in lits:
+                    _varint(_binary(lit), out)
+            out.append(0)
+            self.file.write(out)
+        elif self.lrat:
+            self.file.write(f'{self.last_id} d {id} 0\n'.encode())
+        else:
+            self.file.write(('d ' + ' '.join(str(to_dimacs(lit)) for lit in lits) + ' 0\n').encode())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> 'ProofWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
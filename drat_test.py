@@ -0,0 +1,167 @@
+import pytest
+from hypothesis import given, settings, strategies as st
+from typing import Dict, List, Tuple
+from config import Config
+from defns import *
+from dpll import solve
+from drat import ProofWriter
+from encoding import from_dimacs
+from generators import pigeonhole
+from proof import Lemma
+from propagation import Propagator
+
+# Parse a proof file into steps ('a' or 'd', id, DIMACS literals, hints)
+def read_proof(path: str, lrat: bool, binary: bool) -> List[Tuple[str, int, List[int], List[int]]]:
+    data = open(path, 'rb').read()
+    steps = []
+    if binary:
+        position = 0
+        def number() -> int:
+            nonlocal position
+            n, shift = 0, 0
+            while True:
+                byte = data[position]
+                position += 1
+                n |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    return n
+        def numbers() -> List[int]:
+            result = []
+            while True:
+                n = number()
+                if n == 0:
+                    return result
+                result.append(n >> 1 if n & 1 == 0 else -(n >> 1))
+        while position < len(data):
+            kind = chr(data[position])
+            position += 1
+            id = number() >> 1 if lrat else 0
+            if kind == 'd' and lrat:
+                steps.append((kind, id, [], numbers()))
+            else:
+                lits = numbers()
+                hints = numbers() if lrat and kind == 'a' else []
+                steps.append((kind, id, lits, hints))
+        return steps
+
+    for line in data.decode().splitlines():
+        fields = line.split()
+        if lrat:
+            id = int(fields[0])
+            if fields[1] == 'd':
+                steps.append(('d', id, [], [ int(f) for f in fields[2:-1] ]))
+            else:
+                ints = list(map(int, fields[1:]))
+                end = ints.index(0)
+                steps.append(('a', id, ints[:end], ints[end + 1:-1]))
+        elif fields[0] == 'd':
+            steps.append(('d', 0, [ int(f) for f in fields[1:-1] ], []))
+        else:
+            steps.append(('a', 0, [ int(f) for f in fields[:-1] ], []))
+    return steps
+
+# Whether unit propagation on `clauses` plus the negation of `lemma` conflicts
+def rup(clauses: List[List[int]], lemma: List[int]) -> bool:
+    true = { -l for l in lemma }
+    changed = True
+    while changed:
+        changed = False
+        for clause in clauses:
+            if any(l in true for l in clause):
+                continue
+            open_lits = [ l for l in clause if -l not in true ]
+            if not open_lits:
+                return True
+            if len(open_lits) == 1:
+                true.add(open_lits[0])
+                changed = True
+    return False
+
+def check_drat(formula: List[List[int]], path: str, binary: bool = False) -> None:
+    clauses = [ list(c) for c in formula ]
+    steps = read_proof(path, False, binary)
+    for kind, _, lits, _ in steps:
+        if kind == 'd':
+            # The solver may have reordered the clause's literals
+            clauses.remove(next(c for c in clauses if set(c) == set(lits)))
+            continue
+        assert rup(clauses, lits), lits
+        clauses.append(lits)
+    assert steps and steps[-1][2] == []
+
+def check_lrat(formula: List[List[int]], path: str, binary: bool = False) -> None:
+    clauses: Dict[int, List[int]] = dict(enumerate(formula, start=1))
+    steps = read_proof(path, True, binary)
+    for kind, id, lits, hints in steps:
+        if kind == 'd':
+            for hint in hints:
+                del clauses[hint]
+            continue
+        assert id > max(clauses)
+        true = { -l for l in lits }
+        for n, hint in enumerate(hints):
+            open_lits = [ l for l in clauses[hint] if -l not in true ]
+            if n == len(hints) - 1:
+                assert open_lits == [], (id, hint)
+            else:
+                assert len(open_lits) == 1, (id, hint)
+                true.add(open_lits[0])
+        clauses[id] = lits
+    assert steps and steps[-1][2] == []
+
+def propagator(formula: List[List[int]]) -> Propagator:
+    p = Propagator()
+    for clause in formula:
+        p.add_literals(list(map(from_dimacs, clause)))
+    return p
+
+@pytest.mark.parametrize('format', [ 'drat', 'lrat' ])
+@pytest.mark.parametrize('binary', [ False, True ])
+def test_pigeonhole(tmp_path, format, binary):
+    formula = pigeonhole(4)
+    path = str(tmp_path / 'proof')
+    config = Config(learn=True, heuristic='vsids', proof_file=path,
+                    proof_format=format, binary_proof=binary)
+    result = solve(propagator(formula), config)
+    assert result == UNSATResult(Lemma([], path))
+    (check_lrat if format == 'lrat' else check_drat)(formula, path, binary)
+
+def test_ids_count_dropped_tautologies(tmp_path):
+    formula = [ [1, -1], [1, 2], [-1, 2], [3, -3, 2], [1, -2], [-1, -2] ]
+    path = str(tmp_path / 'proof.lrat')
+    result = solve(propagator(formula), Config(learn=True, proof_file=path, proof_format='lrat'))
+    assert not result.sat()
+    check_lrat(formula, path)
+
+def test_empty_clause_in_formula(tmp_path):
+    path = str(tmp_path / 'proof.lrat')
+    solve(propagator([ [1, 2], [] ]), Config(learn=True, proof_file=path, proof_format='lrat'))
+    assert open(path).read() == '3 0 2 0\n'
+
+def test_requires_learn(tmp_path):
+    with pytest.raises(ValueError):
+        solve(propagator([ [1] ]), Config(proof_file=str(tmp_path / 'proof')))
+    with pytest.raises(ValueError):
+        ProofWriter(str(tmp_path / 'proof'), 'lrup')
+
+def test_deletions(tmp_path):
+    path = str(tmp_path / 'proof')
+    with ProofWriter(path, 'lrat') as writer:
+        writer.add([ 3, 4 ], 5, [ 1, 2 ])
+        writer.delete([ 3, 4 ], 2)
+    assert open(path).read() == '5 1 -2 0 1 2 0\n5 d 2 0\n'
+
+clauses = st.lists(st.integers(1, 8).flatmap(lambda v: st.sampled_from([ v, -v ])),
+                   min_size=1, max_size=4, unique_by=abs)
+
+@given(st.lists(clauses, min_size=10, max_size=60), st.sampled_from([ 'drat', 'lrat' ]),
+       st.booleans())
+@settings(max_examples=200, deadline=None)
+def test_pbt_proofs(tmp_path_factory, formula, format, binary):
+    path = str(tmp_path_factory.mktemp('proof') / 'proof')
+    config = Config(learn=True, heuristic='vsids', proof_file=path,
+                    proof_format=format, binary_proof=binary)
+    result = solve(propagator(formula), config)
+    if not result.sat():
+        (check_lrat if format == 'lrat' else check_drat)(formula, path, binary)
@@ -0,0 +1,147 @@
+# Compact integer encoding of literals and clauses, used inside the solver.
+#
+# The public `Literal` and `Clause` classes are convenient, but they are
+# objects: negating a `Literal` allocates a new one, and every `Clause` carries
+# a `frozenset`. Inside the solver a literal is instead packed into one int,
+#
+#     2 * variable + sign
+#
+# so the negation of a literal is `lit ^ 1` and its variable is `lit >> 1`.
+# Clauses are stored back to back in one flat `ClauseArena`.
+#
+# `encode` and `decode` convert between the two representations at the API
+# boundary. `decode` hands out shared `Literal` instances, so converting back
+# and forth does not allocate.
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence
+from defns import *
+
+def encode(literal: Literal) -> int:
+    return (literal.variable << 1) | literal.sign
+
+# Shared `Literal` instances, indexed by their encoding
+_literals: List[Literal] = []
+
+def decode(lit: int) -> Literal:
+    if lit >= len(_literals):
+        for i in range(len(_literals), (lit | 1) + 1):
+            _literals.append(Literal(i >> 1, bool(i & 1)) if i >= 2 else None)
+    return _literals[lit]
+
+# The negation of a `Literal`, without allocating a new one
+def negate(literal: Literal) -> Literal:
+    return decode(encode(literal) ^ 1)
+
+# Conversions from and to the signed integers used by DIMACS and `cnf`
+def from_dimacs(n: int) -> int:
+    return (abs(n) << 1) | (n > 0)
+
+def to_dimacs(lit: int) -> int:
+    return lit >> 1 if lit & 1 else -(lit >> 1)
+
+# A flat store of clauses. Each clause is laid out as its size followed by its
+# literals:
+#
+#     [ 3, l1, l2, l3, 2, l4, l5, ... ]
+#
+# and is referred to by the offset of its size (its "ref"). The literals of a
+# clause can be reordered in place, which the watched-literal propagator uses
+# to keep its two watched literals at the front.
+#
+# Deleting a clause only flips its size to `~size`, so that iterating skips it;
+# the space it took is reclaimed by `compact`, which moves every remaining
+# clause down and returns where each one went.
+class ClauseArena:
+    def __init__(self, capacity: int = 0):
+        # Space can be reserved up front (e.g. from a DIMACS header) so that
+        # adding clauses does not repeatedly grow the array; `end` marks how
+        # much of it is in use.
+        self.data = array('i', bytes(capacity * 4))
+        self.end = 0
+        self.count = 0
+        # How much of the array is taken up by deleted clauses
+        self.garbage = 0
+
+    # Append a clause and return its ref
+    def add(self, lits: Sequence[int]) -> int:
+        ref = self.end
+        self.end = ref + len(lits) + 1
+        if self.end <= len(self.data):
+            self.data[ref] = len(lits)
+            self.data[ref + 1:self.end] = array('i', lits)
+        else:
+            del self.data[ref:]
+            self.data.append(len(lits))
+            self.data.extend(lits)
+        self.count += 1
+        return ref
+
+    # Append clauses already laid out as in the arena (native-endian 32-bit
+    # ints, e.g. from a CNF cache, see `cnfcache.py`) with a single copy.
+    # Returns the ref of the first.
+    def extend(self, block, count: int) -> int:
+        ref = self.end
+        del self.data[ref:]
+        self.data.frombytes(memoryview(block).cast('B'))
+        self.end = len(self.data)
+        self.count += count
+        return ref
+
+    def size(self, ref: int) -> int:
+        return self.data[ref]
+
+    def literals(self, ref: int) -> array:
+        return self.data[ref + 1:ref + 1 + self.data[ref]]
+
+    # Iterate over the refs of every clause, in the order they were added
+    def refs(self) -> Iterator[int]:
+        data = self.data
+        ref = 0
+        while ref < self.end:
+            size = data[ref]
+            if size < 0:
+                ref += ~size + 1
+                continue
+            yield ref
+            ref += size + 1
+
+    def delete(self, ref: int) -> None:
+        size = self.data[ref]
+        self.data[ref] = ~size
+        self.count -= 1
+        self.garbage += size + 1
+
+    # Move the clauses down over the deleted ones. Returns the new ref of every
+    # clause that moved.
+    def compact(self) -> Dict[int, int]:
+        data = self.data
+        moved: Dict[int, int] = {}
+        ref = end = 0
+        while ref < self.end:
+            size = data[ref]
+            if size < 0:
+                ref += ~size + 1
+                continue
+            if ref != end:
+                data[end:end + size + 1] = data[ref:ref + size + 1]
+                moved[ref] = end
+            ref += size + 1
+            end += size + 1
+        self.end = end
+        self.garbage = 0
+        return moved
+
+    def __len__(self) -> int:
+        return self.count
+
+    # Convert a stored clause back to an `Axiom`
+    def axiom(self, ref: int) -> Axiom:
+        return Axiom(map(decode, self.literals(ref)))
+
+# Encode a collection of public clauses into a new arena
+def encode_clauses(clauses: Iterable[Clause]) -> ClauseArena:
+    arena = ClauseArena()
+    for clause in clauses:
+        arena.add([ encode(l) for l in clause ])
+    return arena
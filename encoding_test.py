@@ -0,0 +1,51 @@
+from hypothesis import given, settings, strategies as st
+from defns import *
+from encoding import (ClauseArena, decode, encode, encode_clauses, from_dimacs, negate,
+                      to_dimacs)
+
+@given(st.integers(1, 10_000), st.booleans())
+def test_encode_decode_round_trip(variable, sign):
+    literal = Literal(variable, sign)
+    lit = encode(literal)
+    assert decode(lit) == literal and lit >> 1 == variable and lit & 1 == sign
+    assert decode(lit ^ 1) == negate(literal) == Literal(variable, not sign)
+    # Decoding hands out shared instances
+    assert decode(lit) is decode(lit)
+    n = variable if sign else -variable
+    assert from_dimacs(n) == lit and to_dimacs(lit) == n
+
+def test_encode_clauses():
+    clauses = cnf([ [1, -2], [3], [-1, 2, 4] ])
+    arena = encode_clauses(clauses)
+    assert len(arena) == 3
+    assert { arena.axiom(ref) for ref in arena.refs() } == set(clauses)
+
+clauses = st.lists(st.lists(st.integers(2, 40), min_size=1, max_size=6), max_size=30)
+
+@given(clauses, st.data())
+@settings(max_examples=200, deadline=None)
+def test_delete_and_compact(clauses, data):
+    arena = ClauseArena(capacity=data.draw(st.integers(0, 50)))
+    refs = [ arena.add(clause) for clause in clauses ]
+    assert list(arena.refs()) == refs
+    assert [ list(arena.literals(ref)) for ref in refs ] == clauses
+
+    deleted = data.draw(st.sets(st.sampled_from(range(len(clauses))))) if clauses else set()
+    for i in deleted:
+        arena.delete(refs[i])
+    kept = [ i for i in range(len(clauses)) if i not in deleted ]
+    assert list(arena.refs()) == [ refs[i] for i in kept ]
+    assert len(arena) == len(kept)
+    assert arena.garbage == sum(len(clauses[i]) + 1 for i in deleted)
+
+    moved = arena.compact()
+    new_refs = [ moved.get(refs[i], refs[i]) for i in kept ]
+    assert list(arena.refs()) == new_refs
+    assert [ list(arena.literals(ref)) for ref in new_refs ] == [ clauses[i] for i in kept ]
+    assert arena.garbage == 0 and arena.end == sum(len(clauses[i]) + 1 for i in kept)
+    # Only clauses that actually moved are reported
+    assert all(old != new for old, new in moved.items())
+
+    # The arena keeps working after compacting
+    ref = arena.add([ 2, 5 ])
+    assert list(arena.refs())[-1] == ref and list(arena.literals(ref)) == [ 2, 5 ]
@@ -0,0 +1,97 @@
+# Seeded generators of benchmark formulas.
+#
+# Every generator returns a formula as a list of clauses of DIMACS ints (see
+# `to_clauses` and `write_dimacs` to convert it), and is deterministic for a
+# given seed, so benchmark runs can be compared with each other (see
+# `bench.py`). The families are
+#
+#   - `random_ksat`: uniform random k-SAT, by default at the satisfiability
+#     phase transition, where random formulas are hardest
+#   - `pigeonhole`: n + 1 pigeons in n holes, UNSAT and exponentially hard for
+#     resolution
+#   - `coloring`: k-coloring of a random graph
+#   - `parity`: XOR constraints chained through auxiliary variables; two
+#     conflicting encodings of the same XOR make an UNSAT formula that is
+#     hard without reasoning about parity
+
+import random
+from typing import List, Set
+from defns import *
+
+Formula = List[List[int]]
+
+# The clause-to-variable ratio at which random k-SAT goes from mostly SAT to
+# mostly UNSAT
+PHASE_TRANSITION = { 3: 4.26, 4: 9.93, 5: 21.12 }
+
+def random_ksat(num_vars: int, k: int = 3, ratio: float = 0, seed: int = 0) -> Formula:
+    rng = random.Random(seed)
+    ratio = ratio or PHASE_TRANSITION.get(k, 2 ** k * 0.69)
+    return [ [ v if rng.random() < 0.5 else -v for v in rng.sample(range(1, num_vars + 1), k) ]
+             for _ in range(round(ratio * num_vars)) ]
+
+def pigeonhole(holes: int) -> Formula:
+    var = lambda p, h: p * holes + h + 1
+    # Every pigeon is in some hole...
+    formula = [ [ var(p, h) for h in range(holes) ] for p in range(holes + 1) ]
+    # ...and no two pigeons share one
+    formula += [ [ -var(p, h), -var(q, h) ]
+                 for h in range(holes) for p in range(holes + 1) for q in range(p) ]
+    return formula
+
+# Color a random graph with `num_vertices` vertices and about `degree` edges per
+# vertex with `colors` colors
+def coloring(num_vertices: int, colors: int = 3, degree: float = 4.6,
+             seed: int = 0) -> Formula:
+    rng = random.Random(seed)
+    edges: Set[tuple] = set()
+    target = min(round(num_vertices * degree / 2), num_vertices * (num_vertices - 1) // 2)
+    while len(edges) < target:
+        u, v = rng.sample(range(num_vertices), 2)
+        edges.add((min(u, v), max(u, v)))
+
+    var = lambda vertex, color: vertex * colors + color + 1
+    # Every vertex has a color, at most one, and no edge joins two vertices of
+    # the same color
+    formula = [ [ var(v, c) for c in range(colors) ] for v in range(num_vertices) ]
+    formula += [ [ -var(v, c), -var(v, d) ]
+                 for v in range(num_vertices) for c in range(colors) for d in range(c) ]
+    formula += [ [ -var(u, c), -var(v, c) ] for u, v in sorted(edges) for c in range(colors) ]
+    return formula
+
+# Clauses for `x1 ^ ... ^ xn = parity`, with an auxiliary variable (numbered
+# from `next_var`) for each prefix of the XOR
+def _xor_chain(variables: List[int], parity: bool, next_var: int) -> Formula:
+    formula: Formula = []
+    current = variables[0]
+    for v in variables[1:]:
+        # aux <-> current ^ v
+        aux = next_var
+        next_var += 1
+        formula += [ [ -aux, current, v ], [ -aux, -current, -v ],
+                     [ aux, -current, v ], [ aux, current, -v ] ]
+        current = aux
+    formula.append([ current if parity else -current ])
+    return formula
+
+# An XOR of `num_vars` variables, encoded twice in different random orders.
+# The two encodings agree (SAT) or require opposite parities (UNSAT).
+def parity(num_vars: int, satisfiable: bool = False, seed: int = 0) -> Formula:
+    rng = random.Random(seed)
+    variables = list(range(1, num_vars + 1))
+    value = rng.random() < 0.5
+    formula = _xor_chain(variables, value, num_vars + 1)
+    rng.shuffle(variables)
+    formula += _xor_chain(variables, value if satisfiable else not value, 2 * num_vars)
+    return formula
+
+# A formula as a set of public `Clause`s, for `dpll`
+def to_clauses(formula: Formula) -> Set[Clause]:
+    return cnf(formula)
+
+def write_dimacs(formula: Formula, path: str) -> None:
+    num_vars = max((abs(l) for clause in formula for l in clause), default=0)
+    with open(path, 'w') as f:
+        f.write(f'p cnf {num_vars} {len(formula)}\n')
+        for clause in formula:
+            f.write(' '.join(map(str, clause)) + ' 0\n')
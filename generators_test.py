@@ -0,0 +1,64 @@
+import pytest
+from config import Config
+from checker import check_refutation
+from defns import *
+from dpll import dpll
+from generators import (PHASE_TRANSITION, coloring, parity, pigeonhole, random_ksat,
+                        to_clauses, write_dimacs)
+from dimacs import DimacsReader
+
+def check(formula, sat: bool):
+    clauses = to_clauses(formula)
+    result = dpll(clauses, Config(learn=True, heuristic='vsids'))
+    assert result.sat() == sat
+    if sat:
+        for clause in formula:
+            assert any(result.assignments.get(abs(l)) == (l > 0) for l in clause)
+    else:
+        check_refutation(result.clause, clauses)
+
+def test_random_ksat_shape():
+    formula = random_ksat(50, seed=3)
+    assert len(formula) == round(50 * PHASE_TRANSITION[3])
+    for clause in formula:
+        assert len(clause) == 3 and len({ abs(l) for l in clause }) == 3
+        assert all(1 <= abs(l) <= 50 for l in clause)
+    assert len(random_ksat(20, k=4, ratio=2.0)[0]) == 4
+    assert len(random_ksat(20, k=4, ratio=2.0)) == 40
+
+def test_seeded():
+    assert random_ksat(30, seed=1) == random_ksat(30, seed=1)
+    assert random_ksat(30, seed=1) != random_ksat(30, seed=2)
+    assert coloring(20, seed=1) == coloring(20, seed=1)
+    assert parity(10, seed=1) == parity(10, seed=1)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_ksat(seed):
+    formula = random_ksat(40, seed=seed)
+    clauses = to_clauses(formula)
+    check(formula, dpll(clauses, Config(learn=True)).sat())
+
+@pytest.mark.parametrize('holes', [ 1, 2, 3, 4 ])
+def test_pigeonhole(holes):
+    check(pigeonhole(holes), False)
+
+def test_coloring():
+    # Two colors are not enough for a triangle, three are
+    triangle = coloring(3, colors=2, degree=2)
+    assert len(triangle) == 3 + 3 + 3 * 2
+    check(triangle, False)
+    check(coloring(3, colors=3, degree=2), True)
+    # A graph with few edges is easy to color
+    check(coloring(30, colors=3, degree=1, seed=1), True)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_parity(seed):
+    check(parity(8, satisfiable=True, seed=seed), True)
+    check(parity(8, seed=seed), False)
+
+def test_write_dimacs(tmp_path):
+    formula = pigeonhole(3)
+    path = str(tmp_path / 'php.cnf')
+    write_dimacs(formula, path)
+    assert open(path).readline() == f'p cnf 12 {len(formula)}\n'
+    assert list(DimacsReader(path)) == formula
@@ -0,0 +1,258 @@
+# Branching heuristics: which variable to decide on next, and with which sign.
+#
+# Every heuristic keeps the unassigned variables in a binary heap ordered by a
+# score, so picking the best variable costs O(log n) instead of a scan over the
+# formula. Assigned variables are dropped lazily when they reach the top of the
+# heap, and the propagator hands unassigned variables back on backtrack.
+#
+# The available heuristics are
+#
+#   - 'first': the order in which variables first appear in the formula,
+#     always assuming true (the classic choice made by `dpll`)
+#   - 'moms': Maximum Occurrences in clauses of Minimum Size
+#   - 'jw': two-sided Jeroslow-Wang, weighting each occurrence by 2^-|clause|
+#   - 'vsids': conflict-driven variable activity (EVSIDS); every conflict bumps
+#     the activity of the variables involved, and older bumps decay
+#     exponentially
+#
+# 'first', 'moms' and 'jw' score the formula once up front; 'vsids' keeps
+# learning from the search.
+#
+# Any heuristic can also be randomized with a seed, which perturbs the initial
+# scores (so ties and near-ties are broken differently), and its choice of sign
+# can be overridden by a fixed polarity. This is how the solvers of a portfolio
+# (see `portfolio.py`) are made to search differently.
+#
+# With phase saving, a variable that is unassigned by a backtrack keeps the sign
+# it had as its phase, so it is decided the same way the next time (see
+# `restarts.py`).
+
+import random
+from typing import Dict, Iterable, List, Optional
+from propagation import Propagator
+
+# 'default' keeps each heuristic's own choice of sign
+POLARITIES = ('default', 'true', 'false', 'random')
+
+# An indexed binary max-heap of variables, ordered by `scores[variable]`.
+# `index` tracks each variable's position so that a variable whose score
+# increases can be moved up in place.
+class VariableHeap:
+    def __init__(self, scores: List[float]):
+        self.scores = scores
+        self.heap: List[int] = []
+        self.index: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, variable: int) -> bool:
+        return variable in self.index
+
+    def push(self, variable: int) -> None:
+        if variable in self.index:
+            return
+        self.heap.append(variable)
+        self.index[variable] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def pop(self) -> int:
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        del self.index[top]
+        if heap:
+            heap[0] = last
+            self.index[last] = 0
+            self._sift_down(0)
+        return top
+
+    # Restore the heap order after the score of `variable` increased
+    def increased(self, variable: int) -> None:
+        position = self.index.get(variable)
+        if position is not None:
+            self._sift_up(position)
+
+    def _sift_up(self, position: int) -> None:
+        heap, index, scores = self.heap, self.index, self.scores
+        variable = heap[position]
+        score = scores[variable]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if scores[heap[parent]] >= score:
+                break
+            heap[position] = heap[parent]
+            index[heap[position]] = position
+            position = parent
+        heap[position] = variable
+        index[variable] = position
+
+    def _sift_down(self, position: int) -> None:
+        heap, index, scores = self.heap, self.index, self.scores
+        variable = heap[position]
+        score = scores[variable]
+        size = len(heap)
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and scores[heap[child + 1]] > scores[heap[child]]:
+                child += 1
+            if scores[heap[child]] <= score:
+                break
+            heap[position] = heap[child]
+            index[heap[position]] = position
+            position = child
+        heap[position] = variable
+        index[variable] = position
+
+class Heuristic:
+    # How much a seed perturbs the initial scores, relative to the scores
+    JITTER = 0.1
+
+    def __init__(self, propagator: Propagator, seed: Optional[int] = None,
+                 polarity: str = 'default'):
+        self.propagator = propagator
+        # Remember the sign of each unassigned variable (see `unassigned`)
+        self.save_phases = False
+        # Score and preferred sign of each variable
+        self.scores: List[float] = [ 0.0 ] * (propagator.num_vars + 1)
+        self.phases: List[bool] = [ True ] * (propagator.num_vars + 1)
+        self.score()
+        self.randomize(seed, polarity)
+
+        self.heap = VariableHeap(self.scores)
+        for variable in propagator.variables:
+            self.heap.push(variable)
+        propagator.on_backtrack = self.unassigned
+
+    # Compute the initial scores and phases
+    def score(self) -> None:
+        pass
+
+    def randomize(self, seed: Optional[int], polarity: str) -> None:
+        rng = random.Random(seed)
+        if seed is not None:
+            # Scale each score by up to 1 + JITTER, and offset it by less than
+            # JITTER so that zero scores are shuffled too
+            for variable in self.propagator.variables:
+                self.scores[variable] = (self.scores[variable] * (1 + self.JITTER * rng.random())
+                                         + self.JITTER * rng.random())
+        if polarity == 'random':
+            self.phases = [ rng.random() < 0.5 for _ in self.phases ]
+        elif polarity != 'default':
+            self.phases = [ polarity == 'true' ] * len(self.phases)
+
+    # The literal to decide on next, or None if every variable is assigned
+    def pick(self) -> Optional[int]:
+        heap, propagator = self.heap, self.propagator
+        while heap:
+            variable = heap.pop()
+            if not propagator.is_assigned(variable):
+                return (variable << 1) | self.phases[variable]
+        return None
+
+    # Start tracking variables that were added to the formula after the
+    # heuristic was created
+    def extend(self, variables: Iterable[int]) -> None:
+        extra = self.propagator.num_vars + 1 - len(self.scores)
+        if extra > 0:
+            self.scores.extend([ 0.0 ] * extra)
+            self.phases.extend([ self.phases[0] ] * extra)
+        for variable in variables:
+            if not self.propagator.is_assigned(variable):
+                self.heap.push(variable)
+
+    # Put variables back into the heap once they are unassigned
+    def unassigned(self, lits: Iterable[int]) -> None:
+        push = self.heap.push
+        if self.save_phases:
+            phases = self.phases
+            for lit in lits:
+                phases[lit >> 1] = bool(lit & 1)
+                push(lit >> 1)
+        else:
+            for lit in lits:
+                push(lit >> 1)
+
+    # Called with the variables involved in each conflict
+    def conflict(self, variables: Iterable[int]) -> None:
+        pass
+
+class FirstHeuristic(Heuristic):
+    def score(self) -> None:
+        count = len(self.propagator.variables)
+        for position, variable in enumerate(self.propagator.variables):
+            self.scores[variable] = count - position
+
+# Count the occurrences of each literal, weighting a clause by `weight(size)`
+def _occurrences(propagator: Propagator, weight) -> List[float]:
+    arena = propagator.arena
+    counts = [ 0.0 ] * (2 * propagator.num_vars + 2)
+    for ref in arena.refs():
+        w = weight(arena.size(ref))
+        if w:
+            for lit in arena.literals(ref):
+                counts[lit] += w
+    return counts
+
+class MOMSHeuristic(Heuristic):
+    WEIGHT = 1 << 10
+
+    def score(self) -> None:
+        arena = self.propagator.arena
+        sizes = [ arena.size(ref) for ref in arena.refs() if arena.size(ref) > 1 ]
+        smallest = min(sizes, default=0)
+        counts = _occurrences(self.propagator, lambda size: size == smallest)
+        for variable in self.propagator.variables:
+            pos, neg = counts[(variable << 1) | 1], counts[variable << 1]
+            self.scores[variable] = (pos + neg) * self.WEIGHT + pos * neg
+            self.phases[variable] = pos >= neg
+
+class JeroslowWangHeuristic(Heuristic):
+    def score(self) -> None:
+        counts = _occurrences(self.propagator, lambda size: 2.0 ** -size)
+        for variable in self.propagator.variables:
+            pos, neg = counts[(variable << 1) | 1], counts[variable << 1]
+            self.scores[variable] = pos + neg
+            self.phases[variable] = pos >= neg
+
+class VSIDSHeuristic(Heuristic):
+    DECAY = 0.95
+    RESCALE = 1e100
+
+    def __init__(self, propagator: Propagator, seed: Optional[int] = None,
+                 polarity: str = 'default'):
+        self.increment = 1.0
+        super().__init__(propagator, seed, polarity)
+
+    def conflict(self, variables: Iterable[int]) -> None:
+        scores, heap = self.scores, self.heap
+        for variable in variables:
+            scores[variable] += self.increment
+            heap.increased(variable)
+            if scores[variable] > self.RESCALE:
+                self._rescale()
+        # Bumping by an ever larger amount is equivalent to decaying every
+        # other activity
+        self.increment /= self.DECAY
+
+    def _rescale(self) -> None:
+        for variable in range(len(self.scores)):
+            self.scores[variable] /= self.RESCALE
+        self.increment /= self.RESCALE
+
+HEURISTICS = {
+    'first': FirstHeuristic,
+    'moms': MOMSHeuristic,
+    'jw': JeroslowWangHeuristic,
+    'vsids': VSIDSHeuristic,
+}
+
+def make_heuristic(name: str, propagator: Propagator, seed: Optional[int] = None,
+                   polarity: str = 'default') -> Heuristic:
+    if name not in HEURISTICS:
+        raise ValueError(f'Unknown branching heuristic: {name}')
+    if polarity not in POLARITIES:
+        raise ValueError(f'Unknown polarity: {polarity}')
+    return HEURISTICS[name](propagator, seed, polarity)
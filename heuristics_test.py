@@ -0,0 +1,85 @@
+from hypothesis import given, settings, strategies as st
+from defns import *
+from heuristics import VariableHeap, make_heuristic
+from propagation import Propagator
+
+def pop_all(heap):
+    return [ heap.pop() for _ in range(len(heap)) ]
+
+def check_index(heap):
+    assert all(heap.index[variable] == position for position, variable in enumerate(heap.heap))
+
+@given(st.lists(st.floats(0, 100), min_size=1, max_size=50),
+       st.lists(st.tuples(st.integers(0, 49), st.floats(0, 100)), max_size=50))
+@settings(max_examples=200, deadline=None)
+def test_heap_order_after_increases(scores, bumps):
+    scores = [ 0.0 ] + scores
+    heap = VariableHeap(scores)
+    for variable in range(1, len(scores)):
+        heap.push(variable)
+        heap.push(variable)
+    for variable, amount in bumps:
+        variable = variable % (len(scores) - 1) + 1
+        scores[variable] += amount
+        heap.increased(variable)
+        check_index(heap)
+    order = pop_all(heap)
+    assert sorted(order) == list(range(1, len(scores)))
+    assert all(scores[a] >= scores[b] for a, b in zip(order, order[1:]))
+
+def test_heap_pop_and_push_back():
+    scores = [ 0.0, 5.0, 1.0, 4.0, 3.0, 2.0 ]
+    heap = VariableHeap(scores)
+    for variable in range(1, 6):
+        heap.push(variable)
+    assert [ heap.pop(), heap.pop() ] == [ 1, 3 ]
+    assert 1 not in heap and 4 in heap
+    check_index(heap)
+    # Popped variables come back in order, even after their scores changed
+    scores[3] = 0.5
+    heap.push(3)
+    heap.push(1)
+    assert pop_all(heap) == [ 1, 4, 5, 2, 3 ]
+
+def vsids(formula):
+    propagator = Propagator(cnf(formula))
+    return propagator, make_heuristic('vsids', propagator)
+
+def test_vsids_bumps():
+    _, heuristic = vsids([ [1, 2, 3, 4, 5] ])
+    heuristic.conflict([ 4 ])
+    assert heuristic.pick() >> 1 == 4
+    # A later bump outweighs an earlier one of the same size
+    heuristic.conflict([ 2 ])
+    heuristic.conflict([ 5 ])
+    assert heuristic.scores[5] > heuristic.scores[2] > heuristic.scores[4]
+    assert [ heuristic.pick() >> 1 for _ in range(3) ] == [ 5, 2, 1 ]
+
+def test_vsids_rescale_keeps_order():
+    conflicts = [ [ (i * 7) % 9 + 1, (i * 5) % 9 + 1 ] for i in range(300) ]
+    _, reference = vsids([ list(range(1, 10)) ])
+    _, small = vsids([ list(range(1, 10)) ])
+    small.RESCALE = 1e6
+    for variables in conflicts:
+        reference.conflict(variables)
+        small.conflict(variables)
+    assert max(small.scores) <= small.RESCALE * 1.1 and small.increment < reference.increment
+    picks = lambda heuristic: [ heuristic.pick() >> 1 for _ in range(9) ]
+    assert picks(small) == picks(reference)
+
+def test_backtrack_puts_variables_back():
+    propagator, heuristic = vsids([ [-1, 2], [-2, 3], [4, 5] ])
+    heuristic.save_phases = True
+    heuristic.conflict([ 1 ])
+    lit = heuristic.pick()
+    assert lit == (1 << 1) | 1
+    propagator.decide(lit)
+    assert propagator.propagate() is None
+    # Assigned variables are skipped (and dropped from the heap as they are)
+    assert heuristic.pick() >> 1 in (4, 5)
+    assert 1 not in heuristic.heap
+
+    propagator.backtrack(0)
+    assert all(variable in heuristic.heap for variable in (1, 2, 3))
+    assert heuristic.phases[1] and heuristic.phases[2] and heuristic.phases[3]
+    assert heuristic.pick() == lit
@@ -0,0 +1,123 @@
+# Incremental solving: many related queries against one formula.
+#
+# A `Solver` keeps its propagator (clauses, watch lists and learned clauses),
+# its branching heuristic, restart policy and learned-clause database between
+# calls to `solve`, so each query only pays for the search it adds instead of
+# reloading and re-propagating the formula:
+#
+#     > solver = Solver(cnf([ [1, 2], [-1, 3] ]))
+#     > solver.solve([ Assumption(Literal(3, False)) ]).sat()
+#     True
+#     > solver.add_clause(cnf([ [-2] ]).pop())
+#     > solver.solve([ Assumption(Literal(3, False)) ]).sat()
+#     False
+#     > solver.failed_assumptions()
+#     [Assumption(literals=frozenset({Literal(variable=3, sign=False)}))]
+#
+# Assumptions only hold for a single call. They are decided before anything
+# else (see `cdcl_search`), so every learned clause follows from the formula
+# alone and can be kept for later calls. Clauses can be added between calls but
+# never removed.
+#
+# When the assumptions make the formula UNSAT, the result is a proof of the
+# clause that negates the failed assumptions: the subset of the assumptions
+# that the refutation actually used. If the formula is UNSAT by itself, that
+# subset is empty and the proof is a proof of the empty clause.
+#
+# The statistics on each result count everything the solver has done so far,
+# across calls.
+
+from dataclasses import replace
+from typing import Iterable, List, Optional, Union
+from defns import *
+from config import Config
+from dpll import Formula, _heuristic, _propagator, _stats, cdcl_search
+from encoding import encode
+from limits import Budget, UNKNOWNResult
+from restarts import make_restarts
+from clausedb import ClauseDB
+
+class Solver:
+    def __init__(self, formula: Formula = (), config: Optional[Config] = None):
+        config = config or Config()
+        if config.preprocess or config.proof_file is not None:
+            raise ValueError('Incremental solving supports neither preprocessing '
+                             'nor proof files')
+        self.config = replace(config, learn=True)
+        self.propagator = _propagator(formula)
+        _stats(self.config, self.propagator)
+        self.heuristic = _heuristic(self.config, self.propagator)
+        self.restarts = make_restarts(self.config.restart)
+        self.clause_db = ClauseDB(self.propagator) if self.config.reduce_db else None
+        # The assumptions of the last call to `solve`, and the failed ones if
+        # it was UNSAT
+        self.assumptions: List[Assumption] = []
+        self.failed: List[Assumption] = []
+        # A proof of the empty clause, once the formula is known to be UNSAT
+        self.refutation: Optional[Clause] = None
+
+    # Add a clause (an `Axiom`, or any iterable of literals) to the formula
+    def add_clause(self, clause: Union[Clause, Iterable[Literal]]) -> None:
+        if not isinstance(clause, Clause):
+            clause = Axiom(clause)
+        self.propagator.backtrack(0)
+        num_vars = self.propagator.num_vars
+        self.propagator.add_clause(clause)
+        self._added_variables(num_vars)
+
+    # Let the heuristic pick the variables above `num_vars` that were just added
+    def _added_variables(self, num_vars: int) -> None:
+        if self.propagator.num_vars > num_vars:
+            self.heuristic.extend(range(num_vars + 1, self.propagator.num_vars + 1))
+
+    def add_clauses(self, clauses: Iterable[Union[Clause, Iterable[Literal]]]) -> None:
+        for clause in clauses:
+            self.add_clause(clause)
+
+    # Make sure models assign the given variables, even those in no clause
+    def add_variables(self, variables: Iterable[int]) -> None:
+        variables = list(variables)
+        self.propagator.backtrack(0)
+        self.propagator.grow(max(variables, default=0))
+        self.heuristic.extend(variables)
+
+    # Solve the formula under the given assumptions (`Assumption`s or plain
+    # `Literal`s). The configuration's limits apply to each call on its own; a
+    # call that runs out returns an `UNKNOWNResult`, and the solver can be used
+    # again afterwards.
+    def solve(self, assumptions: Iterable[Union[Assumption, Literal]] = ()) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+        self.assumptions = [ a if isinstance(a, Assumption) else Assumption(a)
+                             for a in assumptions ]
+        self.failed = []
+        propagator = self.propagator
+        if self.refutation is not None:
+            return UNSATResult(self.refutation, propagator.stats.snapshot())
+
+        propagator.backtrack(0)
+        lits = [ encode(first(a)) for a in self.assumptions ]
+        num_vars = propagator.num_vars
+        propagator.grow(max(lits, default=0) >> 1)
+        self._added_variables(num_vars)
+
+        budget = Budget.start(self.config.limits, self.config.cancel, propagator.stats)
+        result = cdcl_search(propagator, self.heuristic, self.restarts, lits, self.clause_db,
+                             budget=budget)
+        result = replace(result, stats=propagator.stats.snapshot())
+        if isinstance(result, UNKNOWNResult) or result.sat():
+            return result
+
+        clause = result.clause
+        if len(clause) == 0:
+            self.refutation = clause
+        elif isinstance(clause, Assumption):
+            # Two of the assumptions contradict each other
+            literal = first(clause)
+            self.failed = [ a for a in self.assumptions if first(a) in (literal, -literal) ]
+        else:
+            self.failed = [ a for a in self.assumptions if -first(a) in clause ]
+        return result
+
+    # The assumptions of the last call to `solve` that made it UNSAT (empty if
+    # it was SAT, or if the formula is UNSAT without them)
+    def failed_assumptions(self) -> List[Assumption]:
+        return list(self.failed)
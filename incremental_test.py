@@ -0,0 +1,60 @@
+from hypothesis import given, settings, strategies as st
+from defns import *
+from dpll import dpll
+from dpll_test import formulas, literals, validate_proof
+from incremental import Solver
+
+def test_reuses_learned_clauses():
+    solver = Solver(cnf([ [1, 2, 3], [-1, 2], [-2, 3], [-3, 4], [-4, -1] ]))
+    assert solver.solve([ Literal(1, True) ]).sat() is False
+    assert solver.failed_assumptions() == [ Assumption(Literal(1, True)) ]
+    learned = len(solver.propagator.arena)
+    assert solver.solve().sat()
+    assert solver.failed_assumptions() == []
+    assert len(solver.propagator.arena) >= learned
+
+def test_failed_subset():
+    solver = Solver(cnf([ [-1, -2], [3, 4] ]))
+    result = solver.solve([ Literal(3, True), Literal(1, True), Literal(4, False), Literal(2, True) ])
+    assert not result.sat()
+    assert solver.failed_assumptions() == [ Assumption(Literal(1, True)), Assumption(Literal(2, True)) ]
+    assert result.clause.literals == { Literal(1, False), Literal(2, False) }
+
+def test_contradictory_assumptions():
+    solver = Solver(cnf([ [1, 2] ]))
+    assert not solver.solve([ Literal(7, True), Literal(7, False) ]).sat()
+    assert solver.failed_assumptions() == [ Assumption(Literal(7, True)), Assumption(Literal(7, False)) ]
+
+def test_add_clause_and_new_variables():
+    solver = Solver()
+    solver.add_clause([ Literal(1, True), Literal(2, True) ])
+    assert solver.solve([ Literal(1, False) ]).assignments[2]
+    solver.add_clause([ Literal(2, False), Literal(5, True) ])
+    assert solver.solve([ Literal(1, False) ]).assignments[5]
+    solver.add_clause([ Literal(5, False) ])
+    solver.add_clause([ Literal(1, False) ])
+    result = solver.solve()
+    assert not result.sat() and len(result.clause) == 0
+    assert solver.failed_assumptions() == []
+    assert solver.solve([ Literal(3, True) ]) == result
+
+@given(formulas, st.lists(st.lists(literals, max_size=4, unique_by=lambda l: l.variable),
+                          min_size=1, max_size=5))
+@settings(deadline=None, max_examples=500)
+def test_pbt(formula, queries):
+    solver = Solver(formula)
+    for assumptions in queries:
+        result = solver.solve(assumptions)
+        units = { Axiom([ l ]) for l in assumptions }
+        assert result.sat() == dpll(formula | units).sat()
+        if result.sat():
+            true = { Literal(v, b) for v, b in result.assignments.items() }
+            assert all(any(l in true for l in clause) for clause in formula)
+            assert all(l in true for l in assumptions)
+        else:
+            failed = solver.failed_assumptions()
+            assert all(a in { Assumption(l) for l in assumptions } for a in failed)
+            assert not dpll(formula | { Axiom(a.literals) for a in failed }).sat()
+            if not isinstance(result.clause, Assumption):
+                assert result.clause.literals == { -first(a) for a in failed }
+                validate_proof(result.clause, formula)
@@ -0,0 +1,120 @@
+# Resource limits and cancellation.
+#
+# A search can be given `Limits` (see `Config.limits`): a wall time in seconds,
+# a number of decisions or conflicts, and a ceiling on the process's memory in
+# MiB. It can also be given a `CancelToken`, which any thread can use to ask
+# the search to stop:
+#
+#     > token = CancelToken()
+#     > threading.Timer(5, token.cancel).start()
+#     > dpll(formula, Config(cancel=token))
+#
+# The limits are checked cooperatively, once per step of the search loop (see
+# `dpll_internal` and `cdcl_search`). The counters and clock are checked every
+# step; memory, which is slower to measure, every MEMORY_INTERVAL steps. A
+# single propagation can take long on a big formula, so `Propagator.propagate`
+# also checks the clock and the token every `CHECK_INTERVAL` literals it
+# propagates. A search that stops returns an `UNKNOWNResult` with the reason
+# and the statistics so far.
+#
+# Without limits or a token there is no `Budget` at all, and the search loops
+# only test that it is None.
+
+import os
+import resource
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from stats import Stats
+
+@dataclass(frozen=True)
+class Limits:
+    # Seconds of wall time
+    time: Optional[float] = None
+    decisions: Optional[int] = None
+    conflicts: Optional[int] = None
+    # MiB of resident memory for the whole process
+    memory: Optional[float] = None
+
+# Lets another thread stop a search. Tokens only work within one process.
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+# The result of a search that stopped before it found an answer. It is neither
+# SAT nor UNSAT: check for it before asking a result for its model or proof.
+@dataclass(frozen=True)
+class UNKNOWNResult:
+    # What stopped the search: 'time', 'decisions', 'conflicts', 'memory',
+    # 'flips' (local search only) or 'cancelled'
+    reason: str
+    stats: Optional[Stats] = field(default=None, compare=False, repr=False)
+
+    def sat(self) -> bool:
+        return False
+
+# The resident memory of this process in MiB (or its peak, where the current
+# value is not available)
+def memory_usage() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# The limits of one search, counted from when it starts
+class Budget:
+    MEMORY_INTERVAL = 1024
+
+    def __init__(self, limits: Optional[Limits], cancel: Optional[CancelToken], stats: Stats):
+        self.limits = limits or Limits()
+        self.cancel = cancel
+        self.stats = stats
+        limits = self.limits
+        self.deadline = None if limits.time is None else time.monotonic() + limits.time
+        self.max_decisions = None if limits.decisions is None else stats.decisions + limits.decisions
+        self.max_conflicts = None if limits.conflicts is None else stats.conflicts + limits.conflicts
+        self.checks = 0
+
+    # A budget for `limits` and `cancel`, or None if there is nothing to check
+    @classmethod
+    def start(cls, limits: Optional[Limits], cancel: Optional[CancelToken],
+              stats: Stats) -> Optional['Budget']:
+        if cancel is None and (limits is None or limits == Limits()):
+            return None
+        return cls(limits, cancel, stats)
+
+    # Whether the token was cancelled or the time is up (the limits that can
+    # run out in the middle of a propagation), or None
+    def interrupted(self) -> Optional[str]:
+        if self.cancel is not None and self.cancel.cancelled:
+            return 'cancelled'
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return 'time'
+        return None
+
+    # Why the search has to stop, or None if it can go on
+    def exhausted(self) -> Optional[str]:
+        stats = self.stats
+        if self.cancel is not None and self.cancel.cancelled:
+            return 'cancelled'
+        if self.max_decisions is not None and stats.decisions >= self.max_decisions:
+            return 'decisions'
+        if self.max_conflicts is not None and stats.conflicts >= self.max_conflicts:
+            return 'conflicts'
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return 'time'
+        if self.limits.memory is not None:
+            check = self.checks
+            self.checks += 1
+            if check % self.MEMORY_INTERVAL == 0 and memory_usage() >= self.limits.memory:
+                return 'memory'
+        return None
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from config import Config
+from components import solve_components
+from cube import cube_and_conquer
+from defns import *
+from dpll import dpll
+from generators import pigeonhole, write_dimacs
+from incremental import Solver
+from limits import Budget, CancelToken, Limits, UNKNOWNResult, memory_usage
+from models import count_models, iter_models
+from portfolio import portfolio
+from propagation import Propagator
+from stats import Stats
+
+SOLVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver.py')
+HARD = pigeonhole(9)
+
+def test_no_budget_by_default():
+    assert Budget.start(None, None, Stats()) is None
+    assert Budget.start(Limits(), None, Stats()) is None
+    assert Budget.start(None, CancelToken(), Stats()) is not None
+
+def test_counters():
+    for learn in [ False, True ]:
+        result = dpll(cnf(HARD), Config(learn=learn, limits=Limits(decisions=50)))
+        assert result == UNKNOWNResult('decisions') and not result.sat()
+        assert result.stats.decisions == 50
+        result = dpll(cnf(HARD), Config(learn=learn, limits=Limits(conflicts=20)))
+        assert result.reason == 'conflicts' and result.stats.conflicts == 20
+
+def test_limits_do_not_hide_answers():
+    # A formula solved without a decision is answered even with no budget left
+    assert dpll(cnf([ [1], [-1, 2] ]), Config(limits=Limits(decisions=0))).sat()
+    result = dpll(cnf(pigeonhole(3)), Config(learn=True, limits=Limits(conflicts=1000)))
+    assert isinstance(result, UNSATResult)
+
+def test_time():
+    start = time.monotonic()
+    result = dpll(cnf(HARD), Config(learn=True, preprocess=True, limits=Limits(time=0.3)))
+    assert result.reason == 'time'
+    assert time.monotonic() - start < 2
+
+def test_memory():
+    assert memory_usage() > 0
+    result = dpll(cnf(HARD), Config(learn=True, limits=Limits(memory=1)))
+    assert result.reason == 'memory'
+
+def test_cancel_from_another_thread():
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    result = dpll(cnf(HARD), Config(learn=True, cancel=token))
+    assert result.reason == 'cancelled' and token.cancelled
+
+def test_stop_inside_propagation():
+    # Deciding nothing, one propagation assigns the whole chain
+    length = 20 * Propagator.CHECK_INTERVAL
+    chain = cnf([ [1] ] + [ [-v, v + 1] for v in range(1, length) ])
+    token = CancelToken()
+    token.cancel()
+    for learn in [ False, True ]:
+        result = dpll(chain, Config(learn=learn, cancel=token))
+        assert result.reason == 'cancelled'
+        assert result.stats.decisions == 0
+        assert result.stats.propagations <= Propagator.CHECK_INTERVAL
+        result = dpll(chain, Config(learn=learn, limits=Limits(time=1e-9)))
+        assert result.reason == 'time' and result.stats.propagations < length
+    assert solve_components(Propagator(chain), Config(cancel=token),
+                            propagate_first=True).reason == 'cancelled'
+
+def test_incremental():
+    solver = Solver(cnf(HARD), Config(limits=Limits(conflicts=10)))
+    first_result = solver.solve()
+    assert first_result.reason == 'conflicts'
+    assert solver.refutation is None and solver.failed_assumptions() == []
+    # Each call has its own budget, and the solver carries on where it was
+    second_result = solver.solve()
+    assert second_result.reason == 'conflicts'
+    assert second_result.stats.conflicts == first_result.stats.conflicts + 10
+
+    solver = Solver(cnf([ [1, 2], [-1, 2] ]), Config(limits=Limits(conflicts=10)))
+    assert not solver.solve([ Literal(2, False) ]).sat() and solver.failed_assumptions()
+    assert solver.solve().sat()
+
+def test_models():
+    formula = cnf([ [v, v + 1] for v in range(1, 60, 2) ])
+    results = list(iter_models(formula, config=Config(limits=Limits(decisions=40))))
+    assert isinstance(results[-1], UNKNOWNResult)
+    assert all(r.sat() for r in results[:-1])
+    assert count_models(formula, config=Config(limits=Limits(decisions=40))) == len(results) - 1
+
+def test_parallel():
+    config = Config(limits=Limits(conflicts=20))
+    result = portfolio(Propagator(cnf(HARD)), 2, config)
+    assert result.reason == 'conflicts'
+    assert cube_and_conquer(Propagator(cnf(HARD)), 2, config).reason == 'conflicts'
+    # An unknown cube does not hide a model found in another
+    assert cube_and_conquer(Propagator(cnf([ [1, 2], [3, 4] ])), 2, config).sat()
+
+def test_command_line(tmp_path):
+    path = str(tmp_path / 'hard.cnf')
+    write_dimacs(HARD, path)
+    output = subprocess.run([ sys.executable, SOLVER, '--learn', '--conflict-limit', '5', path ],
+                            capture_output=True, text=True, check=True).stdout
+    assert output.splitlines() == [ 'c stopped: conflicts', 's UNKNOWN' ]
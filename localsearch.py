@@ -0,0 +1,258 @@
+# Stochastic local search: WalkSAT and ProbSAT.
+#
+# Local search starts from a random assignment and repeatedly flips a variable
+# of a false clause until no clause is false. It cannot prove a formula UNSAT,
+# but on large satisfiable random-like formulas, where systematic search is
+# hopeless, it often finds a model quickly. The two algorithms differ only in
+# which variable of the false clause they flip:
+#
+#   - 'walksat' (WalkSAT/SKC): a variable that breaks no clause if there is one;
+#     otherwise, with probability NOISE, a random variable, and else the one
+#     that breaks the fewest clauses (ties going to the one that makes most)
+#   - 'probsat': a variable picked with probability proportional to
+#     (EPSILON + breaks) ** -CB
+#
+# where a variable's break count is the number of clauses that would become
+# false if it were flipped, and its make count the number that would become
+# true.
+#
+# The formula is copied out of the propagator's arena into flat NumPy arrays:
+# every literal, the start of each clause, and for every literal the clauses it
+# occurs in. The search keeps, per clause, the number of true literals and the
+# XOR of their variables (which, in a clause with a single true literal, is that
+# literal's variable), and per variable its break and make counts. A flip then
+# updates these for all the clauses of the flipped variable at once, with array
+# operations instead of a Python loop per clause, and random numbers are drawn
+# BATCH at a time.
+#
+# `local_search` runs it as a solve mode (see `Config.local_search`), which can
+# also be a member of a portfolio (see `portfolio.py`). `initial_phases` runs
+# it briefly before a systematic search, which then decides every variable the
+# way the best assignment found did (see `Config.phase_init`); if that was a
+# model, the search finds it without a conflict.
+
+import time
+from typing import Dict, Optional, Union
+import numpy as np
+from defns import *
+from config import LOCAL_SEARCH_ALGORITHMS as ALGORITHMS, Config
+from limits import Budget, UNKNOWNResult
+from propagation import Propagator
+
+# How many flips `initial_phases` makes, unless `Config.flips` says otherwise
+PHASE_INIT_FLIPS = 1 << 14
+
+class LocalSearch:
+    # WalkSAT's probability of a random step when every variable breaks a clause
+    NOISE = 0.567
+    # ProbSAT's polynomial weighting of break counts
+    CB = 2.38
+    EPSILON = 1.0
+    # How many random numbers are drawn at once
+    BATCH = 1 << 12
+    # How many flips are made between checks of the budget
+    CHECK_INTERVAL = 1 << 8
+
+    def __init__(self, propagator: Propagator, algorithm: str = 'probsat',
+                 seed: Optional[int] = None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Unknown local search algorithm: {algorithm}')
+        self.algorithm = algorithm
+        self.rng = np.random.default_rng(seed)
+        self.randoms = np.empty(0)
+        self.next_random = 0
+        self.flips = 0
+
+        # The clauses, as in the arena but without the sizes between them
+        arena = propagator.arena
+        data = np.frombuffer(arena.data, dtype=np.int32)
+        refs = np.fromiter(arena.refs(), dtype=np.int64, count=len(arena))
+        sizes = data[refs].astype(np.int64)
+        self.starts = np.zeros(len(refs) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.starts[1:])
+        self.lits = data[np.repeat(refs + 1 - self.starts[:-1], sizes)
+                         + np.arange(self.starts[-1])]
+        del data
+        self.vars = self.lits >> 1
+        self.signs = (self.lits & 1).astype(bool)
+        # A clause without literals can never be satisfied
+        self.empty = bool(np.any(sizes == 0))
+
+        # The clauses each literal occurs in
+        num_lits = 2 * propagator.num_vars + 2
+        clause_of = np.repeat(np.arange(len(refs)), sizes)
+        self.occurrences = clause_of[np.argsort(self.lits, kind='stable')]
+        self.occurrence_starts = np.zeros(num_lits + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.lits, minlength=num_lits), out=self.occurrence_starts[1:])
+
+        self.variables = np.fromiter(propagator.variables, dtype=np.int64)
+        # Start from what is fixed at level 0, and random values elsewhere
+        self.values = self.rng.random(propagator.num_vars + 1) < 0.5
+        for lit in propagator.trail[:propagator.trail_lim[0] if propagator.trail_lim else None]:
+            self.values[lit >> 1] = bool(lit & 1)
+        self._count()
+        self.best_values = self.values.copy()
+        self.best_unsat = self.num_unsat
+
+    # Compute every clause's count and the break and make counts from scratch
+    def _count(self) -> None:
+        num_clauses = len(self.starts) - 1
+        true = self.values[self.vars] == self.signs
+        counts = np.bincount(np.repeat(np.arange(num_clauses), np.diff(self.starts)),
+                             weights=true, minlength=num_clauses)
+        self.true_count = counts.astype(np.int64)
+        self.critical = np.zeros(num_clauses, dtype=np.int64)
+        nonempty = np.flatnonzero(np.diff(self.starts))
+        if len(nonempty):
+            self.critical[nonempty] = np.bitwise_xor.reduceat(np.where(true, self.vars, 0),
+                                                              self.starts[nonempty])
+        size = len(self.values)
+        self.breaks = np.bincount(self.critical[self.true_count == 1], minlength=size)
+        unsat = np.flatnonzero(self.true_count == 0)
+        self.makes = np.bincount(self._members(unsat), minlength=size)
+
+        # The false clauses, and the position of each in `unsat` (or -1)
+        self.unsat = np.empty(num_clauses, dtype=np.int64)
+        self.unsat[:len(unsat)] = unsat
+        self.num_unsat = len(unsat)
+        self.position = np.full(num_clauses, -1, dtype=np.int64)
+        self.position[unsat] = np.arange(len(unsat))
+
+    # The variables of every literal of the given clauses
+    def _members(self, clauses: np.ndarray) -> np.ndarray:
+        starts = self.starts[clauses]
+        sizes = self.starts[clauses + 1] - starts
+        offsets = np.cumsum(sizes) - sizes
+        return self.vars[np.repeat(starts - offsets, sizes) + np.arange(sizes.sum())]
+
+    def _random(self) -> float:
+        if self.next_random == len(self.randoms):
+            self.randoms = self.rng.random(self.BATCH)
+            self.next_random = 0
+        r = self.randoms[self.next_random]
+        self.next_random += 1
+        return r
+
+    def flip(self, variable: int) -> None:
+        value = not self.values[variable]
+        self.values[variable] = value
+        true_lit = (variable << 1) | value
+        occurrences, starts = self.occurrences, self.occurrence_starts
+        true_count, critical, breaks = self.true_count, self.critical, self.breaks
+
+        # The clauses of the literal that became true
+        clauses = occurrences[starts[true_lit]:starts[true_lit + 1]]
+        counts = true_count[clauses]
+        np.subtract.at(breaks, critical[clauses[counts == 1]], 1)
+        true_count[clauses] += 1
+        critical[clauses] ^= variable
+        satisfied = clauses[counts == 0]
+        if len(satisfied):
+            breaks[variable] += len(satisfied)
+            np.subtract.at(self.makes, self._members(satisfied), 1)
+            for clause in satisfied.tolist():
+                self._remove(clause)
+
+        # The clauses of the literal that became false
+        false_lit = true_lit ^ 1
+        clauses = occurrences[starts[false_lit]:starts[false_lit + 1]]
+        true_count[clauses] -= 1
+        critical[clauses] ^= variable
+        counts = true_count[clauses]
+        np.add.at(breaks, critical[clauses[counts == 1]], 1)
+        falsified = clauses[counts == 0]
+        if len(falsified):
+            breaks[variable] -= len(falsified)
+            np.add.at(self.makes, self._members(falsified), 1)
+            for clause in falsified.tolist():
+                self._add(clause)
+        self.flips += 1
+
+    def _add(self, clause: int) -> None:
+        self.unsat[self.num_unsat] = clause
+        self.position[clause] = self.num_unsat
+        self.num_unsat += 1
+
+    def _remove(self, clause: int) -> None:
+        position = self.position[clause]
+        self.num_unsat -= 1
+        last = self.unsat[self.num_unsat]
+        self.unsat[position] = last
+        self.position[last] = position
+        self.position[clause] = -1
+
+    # The variable of `variables` (those of a false clause) to flip
+    def _choose(self, variables: np.ndarray) -> int:
+        breaks = self.breaks[variables]
+        if self.algorithm == 'probsat':
+            weights = np.cumsum((self.EPSILON + breaks) ** -self.CB)
+            i = int(np.searchsorted(weights, self._random() * weights[-1], side='right'))
+            return int(variables[min(i, len(variables) - 1)])
+        free = np.flatnonzero(breaks == 0)
+        if len(free):
+            return int(variables[free[int(self._random() * len(free))]])
+        if self._random() < self.NOISE:
+            return int(variables[int(self._random() * len(variables))])
+        best = np.flatnonzero(breaks == breaks.min())
+        return int(variables[best[np.argmax(self.makes[variables[best]])]])
+
+    # Flip until every clause is true, returning None, or until `max_flips`
+    # flips or the budget run out, returning why
+    def run(self, max_flips: Optional[int] = None, budget: Optional[Budget] = None) -> Optional[str]:
+        if self.empty:
+            return 'flips'
+        starts, vars = self.starts, self.vars
+        flips = 0
+        while self.num_unsat:
+            if max_flips is not None and flips >= max_flips:
+                return 'flips'
+            if budget is not None and flips % self.CHECK_INTERVAL == 0:
+                reason = budget.exhausted()
+                if reason is not None:
+                    return reason
+            clause = self.unsat[int(self._random() * self.num_unsat)]
+            self.flip(self._choose(vars[starts[clause]:starts[clause + 1]]))
+            flips += 1
+            if self.num_unsat < self.best_unsat:
+                self.best_unsat = self.num_unsat
+                self.best_values = self.values.copy()
+        return None
+
+    def assignments(self) -> Dict[int, bool]:
+        return dict(zip(self.variables.tolist(), self.values[self.variables].tolist()))
+
+    # The assignment with the fewest false clauses found so far
+    def best_assignments(self) -> Dict[int, bool]:
+        return dict(zip(self.variables.tolist(), self.best_values[self.variables].tolist()))
+
+# Search for a model with `config.local_search` (ProbSAT by default), giving up
+# with an `UNKNOWNResult` after `config.flips` flips or when the budget runs out
+def local_search(formula: Union[Set[Clause], Propagator], config: Optional[Config] = None,
+                 budget: Optional[Budget] = None) -> Union[SATResult, UNKNOWNResult]:
+    config = config or Config()
+    propagator = formula if isinstance(formula, Propagator) else Propagator(formula)
+    stats = propagator.stats
+    if budget is None:
+        budget = Budget.start(config.limits, config.cancel, stats)
+    start = time.perf_counter()
+    search = LocalSearch(propagator, config.local_search or 'probsat', config.seed)
+    reason = search.run(config.flips, budget)
+    stats.flips += search.flips
+    if stats.timing:
+        stats.time('local_search', start)
+    if reason is not None:
+        return UNKNOWNResult(reason)
+    return SATResult(search.assignments())
+
+# The phase of each variable for a systematic search to start from: the best
+# assignment that `config.phase_init` finds in a short run (see
+# `dpll._heuristic`)
+def initial_phases(propagator: Propagator, config: Config) -> Dict[int, bool]:
+    stats = propagator.stats
+    start = time.perf_counter()
+    search = LocalSearch(propagator, config.phase_init, config.seed)
+    search.run(config.flips or PHASE_INIT_FLIPS)
+    stats.flips += search.flips
+    if stats.timing:
+        stats.time('local_search', start)
+    return search.best_assignments()
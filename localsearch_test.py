@@ -0,0 +1,76 @@
+import pytest
+from hypothesis import given, settings, strategies as st
+from config import Config
+from defns import *
+from dpll import dpll
+from dpll_test import satisfies
+from generators import pigeonhole, random_ksat
+from limits import Limits, UNKNOWNResult
+from localsearch import LocalSearch, initial_phases, local_search
+from portfolio import portfolio, portfolio_configs
+from propagation import Propagator
+
+# The counts the search keeps up to date, recomputed from scratch
+def recount(search):
+    state = (search.true_count.copy(), search.breaks.copy(), search.makes.copy(),
+             sorted(search.unsat[:search.num_unsat].tolist()))
+    search._count()
+    return state, (search.true_count, search.breaks, search.makes,
+                   sorted(search.unsat[:search.num_unsat].tolist()))
+
+@given(st.integers(min_value=0, max_value=1000), st.lists(st.integers(min_value=1, max_value=20),
+                                                          max_size=30))
+@settings(deadline=None, max_examples=100)
+def test_incremental_counts(seed, flips):
+    search = LocalSearch(Propagator(cnf(random_ksat(20, 3, 4.0, seed))), seed=seed)
+    for variable in flips:
+        search.flip(variable)
+    (count, breaks, makes, unsat), expected = recount(search)
+    assert (count == expected[0]).all() and (breaks == expected[1]).all()
+    assert (makes == expected[2]).all() and unsat == expected[3]
+
+@pytest.mark.parametrize('algorithm', [ 'walksat', 'probsat' ])
+def test_random_ksat(algorithm):
+    for k, n in [ (3, 200), (4, 60) ]:
+        formula = random_ksat(n, k, 0.9 * {3: 4.26, 4: 9.93}[k], seed=k)
+        result = dpll(cnf(formula), Config(local_search=algorithm, seed=1))
+        assert result.sat() and satisfies(result.assignments, cnf(formula))
+        assert result.stats.flips > 0 and result.stats.decisions == 0
+
+def test_gives_up():
+    formula = cnf(pigeonhole(4))
+    result = local_search(formula, Config(flips=500))
+    assert result == UNKNOWNResult('flips') and result.stats is None
+    result = dpll(formula, Config(local_search='walksat', limits=Limits(time=0.2)))
+    assert result.reason == 'time'
+    assert dpll(cnf([ [1], [-1] ]), Config(local_search='probsat', flips=1)).reason == 'flips'
+    with pytest.raises(ValueError):
+        local_search(formula, Config(local_search='gsat'))
+
+def test_preprocess():
+    formula = random_ksat(100, 3, 3.5, seed=4)
+    result = dpll(cnf(formula), Config(local_search='probsat', preprocess=True))
+    assert result.sat() and satisfies(result.assignments, cnf(formula))
+
+def test_phase_init():
+    formula = random_ksat(150, 3, 4.0, seed=5)
+    propagator = Propagator(cnf(formula))
+    phases = initial_phases(propagator, Config(phase_init='probsat', seed=1))
+    assert set(phases) == set(propagator.variables)
+    # The phases are a model, so the systematic search never backtracks
+    assert satisfies(phases, cnf(formula))
+    result = dpll(cnf(formula), Config(learn=True, heuristic='vsids', phase_init='probsat',
+                                       seed=1))
+    assert result.sat() and result.stats.conflicts == 0 and result.stats.flips > 0
+
+def test_portfolio():
+    configs = portfolio_configs(3, Config(), 'walksat')
+    assert [ c.local_search for c in configs ] == [ None, None, 'walksat' ]
+    assert portfolio_configs(1, Config(), 'walksat')[0].local_search is None
+
+    formula = random_ksat(100, 3, 4.0, seed=6)
+    result = portfolio(Propagator(cnf(formula)), 2, local_search='probsat')
+    assert result.sat() and satisfies(result.assignments, cnf(formula))
+    # Local search never answers UNSAT, but does not stop the others
+    result = portfolio(Propagator(cnf(pigeonhole(4))), 2, local_search='probsat')
+    assert not result.sat() and len(result.clause) == 0
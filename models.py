@@ -0,0 +1,88 @@
+# Enumerating every model of a formula.
+#
+# `iter_models` lazily yields one `SATResult` per model:
+#
+#     > models = iter_models(cnf([ [1, 2] ]), projection=[ 1, 2 ])
+#     > [ m.assignments for m in models ]
+#     [{1: True, 2: True}, {1: True, 2: False}, {1: False, 2: True}]
+#
+# With a projection, the models are assignments to just those variables, each
+# yielded once however many ways the rest of the formula can be satisfied by it.
+# Without one, they are full assignments to every variable of the formula.
+#
+# Rather than adding a blocking clause for every model found, which makes the
+# formula grow with the number of models, the search walks a binary tree over
+# the projected variables with a single incremental `Solver` (see
+# incremental.py). Each node of the tree is a cube: a partial assignment that
+# the solver takes as assumptions. When a cube has a model `m1 ... mk`, the
+# rest of its subtree is covered by the cubes `m1 ... m(i-1) -mi` for each
+# variable i below the cube, and these are searched depth-first. The pending
+# cubes never number more than about k^2 / 2, and the formula never changes,
+# so memory stays flat however many models there are, while the solver keeps
+# its learned clauses (which follow from the formula alone) from one model to
+# the next.
+#
+# When a cube is UNSAT, the failed assumptions tell how much of it was to
+# blame, and the pending cubes that share that prefix are skipped too.
+#
+# With limits (see `limits.py`), which apply to each model's search, the
+# enumeration stops at the first search that runs out, yielding its
+# `UNKNOWNResult` last so that callers can tell a partial list from a full one.
+
+from typing import Iterable, Iterator, List, Optional, Union
+from defns import *
+from config import Config
+from incremental import Solver
+from limits import UNKNOWNResult
+
+def iter_models(formula: Iterable[Clause], projection: Optional[Iterable[int]] = None,
+                config: Optional[Config] = None) -> Iterator[Union[SATResult, UNKNOWNResult]]:
+    formula = list(formula)
+    if projection is None:
+        # Including the variables of tautologies, which the solver drops
+        variables = sorted({ l.variable for clause in formula for l in clause })
+    else:
+        variables = sorted(set(projection))
+    solver = Solver(formula, config)
+    solver.add_variables(variables)
+
+    cubes: List[List[Literal]] = [ [] ]
+    while cubes:
+        cube = cubes.pop()
+        result = solver.solve(cube)
+        if isinstance(result, UNKNOWNResult):
+            yield result
+            return
+        if not result.sat():
+            if solver.refutation is not None:
+                # The formula has no models left at all
+                return
+            failed = { first(a) for a in solver.failed_assumptions() }
+            depth = max((i + 1 for i, l in enumerate(cube) if l in failed), default=len(cube))
+            prefix = cube[:depth]
+            while cubes and len(cubes[-1]) >= depth and cubes[-1][:depth] == prefix:
+                cubes.pop()
+            continue
+
+        model = result.assignments
+        if projection is not None:
+            model = { v: model[v] for v in variables }
+        yield SATResult(model, result.stats)
+
+        literals = [ Literal(v, model[v]) for v in variables ]
+        for i in range(len(cube), len(literals)):
+            cubes.append(literals[:i] + [ -literals[i] ])
+
+# The number of models (projected onto `projection`, if given), counting up to
+# `limit`. If the configuration's limits run out first, this is only the number
+# found so far.
+def count_models(formula: Iterable[Clause], projection: Optional[Iterable[int]] = None,
+                 config: Optional[Config] = None, limit: Optional[int] = None) -> int:
+    count = 0
+    for result in iter_models(formula, projection, config):
+        if isinstance(result, UNKNOWNResult):
+            break
+        count += 1
+        if count == limit:
+            break
+    return count
@@ -0,0 +1,67 @@
+import itertools
+from hypothesis import given, settings, strategies as st
+from config import Config
+from defns import *
+from dpll_test import formulas
+from models import count_models, iter_models
+
+# Every projected model, by trying every assignment
+def brute_force(formula, variables):
+    everything = sorted({ l.variable for clause in formula for l in clause } | set(variables))
+    models = set()
+    for values in itertools.product([ False, True ], repeat=len(everything)):
+        assignment = dict(zip(everything, values))
+        if all(any(assignment[l.variable] == l.sign for l in clause) for clause in formula):
+            models.add(tuple(assignment[v] for v in variables))
+    return models
+
+def test_projection():
+    formula = cnf([ [1, 2], [-1, 3] ])
+    assert count_models(formula) == 4
+    models = [ m.assignments for m in iter_models(formula, projection=[ 1 ]) ]
+    assert sorted(models, key=str) == [ { 1: False }, { 1: True } ]
+    # Variables outside the formula are free
+    assert count_models(formula, projection=[ 1, 9 ]) == 4
+
+def test_unsat_and_empty():
+    assert list(iter_models(cnf([ [1], [-1] ]))) == []
+    assert [ m.assignments for m in iter_models(set()) ] == [ {} ]
+
+def test_lazy():
+    # Far too many models to list, but taking a few is quick
+    formula = cnf([ [v, v + 1] for v in range(1, 60, 2) ])
+    assert count_models(formula, limit=10) == 10
+    models = iter_models(formula, config=Config(learn=True))
+    first_model = next(models).assignments
+    assert all(first_model[v] or first_model[v + 1] for v in range(1, 60, 2))
+
+def test_learned_clauses_are_reused():
+    formula = cnf([ [1, 2, 3], [-1, -2], [-2, -3], [-1, -3], [4, 5], [-4, -5] ])
+    models = iter_models(formula)
+    results = list(models)
+    assert len(results) == 6
+    # The statistics of a single solver accumulate across the models
+    assert results[-1].stats.decisions > results[0].stats.decisions
+
+@given(formulas, st.sets(st.integers(min_value=1, max_value=12), max_size=4))
+@settings(deadline=None, max_examples=300)
+def test_pbt(formula, projection):
+    variables = sorted(projection)
+    models = [ tuple(m.assignments[v] for v in variables)
+               for m in iter_models(formula, projection=variables) ]
+    assert len(models) == len(set(models))
+    assert set(models) == brute_force(formula, variables)
+
+# Formulas over few enough variables to have a manageable number of models
+small_formulas = st.sets(st.sets(st.builds(Literal, st.integers(min_value=1, max_value=7),
+                                           st.booleans()), min_size=1, max_size=4)
+                         .map(Axiom), max_size=12)
+
+@given(small_formulas)
+@settings(deadline=None, max_examples=200)
+def test_pbt_full(formula):
+    variables = sorted({ l.variable for clause in formula for l in clause })
+    models = [ tuple(m.assignments[v] for v in variables)
+               for m in iter_models(formula, config=Config(learn=True, heuristic='vsids')) ]
+    assert len(models) == len(set(models))
+    assert set(models) == brute_force(formula, variables)
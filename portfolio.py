@@ -0,0 +1,205 @@
+# Parallel portfolio solving.
+#
+# Which configuration of the solver is fastest varies wildly from one formula
+# to the next, and is hard to predict. A portfolio runs several differently
+# configured solvers on the same formula at once, one per process, and takes the
+# answer of whichever finishes first; the others are then terminated. Its wall
+# clock time is close to that of the best configuration, as long as there are
+# enough cores to go around.
+#
+# The configurations differ in their branching heuristic, their seed (which
+# perturbs the heuristic's initial order, see `heuristics.py`), the sign they
+# try first and their restart policy. Every solver uses clause learning, except
+# that the last can instead run local search (see `localsearch.py`), which only
+# ever answers SAT but may find a model long before the others.
+#
+# Optionally, the solvers also share the short clauses they learn (see
+# `ClauseExchange`), so that one solver's work can prune the others' search.
+# A shared clause is an unchecked `Lemma` in the proof of the solver that
+# imports it, so sharing cannot be combined with a proof file.
+#
+# With limits (see `limits.py`), each solver has its own budget, and the
+# portfolio only answers UNKNOWN once every solver has run out.
+#
+# Results are sent back to the parent through a queue. An UNSAT proof is sent
+# in its packed form (see `proof.pack`), since proof trees are far too deep to
+# pickle directly.
+
+import multiprocessing
+import os
+import queue
+import traceback
+from dataclasses import replace
+from typing import List, Optional, Sequence, Union
+from defns import *
+from config import Config
+from dpll import solve
+from limits import UNKNOWNResult
+from proof import Lemma, pack, unpack
+from propagation import Propagator
+
+# The configurations of an `n` solver portfolio, built from `base`. The first
+# is `base` itself (with learning turned on). With `local_search`, the last
+# (if there is more than one) runs that local search algorithm instead.
+def portfolio_configs(n: int, base: Optional[Config] = None,
+                      local_search: Optional[str] = None) -> List[Config]:
+    base = replace(base or Config(), learn=True)
+    variations = [
+        dict(),
+        dict(heuristic='vsids', polarity='false', restart='luby'),
+        dict(heuristic='jw'),
+        dict(heuristic='vsids', polarity='true', restart='glucose'),
+        dict(heuristic='moms', restart='geometric'),
+        dict(heuristic='vsids', polarity='random'),
+    ]
+    configs = [ replace(base, seed=None if i == 0 else i, **variations[i % len(variations)])
+                for i in range(n) ]
+    if local_search is not None and n > 1:
+        configs[-1] = replace(base, seed=n - 1, local_search=local_search)
+    return configs
+
+# Learned clauses shared between the solvers of a portfolio, in shared memory.
+#
+# Each solver writes the clauses it exports to its own ring of fixed-size slots
+# and keeps a count of the clauses written so far. The other solvers read every
+# slot written since they last looked (or as many as the ring holds, if they
+# fell behind). Each ring has a lock, so a clause is never read half-written.
+class ClauseExchange:
+    # Only share clauses with at most this many literals
+    MAX_SIZE = 8
+    # How many clauses each ring holds
+    SLOTS = 1 << 12
+    # How many conflicts a solver runs between imports
+    INTERVAL = 256
+    # The source of the `Lemma` of an imported clause
+    SOURCE = 'shared'
+
+    def __init__(self, workers: int, context=multiprocessing):
+        width = self.MAX_SIZE + 1
+        self.rings = [ context.Array('i', self.SLOTS * width) for _ in range(workers) ]
+        self.counts = [ context.RawValue('q', 0) for _ in range(workers) ]
+        # This solver's ring, and how far it has read every ring (set in the
+        # worker, see `attach`)
+        self.index = 0
+        self.read = [ 0 ] * workers
+
+    def attach(self, index: int) -> None:
+        self.index = index
+
+    # Share a learned clause of packed literals, if it is short enough
+    def export(self, lits: Sequence[int]) -> None:
+        if len(lits) > self.MAX_SIZE:
+            return
+        ring, count = self.rings[self.index], self.counts[self.index]
+        with ring.get_lock():
+            start = (count.value % self.SLOTS) * (self.MAX_SIZE + 1)
+            ring[start] = len(lits)
+            ring[start + 1:start + 1 + len(lits)] = list(lits)
+            count.value += 1
+
+    # The clauses the other solvers have shared since the last call
+    def collect(self) -> List[List[int]]:
+        width = self.MAX_SIZE + 1
+        clauses: List[List[int]] = []
+        for other, ring in enumerate(self.rings):
+            if other == self.index:
+                continue
+            with ring.get_lock():
+                written = self.counts[other].value
+                first = max(self.read[other], written - self.SLOTS)
+                for n in range(first, written):
+                    start = (n % self.SLOTS) * width
+                    clauses.append(ring[start + 1:start + 1 + ring[start]])
+            self.read[other] = written
+        return clauses
+
+def _worker(index: int, propagator: Propagator, config: Config, results,
+            exchange: Optional[ClauseExchange]) -> None:
+    try:
+        if exchange is not None:
+            exchange.attach(index)
+        result = solve(propagator, config, exchange)
+        if isinstance(result, UNKNOWNResult):
+            results.put((index, 'unknown', result.reason, result.stats))
+        elif result.sat():
+            results.put((index, 'sat', result.assignments, result.stats))
+        else:
+            results.put((index, 'unsat', pack(result.clause), result.stats))
+    except BaseException:
+        results.put((index, 'error', traceback.format_exc(), None))
+
+# Solve a formula with `workers` solvers in parallel (see `portfolio_configs`),
+# returning the first result (with the statistics of the solver that found
+# it). If `base` has a proof file, the proof of the solver that wins is written
+# to it.
+def portfolio(propagator: Propagator, workers: int, base: Optional[Config] = None,
+              share: bool = False,
+              local_search: Optional[str] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+    if workers < 1:
+        raise ValueError('A portfolio needs at least one worker')
+    configs = portfolio_configs(workers, base, local_search)
+    proof_file = configs[0].proof_file
+    if proof_file is not None:
+        if share:
+            raise ValueError('Shared clauses cannot be written to a proof file')
+        # Each solver writes its own proof, and the winner's is kept (local
+        # search has none to write)
+        configs = [ replace(c, proof_file=None if c.local_search else f'{proof_file}.{i}')
+                    for i, c in enumerate(configs) ]
+
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    exchange = ClauseExchange(workers, context) if share else None
+    processes = [ context.Process(target=_worker, args=(i, propagator, config, results, exchange),
+                                  daemon=True)
+                  for i, config in enumerate(configs) ]
+    for process in processes:
+        process.start()
+
+    # Wait for the first answer. A worker that fails or runs out of budget
+    # only loses if every other worker does too.
+    errors: List[str] = []
+    unknown: List[tuple] = []
+    try:
+        while True:
+            try:
+                index, kind, value, stats = results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    raise RuntimeError('Every portfolio worker exited without a result')
+                continue
+            if kind == 'unknown':
+                unknown.append((value, stats))
+            elif kind == 'error':
+                errors.append(f'Portfolio worker {index} failed:\n{value}')
+            else:
+                break
+            if len(errors) == workers:
+                raise RuntimeError('\n'.join(errors))
+            if len(errors) + len(unknown) == workers:
+                kind = 'unknown'
+                break
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        results.close()
+
+    if proof_file is not None:
+        for i, config in enumerate(configs):
+            if config.proof_file is None:
+                continue
+            if i == index and kind != 'unknown':
+                os.replace(config.proof_file, proof_file)
+            elif os.path.exists(config.proof_file):
+                os.remove(config.proof_file)
+
+    if kind == 'unknown':
+        return UNKNOWNResult(*unknown[0])
+    if kind == 'sat':
+        return SATResult(value, stats)
+    clause = unpack(value)
+    if proof_file is not None:
+        clause = Lemma(clause.literals, proof_file)
+    return UNSATResult(clause, stats)
@@ -0,0 +1,64 @@
+import pytest
+from config import Config
+from defns import *
+from dpll_test import validate_proof
+from drat_test import check_drat
+from encoding import from_dimacs
+from generators import pigeonhole
+from portfolio import ClauseExchange, portfolio, portfolio_configs
+from proof import Lemma
+from propagation import Propagator
+
+def test_configs():
+    base = Config(heuristic='jw')
+    configs = portfolio_configs(8, base)
+    assert configs[0] == Config(learn=True, heuristic='jw')
+    assert len(set(configs)) == 8
+    assert all(config.learn for config in configs)
+
+def test_unsat():
+    formula = cnf(pigeonhole(4))
+    result = portfolio(Propagator(formula), 3)
+    assert not result.sat() and len(result.clause) == 0
+    validate_proof(result.clause, formula)
+
+def test_sat():
+    formula = cnf([ [1, 2], [-1, 3], [-3, -2], [2, 4] ])
+    result = portfolio(Propagator(formula), 2)
+    assert result.sat()
+    assert all(any(result.assignments[l.variable] == l.sign for l in clause)
+               for clause in formula)
+
+def test_share():
+    result = portfolio(Propagator(cnf(pigeonhole(5))), 3, share=True)
+    assert not result.sat() and len(result.clause) == 0
+
+def test_proof_file(tmp_path):
+    path = str(tmp_path / 'proof.drat')
+    formula = pigeonhole(4)
+    propagator = Propagator()
+    for clause in formula:
+        propagator.add_literals(list(map(from_dimacs, clause)))
+    result = portfolio(propagator, 2, Config(proof_file=path))
+    assert result == UNSATResult(Lemma([], path))
+    assert [ p.name for p in tmp_path.iterdir() ] == [ 'proof.drat' ]
+    check_drat(formula, path)
+    with pytest.raises(ValueError):
+        portfolio(propagator, 2, Config(proof_file=path), share=True)
+
+def test_exchange(monkeypatch):
+    monkeypatch.setattr(ClauseExchange, 'SLOTS', 4)
+    exchange = ClauseExchange(2)
+    exchange.attach(0)
+    exchange.export([ 2, 5 ])
+    exchange.export(list(range(2, 2 + 2 * ClauseExchange.MAX_SIZE + 2, 2)))
+    exchange.attach(1)
+    assert exchange.collect() == [ [ 2, 5 ] ]
+    assert exchange.collect() == []
+
+    # A reader that falls behind only sees the last `SLOTS` clauses
+    exchange.attach(0)
+    for n in range(10):
+        exchange.export([ 2 * n + 2 ])
+    exchange.attach(1)
+    assert exchange.collect() == [ [ 14 ], [ 16 ], [ 18 ], [ 20 ] ]
@@ -0,0 +1,207 @@
+# Formula preprocessing: simplify a formula before searching for a solution.
+#
+# The `Preprocessor` takes the clauses loaded into a `Propagator` and applies
+#
+#   - subsumption: a clause C subsumes every clause D that contains all of its
+#     literals, so D can be dropped
+#   - self-subsuming resolution: if C = A | l and D = B | -l with A a subset of
+#     B, resolving them gives B, so D can be strengthened to B
+#   - pure literal elimination: if a literal never occurs negated, every clause
+#     containing it can be satisfied by making it true
+#   - bounded variable elimination: a variable can be removed by replacing the
+#     clauses that contain it with all of their (non-tautological) resolvents on
+#     it, as long as that does not increase the number of clauses
+#
+# using occurrence lists (the clauses containing each literal) to find the
+# candidates for each step. Every clause that is derived along the way is a
+# `ResolvedClause` of the clauses it came from, so a proof found for the
+# simplified formula is still a proof from the original axioms.
+#
+# Removing clauses can make the simplified formula satisfiable by assignments
+# that falsify the original one, so every removed variable is recorded along
+# with the clauses that mentioned it. `reconstruct` replays these in reverse to
+# extend a model of the simplified formula to a model of the original, and then
+# gives the variables of the other removed clauses (which can have vanished
+# from the formula along with a subsumed clause) a value too.
+
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Set, Tuple
+from defns import *
+from encoding import decode
+from proof import resolved
+from propagation import Propagator
+
+class Preprocessor:
+    # Only eliminate variables that occur in at most this many clauses
+    MAX_OCCURRENCES = 16
+
+    def __init__(self, source: Propagator):
+        self.source = source
+        # The live clauses (None once removed), and the proof of each derived
+        # clause (None for a clause of the source, see `refs`)
+        self.clauses: List[Optional[Set[int]]] = []
+        self.proofs: List[Optional[Clause]] = []
+        self.refs: List[Optional[int]] = []
+        self.occurs: Dict[int, Set[int]] = defaultdict(set)
+        # A derived empty clause, if one is found
+        self.empty: Optional[int] = None
+        # Removed variables and the clauses they appeared in, in order
+        self.stack: List[Tuple[int, List[Set[int]]]] = []
+        # The variables of every removed clause
+        self.removed: Set[int] = set()
+
+        arena = source.arena
+        for ref in arena.refs():
+            self._add(set(arena.literals(ref)), None, ref)
+
+    def _add(self, lits: Set[int], proof: Optional[Clause], ref: Optional[int] = None) -> int:
+        index = len(self.clauses)
+        self.clauses.append(lits)
+        self.proofs.append(proof)
+        self.refs.append(ref)
+        for lit in lits:
+            self.occurs[lit].add(index)
+        if not lits and self.empty is None:
+            self.empty = index
+        return index
+
+    def _remove(self, index: int) -> None:
+        for lit in self.clauses[index]:
+            self.occurs[lit].discard(index)
+            self.removed.add(lit >> 1)
+        self.clauses[index] = None
+
+    def _proof(self, index: int) -> Clause:
+        proof = self.proofs[index]
+        return proof if proof is not None else self.source.clause_proof(self.refs[index])
+
+    # Add the resolvent `lits` of clauses `i` (containing the pivot) and `j`
+    # (containing its negation)
+    def _resolve(self, lits: Set[int], i: int, j: int) -> int:
+        proof = resolved(map(decode, lits), self._proof(i), self._proof(j))
+        return self._add(lits, proof)
+
+    # Returns 0 if `c` subsumes `d`, the literal of `c` whose negation can be
+    # removed from `d` by self-subsuming resolution, or None otherwise
+    @staticmethod
+    def _subsumes(c: Set[int], d: Set[int]) -> Optional[int]:
+        flipped = 0
+        for lit in c:
+            if lit in d:
+                continue
+            if not flipped and lit ^ 1 in d:
+                flipped = lit
+                continue
+            return None
+        return flipped
+
+    # Subsumption and self-subsuming resolution, until no clause changes
+    def subsume(self) -> None:
+        queue = deque(sorted((i for i, c in enumerate(self.clauses) if c),
+                             key=lambda i: len(self.clauses[i])))
+        while queue and self.empty is None:
+            i = queue.popleft()
+            c = self.clauses[i]
+            if c is None:
+                continue
+
+            # Any clause that `c` subsumes or strengthens contains its least
+            # frequent variable
+            best = min(c, key=lambda l: len(self.occurs[l]) + len(self.occurs[l ^ 1]))
+            for j in list(self.occurs[best] | self.occurs[best ^ 1]):
+                d = self.clauses[j]
+                if j == i or d is None or len(d) < len(c):
+                    continue
+                flipped = self._subsumes(c, d)
+                if flipped is None:
+                    continue
+                self._remove(j)
+                if flipped:
+                    queue.append(self._resolve(d - { flipped ^ 1 }, j, i))
+                if self.clauses[i] is None or self.empty is not None:
+                    break
+
+    # Remove a variable along with every clause it appears in
+    def _eliminate(self, variable: int, removed: List[int]) -> None:
+        self.stack.append((variable, [ self.clauses[i] for i in removed ]))
+        for i in removed:
+            self._remove(i)
+
+    # Pure literal and bounded variable elimination
+    def eliminate(self) -> None:
+        occurs = self.occurs
+        variables = sorted({ lit >> 1 for c in self.clauses if c for lit in c },
+                           key=lambda v: len(occurs[v << 1]) + len(occurs[(v << 1) | 1]))
+        for variable in variables:
+            if self.empty is not None:
+                return
+            pos = list(occurs[(variable << 1) | 1])
+            neg = list(occurs[variable << 1])
+            if not pos or not neg:
+                if pos or neg:
+                    self._eliminate(variable, pos or neg)
+                continue
+            if len(pos) + len(neg) > self.MAX_OCCURRENCES:
+                continue
+
+            resolvents = []
+            for i in pos:
+                for j in neg:
+                    lits = (self.clauses[i] - { (variable << 1) | 1 }) | \
+                           (self.clauses[j] - { variable << 1 })
+                    if any(lit ^ 1 in lits for lit in lits):
+                        continue
+                    resolvents.append((lits, i, j))
+                    if len(resolvents) > len(pos) + len(neg):
+                        break
+                if len(resolvents) > len(pos) + len(neg):
+                    break
+            else:
+                derived = [ (lits, resolved(map(decode, lits),
+                                            self._proof(i), self._proof(j)))
+                            for lits, i, j in resolvents ]
+                self._eliminate(variable, pos + neg)
+                for lits, proof in derived:
+                    self._add(lits, proof)
+
+    # Simplify the formula and load the result into a new `Propagator`
+    def run(self) -> Propagator:
+        self.subsume()
+        self.eliminate()
+        self.subsume()
+
+        propagator = Propagator(num_vars=self.source.num_vars)
+        if self.empty is not None:
+            propagator.add_literals([], self._proof(self.empty))
+            return propagator
+        for lits, proof, ref in zip(self.clauses, self.proofs, self.refs):
+            if lits is None:
+                continue
+            if proof is None:
+                proof = self.source.proofs.get(ref)
+            propagator.add_literals(list(lits), proof)
+        return propagator
+
+    # Extend a model of the simplified formula to the removed variables,
+    # updating `assignments` in place
+    def reconstruct(self, assignments: Dict[int, bool]) -> Dict[int, bool]:
+        def satisfied(lit: int) -> bool:
+            return assignments.get(lit >> 1) == bool(lit & 1)
+
+        for variable, clauses in reversed(self.stack):
+            # Variables that no longer appear anywhere else can take any value
+            for lits in clauses:
+                for lit in lits:
+                    assignments.setdefault(lit >> 1, False)
+
+            positive = (variable << 1) | 1
+            # Make the variable true only if some removed clause needs it
+            assignments[variable] = any(
+                positive in lits and not any(satisfied(l) for l in lits if l != positive)
+                for lits in clauses)
+
+        # Any other variable of a removed clause occurs in no clause that is
+        # left unsatisfied, so it can take any value too
+        for variable in self.removed:
+            assignments.setdefault(variable, False)
+        return assignments
@@ -0,0 +1,62 @@
+from defns import *
+from dpll import solve
+from config import Config
+from encoding import encode
+from preprocess import Preprocessor
+from propagation import Propagator
+
+def simplify(formula):
+    preprocessor = Preprocessor(Propagator(formula))
+    propagator = preprocessor.run()
+    clauses = { frozenset(propagator.arena.literals(ref))
+                for ref in propagator.arena.refs() }
+    return preprocessor, propagator, clauses
+
+def lits(*ns):
+    return frozenset(encode(Literal(abs(n), n > 0)) for n in ns)
+
+def test_subsumption():
+    # [1, 2] subsumes [1, 2, 3]
+    preprocessor = Preprocessor(Propagator(cnf([ [1, 2], [1, 2, 3], [-1, 4] ])))
+    preprocessor.subsume()
+    live = { frozenset(c) for c in preprocessor.clauses if c is not None }
+    assert live == { lits(1, 2), lits(-1, 4) }
+
+def test_self_subsuming_resolution():
+    preprocessor = Preprocessor(Propagator(cnf([ [1, 2], [-1, 2, 3] ])))
+    preprocessor.subsume()
+    live = [ i for i, c in enumerate(preprocessor.clauses) if c is not None ]
+    assert { frozenset(preprocessor.clauses[i]) for i in live } == { lits(1, 2), lits(2, 3) }
+    # The strengthened clause is a valid resolution of the original clauses
+    strengthened = next(preprocessor.proofs[i] for i in live
+                        if preprocessor.proofs[i] is not None)
+    assert isinstance(strengthened, ResolvedClause)
+    assert strengthened.clause1 == Axiom([ Literal(1, False), Literal(2, True), Literal(3, True) ])
+    assert strengthened.clause2 == Axiom([ Literal(1, True), Literal(2, True) ])
+
+def test_pure_literals_and_reconstruction():
+    formula = cnf([ [1, 2], [1, -3], [2, 3] ])
+    preprocessor, propagator, clauses = simplify(formula)
+    assert not clauses
+    result = solve(Propagator(formula), Config(preprocess=True))
+    assert result.sat()
+    for clause in formula:
+        assert any(result.assignments.get(l.variable) == l.sign for l in clause)
+
+def test_variable_elimination_keeps_unsat_proof():
+    formula = cnf([ [1, 2], [-1, 2], [1, -2], [-1, -2] ])
+    preprocessor, propagator, clauses = simplify(formula)
+    assert clauses == { frozenset() }
+    result = solve(Propagator(formula), Config(preprocess=True))
+    assert not result.sat()
+    assert len(result.clause) == 0
+    assert isinstance(result.clause, ResolvedClause)
+
+def test_reconstruction_assigns_every_variable():
+    # 3 only appears in a clause that [1, 2] subsumes
+    formula = cnf([ [1, 2], [1, 2, 3], [-1, 4, 5], [-4, 5] ])
+    result = solve(Propagator(formula), Config(preprocess=True))
+    assert result.sat()
+    assert set(result.assignments) == { l.variable for clause in formula for l in clause }
+    for clause in formula:
+        assert any(result.assignments[l.variable] == l.sign for l in clause)
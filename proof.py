@@ -0,0 +1,202 @@
+# Proof trees as shared DAGs.
+#
+# The solver builds proofs out of `ResolvedClause`s, and the same subproof is
+# often reachable along many paths (for example, the unit proof of a literal
+# that is used by several later propagations). Two things keep this cheap:
+#
+#   - Hash-consing: `resolved` and `leaf` look up an identical node before
+#     creating a new one, so equal subproofs are a single shared object and
+#     a proof is a DAG rather than a tree.
+#
+#   - Memoized `remove_assumption`: rewriting a proof visits every distinct node
+#     once, iteratively, and leaves subproofs that do not use the assumption
+#     untouched (no new nodes are built for them). Results are also kept in a
+#     bounded cache, since the same subproofs are rewritten again for the same
+#     assumption as the search backtracks.
+#
+# Nodes are identified by `id`, never by the dataclass `==`/`hash`, which walk
+# the entire tree.
+#
+# When the solver streams its proof to a file instead (see `drat.py`), the
+# result only holds a `Lemma` that points at that file.
+#
+# `pack` and `unpack` convert a proof to and from a flat list of nodes, which
+# can be pickled (for example to send it to another process) without recursing
+# through the tree or losing the sharing between subproofs.
+
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from defns import *
+from encoding import negate
+from stats import Stats
+
+# Interned nodes, keyed by their literals and the identities of their children
+_resolved: 'weakref.WeakValueDictionary[Tuple[FrozenSet[Literal], int, int], ResolvedClause]' = \
+    weakref.WeakValueDictionary()
+# Interned leaves (axioms and assumptions), keyed by their type and literals
+_leaves: 'weakref.WeakValueDictionary[Tuple[type, FrozenSet[Literal]], Clause]' = \
+    weakref.WeakValueDictionary()
+
+# A clause whose derivation is not kept in memory but was written to a proof
+# file (`source`) as the solver went along
+@dataclass(frozen=True, init=False)
+class Lemma(Clause):
+    source: str
+
+    def __init__(self, literals: Iterable[Literal], source: str):
+        object.__setattr__(self, 'literals', frozenset(literals))
+        object.__setattr__(self, 'source', source)
+
+    def __str__(self) -> str:
+        return f'{super().__str__() or "X"} (proof in {self.source})'
+
+# The shared `ResolvedClause` with these literals and children
+def resolved(literals: Iterable[Literal], clause1: Clause, clause2: Clause) -> ResolvedClause:
+    literals = frozenset(literals)
+    key = (literals, id(clause1), id(clause2))
+    node = _resolved.get(key)
+    if node is None:
+        node = ResolvedClause(literals, clause1, clause2)
+        _resolved[key] = node
+    return node
+
+# The shared leaf equal to `clause`
+def leaf(clause: Clause) -> Clause:
+    key = (type(clause), clause.literals)
+    node = _leaves.get(key)
+    if node is None:
+        node = _leaves[key] = clause
+    return node
+
+# The literal of `clause1` that is resolved against `clause2`
+def pivot(clause1: Clause, clause2: Clause) -> Literal:
+    for literal in clause1:
+        if negate(literal) in clause2:
+            return literal
+    raise ValueError('Clauses do not contain complementary literals')
+
+# Rewritten subproofs, keyed by the node's identity and the removed assumption's
+# literal. The node is stored with the result to keep its identity valid.
+CACHE_SIZE = 1 << 16
+_removed: 'OrderedDict[Tuple[int, Literal], Tuple[Clause, Clause]]' = OrderedDict()
+
+# Given a proof, return a proof that does not use the given assumption (see
+# `dpll.remove_assumption`). The nodes that are rewritten (not found in the
+# cache) are counted in `stats`.
+def remove_assumption(assumption: Assumption, clause: Clause,
+                      stats: Optional[Stats] = None) -> Clause:
+    assumed = first(assumption)
+    done: Dict[int, Clause] = {}
+    rewritten = 0
+
+    def is_assumption(node: Clause) -> bool:
+        return isinstance(node, Assumption) and assumed in node
+
+    stack = [ clause ]
+    while stack:
+        node = stack[-1]
+        if id(node) in done:
+            stack.pop()
+            continue
+        if not isinstance(node, ResolvedClause):
+            done[id(node)] = node
+            stack.pop()
+            continue
+
+        key = (id(node), assumed)
+        cached = _removed.get(key)
+        if cached is not None:
+            _removed.move_to_end(key)
+            done[id(node)] = cached[1]
+            stack.pop()
+            continue
+
+        # Rewrite the children first
+        children = [ c for c in (node.clause1, node.clause2)
+                     if not is_assumption(c) and id(c) not in done ]
+        if children:
+            stack.extend(children)
+            continue
+
+        if is_assumption(node.clause1):
+            # Resolving with the assumption removed its negation; without it,
+            # the negation stays in the clause
+            result = done[id(node.clause2)]
+        elif is_assumption(node.clause2):
+            result = done[id(node.clause1)]
+        else:
+            clause1 = done[id(node.clause1)]
+            clause2 = done[id(node.clause2)]
+            if clause1 is node.clause1 and clause2 is node.clause2:
+                # The assumption is not used in this subproof
+                result = node
+            else:
+                # Re-resolve on the same pivot as the original step
+                literal = pivot(node.clause1, node.clause2)
+                result = resolved((clause1.literals | clause2.literals) -
+                                  { literal, negate(literal) },
+                                  clause1, clause2)
+
+        done[id(node)] = result
+        rewritten += 1
+        _removed[key] = (node, result)
+        if len(_removed) > CACHE_SIZE:
+            _removed.popitem(last=False)
+        stack.pop()
+
+    if stats is not None:
+        stats.proof_nodes += rewritten
+    return done[id(clause)]
+
+# A proof as a list of nodes, each after its children: a leaf is `(clause,)`, a
+# `ResolvedClause` is `(literals, position of clause1, position of clause2)`.
+# The last node is the root.
+Packed = List[tuple]
+
+def pack(clause: Clause) -> Packed:
+    return pack_all([ clause ])[0]
+
+# Several proofs packed into one list, sharing the nodes they have in common.
+# Returns the nodes and the position of each proof's root.
+def pack_all(clauses: Iterable[Clause]) -> Tuple[Packed, List[int]]:
+    nodes: Packed = []
+    positions: Dict[int, int] = {}
+    roots: List[int] = []
+    for clause in clauses:
+        stack = [ clause ]
+        while stack:
+            node = stack[-1]
+            if id(node) in positions:
+                stack.pop()
+                continue
+            if isinstance(node, ResolvedClause):
+                children = [ c for c in (node.clause1, node.clause2) if id(c) not in positions ]
+                if children:
+                    stack.extend(children)
+                    continue
+                entry = (node.literals, positions[id(node.clause1)], positions[id(node.clause2)])
+            else:
+                entry = (node,)
+            positions[id(node)] = len(nodes)
+            nodes.append(entry)
+            stack.pop()
+        roots.append(positions[id(clause)])
+    return nodes, roots
+
+def _build(nodes: Packed) -> List[Clause]:
+    built: List[Clause] = []
+    for entry in nodes:
+        if len(entry) == 1:
+            built.append(leaf(entry[0]))
+        else:
+            built.append(resolved(entry[0], built[entry[1]], built[entry[2]]))
+    return built
+
+def unpack(nodes: Packed) -> Clause:
+    return _build(nodes)[-1]
+
+def unpack_all(nodes: Packed, roots: List[int]) -> List[Clause]:
+    built = _build(nodes)
+    return [ built[root] for root in roots ]
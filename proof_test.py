@@ -0,0 +1,57 @@
+import pickle
+from defns import *
+from proof import leaf, pack, pack_all, remove_assumption, resolved, unpack, unpack_all
+
+def chain(n: int):
+    # x1?, -x1 | x2, ..., -x(n-1) | xn, -xn  proves the empty clause
+    proof = leaf(Assumption(Literal(1, True)))
+    for i in range(1, n):
+        step = Axiom([ Literal(i, False), Literal(i + 1, True) ])
+        proof = resolved([ Literal(i + 1, True) ], step, proof)
+    return resolved([], proof, Axiom([ Literal(n, False) ]))
+
+def test_interning():
+    a = Axiom([ Literal(1, True), Literal(2, True) ])
+    b = Axiom([ Literal(1, False) ])
+    assert resolved([ Literal(2, True) ], a, b) is resolved([ Literal(2, True) ], a, b)
+    assert leaf(Axiom([ Literal(1, False) ])) is leaf(b)
+
+def test_remove_deep_assumption():
+    # Far deeper than Python's recursion limit
+    proof = chain(5000)
+    without = remove_assumption(Assumption(Literal(1, True)), proof)
+    assert without.literals == { Literal(1, False) }
+
+def test_unused_assumption_keeps_proof():
+    proof = chain(100)
+    assert remove_assumption(Assumption(Literal(7, True)), proof) is proof
+
+def test_shared_subproofs():
+    # Each level uses the previous one twice, so the tree has 2^60 paths but
+    # only a few hundred distinct nodes
+    a = Literal(999, True)
+    u = lambda i, sign=True: Literal(i, sign)
+    v = lambda i, sign=True: Literal(1000 + i, sign)
+    proof = resolved([ u(1) ], Axiom([ u(1), -a ]), leaf(Assumption(a)))
+    for i in range(1, 61):
+        q = resolved([ v(i), u(i + 1) ], Axiom([ u(i, False), v(i), u(i + 1) ]), proof)
+        r = resolved([ u(i, False), u(i + 1) ], q,
+                     Axiom([ v(i, False), u(i, False), u(i + 1) ]))
+        proof = resolved([ u(i + 1) ], r, proof)
+    without = remove_assumption(Assumption(a), proof)
+    assert without.literals == { u(61), -a }
+
+def test_pack():
+    proof = chain(5000)
+    nodes = pack(proof)
+    assert len(nodes) == 2 * 5000 + 1
+    # Sharing is kept, and the proof survives a round trip through pickle
+    assert pack(unpack(pickle.loads(pickle.dumps(nodes)))) == nodes
+
+def test_pack_all():
+    proof = chain(100)
+    first, second = proof.clause1, proof
+    nodes, roots = pack_all([ first, second ])
+    # The second proof only adds its own root and the other axiom
+    assert len(nodes) == len(pack(second)) and roots == [ len(nodes) - 3, len(nodes) - 1 ]
+    assert unpack_all(nodes, roots) == [ first, second ]
@@ -0,0 +1,519 @@
+# Watched-literal unit propagation.
+#
+# A `Propagator` holds a formula and keeps, for every literal, a watch list of
+# the clauses that are currently watching it. Each clause with two or more
+# literals watches two of them; as long as neither watched literal is false the
+# clause cannot be unit, so assigning a literal only has to visit the clauses
+# watching its negation instead of the whole formula. Assigned literals are
+# pushed onto a trail, which doubles as the propagation queue.
+#
+# Internally literals are packed ints and clauses live in a `ClauseArena` (see
+# `encoding.py`); clauses are referred to by their ref in the arena. Public
+# `Clause`s are converted on the way in, and proofs are converted back to
+# `Literal`s and `Clause`s on the way out.
+#
+# Proof trees are built the same way `unit_propagate` always built them: a
+# clause that becomes unit (or empty) is resolved, one literal at a time,
+# against the unit clauses that falsified its other literals. Because most
+# propagated literals never end up in a proof, these trees are only built on
+# demand (see `unit_proof` and `conflict_proof`).
+#
+# Every assignment belongs to a decision level: level 0 holds what follows from
+# the formula alone, and each `decide` opens a new level. `backtrack` undoes the
+# trail down to a given level in place, so searching never copies the formula.
+#
+# A propagator can be given the `Budget` of the search using it (see
+# `limits.py`). A long propagation then checks it every CHECK_INTERVAL
+# literals, and stops early if the search was cancelled or ran out of time:
+# `propagate` returns None, with the reason in `stopped`, and the literals it
+# did not get to stay queued.
+#
+# Instead of building proof trees, a propagator can log the clauses it learns to
+# a DRAT or LRAT file (see `start_log` and `drat.py`). LRAT needs an id for
+# every clause: the formula's clauses are numbered from 1 in the order they were
+# added (counting the tautologies that are dropped), followed by the learned
+# clauses.
+
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Union
+from defns import *
+from drat import ProofWriter
+from encoding import ClauseArena, decode, encode
+from limits import Budget
+from proof import leaf, resolved
+from stats import Stats
+
+# Why a variable was assigned: either the ref of the clause that became unit,
+# or a unit `Clause` (such as an `Assumption`) that proves it directly.
+Reason = Union[int, Clause]
+
+class Propagator:
+    # How many literals `propagate` propagates between checks of the budget
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, formula: Iterable[Clause] = (), num_vars: int = 0,
+                 capacity: int = 0):
+        self.arena = ClauseArena(capacity)
+        # Proof trees for clauses that are not plain axioms; an axiom's proof
+        # is rebuilt from the arena the first time it is needed
+        self.proofs: Dict[int, Clause] = {}
+
+        # Per-literal state, indexed by packed literal
+        self.values: List[Optional[bool]] = []
+        self.watches: List[List[int]] = []
+        # Per-variable state, indexed by variable
+        self.reasons: List[Optional[Reason]] = []
+        self.levels: List[int] = []
+        self.num_vars = 0
+        self.grow(num_vars)
+
+        self.trail: List[int] = []
+        # The trail length at the start of each decision level
+        self.trail_lim: List[int] = []
+        # Index of the next trail literal to propagate
+        self.head = 0
+
+        # A clause that is already false when it is added
+        self.pending: Optional[int] = None
+        # Memoized proofs of the unit clause for each assigned variable
+        self.unit_proofs: Dict[int, Clause] = {}
+        # Every variable in the formula, in order of first appearance (see
+        # `variables`), and the number of clauses it was computed from
+        self._variables: Dict[int, None] = {}
+        self._variables_count = 0
+        # Called with the literals that are unassigned by each backtrack
+        self.on_backtrack: Optional[Callable[[List[int]], None]] = None
+
+        # The number of clauses added so far and the positions of the dropped
+        # tautologies among them, from which clause ids are assigned
+        self.added = 0
+        self.dropped: List[int] = []
+        # Where learned clauses are logged (if anywhere), and the id of each
+        # stored clause while logging
+        self.log: Optional[ProofWriter] = None
+        self.ids: Dict[int, int] = {}
+
+        # Counters and timers for the search (see `stats.py`)
+        self.stats = Stats()
+        # The budget of the search, and why the last propagation stopped early
+        # (if it did)
+        self.budget: Optional[Budget] = None
+        self.stopped: Optional[str] = None
+
+        for clause in formula:
+            self.add_clause(clause)
+
+    # Make room for variables up to `num_vars`
+    def grow(self, num_vars: int) -> None:
+        if num_vars <= self.num_vars:
+            return
+        extra = num_vars - self.num_vars
+        if not self.values:
+            # Literal 0 and 1 are unused (there is no variable 0)
+            extra += 1
+        self.values.extend([ None ] * (2 * extra))
+        self.watches.extend([] for _ in range(2 * extra))
+        self.reasons.extend([ None ] * extra)
+        self.levels.extend([ 0 ] * extra)
+        self.num_vars = num_vars
+
+    # Every variable in the formula, in order of first appearance
+    @property
+    def variables(self) -> Dict[int, None]:
+        if self._variables_count != len(self.arena):
+            data = self.arena.data
+            self._variables = dict.fromkeys(data[k] >> 1
+                                            for ref in self.arena.refs()
+                                            for k in range(ref + 1, ref + 1 + data[ref]))
+            self._variables_count = len(self.arena)
+        return self._variables
+
+    def is_assigned(self, variable: int) -> bool:
+        return self.values[variable << 1] is not None
+
+    # The current assignment in the public format
+    def assignments(self) -> Dict[int, bool]:
+        return { lit >> 1: bool(lit & 1) for lit in self.trail }
+
+    # Add a public clause to the formula
+    def add_clause(self, clause: Clause) -> None:
+        proof = None if isinstance(clause, Axiom) else clause
+        self.add_literals([ encode(l) for l in clause ], proof)
+
+    # Add a clause of packed literals, watching two of them. `proof` is the
+    # clause's proof tree, or None if the clause is an axiom. Clauses can be
+    # added while literals are assigned at level 0, but not at higher levels.
+    def add_literals(self, lits: Sequence[int], proof: Optional[Clause] = None) -> None:
+        self.added += 1
+        unique = set(lits)
+        if len(unique) != len(lits):
+            lits = list(dict.fromkeys(lits))
+        if any(lit ^ 1 in unique for lit in unique):
+            # Tautologies are always satisfied and can never propagate
+            self.dropped.append(self.added)
+            return
+
+        self.grow(max(lits, default=0) >> 1)
+        values = self.values
+        if self.trail and len(lits) > 1:
+            # Watch literals that are not false, if there are any
+            lits = sorted(lits, key=lambda lit: values[lit] is False)
+        ref = self.arena.add(lits)
+        if proof is not None:
+            self.proofs[ref] = proof
+        if self.log is not None:
+            self.ids[ref] = self.added
+
+        if not lits:
+            self.pending = ref
+            return
+        if len(lits) > 1:
+            self.watches[lits[0]].append(ref)
+            self.watches[lits[1]].append(ref)
+        if len(lits) == 1 or values[lits[1]] is False:
+            # The clause is unit (or false)
+            value = values[lits[0]]
+            if value is None:
+                self.assign(lits[0], ref)
+            elif not value and self.pending is None:
+                self.pending = ref
+
+    # Add many clauses at once, laid out as in the arena (see
+    # `ClauseArena.extend`), with `refs` the offset of each within `block`.
+    # This is what `add_literals` does for each clause, minus the checks: the
+    # clauses must have no repeated literals and no tautologies, and nothing
+    # can be assigned yet. `dropped` are the positions (counting from 1 among
+    # the `len(refs) + len(dropped)` clauses) of tautologies that were left
+    # out, which matter for the ids of an LRAT proof.
+    def add_block(self, block, refs: Sequence[int], num_vars: int,
+                  dropped: Sequence[int] = ()) -> None:
+        if self.trail or self.log is not None:
+            raise ValueError('Clauses can only be added in bulk before anything is assigned')
+        self.grow(num_vars)
+        self.dropped.extend(self.added + position for position in dropped)
+        self.added += len(refs) + len(dropped)
+        base = self.arena.extend(block, len(refs))
+        data, watches = self.arena.data, self.watches
+        units = []
+        for ref in refs:
+            ref += base
+            size = data[ref]
+            if size > 1:
+                watches[data[ref + 1]].append(ref)
+                watches[data[ref + 2]].append(ref)
+            elif size == 1:
+                units.append(ref)
+            else:
+                self.pending = ref
+        # The units go last, so that propagation visits the clauses they falsify
+        values = self.values
+        for ref in units:
+            lit = data[ref + 1]
+            if values[lit] is None:
+                self.assign(lit, ref)
+            elif not values[lit] and self.pending is None:
+                self.pending = ref
+
+    # Log learned clauses to `writer` instead of building proof trees. Every
+    # clause added so far gets its id.
+    def start_log(self, writer: ProofWriter) -> None:
+        self.log = writer
+        dropped = set(self.dropped)
+        position = 0
+        for ref in self.arena.refs():
+            position += 1
+            while position in dropped:
+                position += 1
+            self.ids[ref] = position
+
+    # Add a learned clause whose first literal is unassigned and whose other
+    # literals are all false, and assign its first literal. `proof` is its
+    # proof tree, or, while logging, `hints` are the ids of the clauses that
+    # derive it by unit propagation (for LRAT).
+    def learn(self, lits: Sequence[int], proof: Optional[Clause],
+              hints: Sequence[int] = ()) -> int:
+        self.stats.learned += 1
+        ref = self.arena.add(lits)
+        if self.log is not None:
+            self.added += 1
+            self.ids[ref] = self.added
+            self.log.add(lits, self.added, hints)
+        else:
+            self.proofs[ref] = proof
+        if len(lits) > 1:
+            self.watches[lits[0]].append(ref)
+            self.watches[lits[1]].append(ref)
+        self.assign(lits[0], ref)
+        return ref
+
+    # Whether a clause is the reason for a current assignment (which is always
+    # the clause's first literal)
+    def locked(self, ref: int) -> bool:
+        lit = self.arena.data[ref + 1]
+        return self.values[lit] is True and self.reasons[lit >> 1] == ref
+
+    # Delete clauses that are not locked, logging the deletions
+    def delete_clauses(self, refs: Iterable[int]) -> None:
+        arena, data, log = self.arena, self.arena.data, self.log
+        deleted: Set[int] = set()
+        for ref in refs:
+            if log is not None:
+                log.delete(arena.literals(ref), self.ids.pop(ref))
+            deleted.add(ref)
+            self.proofs.pop(ref, None)
+        # Only clauses with at least two literals are watched
+        watched = { data[ref + k] for ref in deleted if data[ref] > 1 for k in (1, 2) }
+        for lit in watched:
+            self.watches[lit] = [ ref for ref in self.watches[lit] if ref not in deleted ]
+        for ref in deleted:
+            arena.delete(ref)
+
+    # Reclaim the space of deleted clauses, updating every ref that is held
+    # here. Returns the new ref of every clause that moved.
+    def compact(self) -> Dict[int, int]:
+        moved = self.arena.compact()
+        if not moved:
+            return moved
+        for watchers in self.watches:
+            for i, ref in enumerate(watchers):
+                watchers[i] = moved.get(ref, ref)
+        reasons = self.reasons
+        for lit in self.trail:
+            reason = reasons[lit >> 1]
+            if isinstance(reason, int):
+                reasons[lit >> 1] = moved.get(reason, reason)
+        self.proofs = { moved.get(ref, ref): proof for ref, proof in self.proofs.items() }
+        if self.log is not None:
+            self.ids = { moved.get(ref, ref): id for ref, id in self.ids.items() }
+        if self.pending is not None:
+            self.pending = moved.get(self.pending, self.pending)
+        return moved
+
+    # Assign a literal to be true and queue it for propagation
+    def assign(self, lit: int, reason: Reason) -> None:
+        self.values[lit] = True
+        self.values[lit ^ 1] = False
+        self.reasons[lit >> 1] = reason
+        self.levels[lit >> 1] = len(self.trail_lim)
+        self.trail.append(lit)
+
+    def decision_level(self) -> int:
+        return len(self.trail_lim)
+
+    # Open a new decision level without assigning anything (for an assumption
+    # that already holds, see `incremental.py`)
+    def new_level(self) -> None:
+        self.trail_lim.append(len(self.trail))
+
+    # Open a new decision level by assuming the given literal
+    def decide(self, lit: int) -> None:
+        self.stats.decisions += 1
+        self.new_level()
+        self.assign(lit, leaf(Assumption(decode(lit))))
+
+    # The literal that was decided at the given level (counting from 1)
+    def decision(self, level: int) -> int:
+        return self.trail[self.trail_lim[level - 1]]
+
+    # Undo every assignment made above the given decision level
+    def backtrack(self, level: int) -> None:
+        if level >= len(self.trail_lim):
+            return
+        start = self.trail_lim[level]
+        values, reasons, unit_proofs = self.values, self.reasons, self.unit_proofs
+        undone = self.trail[start:]
+        for lit in undone:
+            values[lit] = values[lit ^ 1] = None
+            reasons[lit >> 1] = None
+            if unit_proofs:
+                unit_proofs.pop(lit >> 1, None)
+        if self.on_backtrack is not None:
+            self.on_backtrack(undone)
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.head = min(self.head, start)
+
+    # Propagate every queued assignment. Returns the ref of a clause whose
+    # literals are all false, or None if no conflict was found (or if the
+    # budget stopped the propagation, see `stopped`).
+    def propagate(self) -> Optional[int]:
+        self.stopped = None
+        if self.pending is not None:
+            return self.pending
+
+        data = self.arena.data
+        values = self.values
+        watches = self.watches
+        trail = self.trail
+        start = self.head
+        budget = self.budget
+        check = start + self.CHECK_INTERVAL if budget is not None else sys.maxsize
+        while self.head < len(trail):
+            if self.head >= check:
+                check = self.head + self.CHECK_INTERVAL
+                reason = budget.interrupted()
+                if reason is not None:
+                    self.stopped = reason
+                    self.stats.propagations += self.head - start
+                    return None
+            false_lit = trail[self.head] ^ 1
+            self.head += 1
+
+            watchers = watches[false_lit]
+            kept = 0
+            i = 0
+            n = len(watchers)
+            while i < n:
+                ref = watchers[i]
+                i += 1
+                # Keep the falsified watch in the second position
+                first = data[ref + 1]
+                if first == false_lit:
+                    first = data[ref + 2]
+                    data[ref + 1] = first
+                    data[ref + 2] = false_lit
+
+                if values[first]:
+                    # The clause is already satisfied
+                    watchers[kept] = ref
+                    kept += 1
+                    continue
+
+                # Look for a new literal to watch
+                for k in range(ref + 3, ref + 1 + data[ref]):
+                    lit = data[k]
+                    if values[lit] is not False:
+                        data[ref + 2] = lit
+                        data[k] = false_lit
+                        watches[lit].append(ref)
+                        break
+                else:
+                    watchers[kept] = ref
+                    kept += 1
+                    if values[first] is None:
+                        self.assign(first, ref)
+                    else:
+                        # Every literal is false: keep the remaining watchers
+                        # and stop propagating
+                        while i < n:
+                            watchers[kept] = watchers[i]
+                            kept += 1
+                            i += 1
+                        del watchers[kept:]
+                        stats = self.stats
+                        stats.propagations += self.head - start
+                        stats.conflicts += 1
+                        self.head = len(trail)
+                        return ref
+
+            del watchers[kept:]
+
+        self.stats.propagations += self.head - start
+        return None
+
+    # The proof tree of a stored clause
+    def clause_proof(self, ref: int) -> Clause:
+        proof = self.proofs.get(ref)
+        if proof is None:
+            proof = self.proofs[ref] = leaf(self.arena.axiom(ref))
+        return proof
+
+    # Resolve `clause` with the proof of the unit clause that falsified `lit`,
+    # removing `lit` from the clause.
+    def _resolve_false(self, clause: Clause, lit: int) -> ResolvedClause:
+        return resolved(clause.literals - { decode(lit) }, clause,
+                        self.unit_proofs[lit >> 1])
+
+    # Compute (and memoize) the unit proofs of the given variables. Proofs are
+    # built in trail order so that each one only depends on earlier ones, which
+    # keeps this iterative no matter how long the implication chains get.
+    def _prove_units(self, variables: Iterable[int]) -> None:
+        arena = self.arena
+        needed: Set[int] = set()
+        stack = [ v for v in variables if v not in self.unit_proofs ]
+        while stack:
+            variable = stack.pop()
+            if variable in needed:
+                continue
+            needed.add(variable)
+            reason = self.reasons[variable]
+            if isinstance(reason, int):
+                stack.extend(lit >> 1 for lit in arena.literals(reason)
+                             if lit >> 1 != variable and
+                                lit >> 1 not in self.unit_proofs)
+
+        for lit in self.trail:
+            variable = lit >> 1
+            if variable not in needed:
+                continue
+            reason = self.reasons[variable]
+            if isinstance(reason, int):
+                proof = self.clause_proof(reason)
+                for other in arena.literals(reason):
+                    if other != lit:
+                        proof = self._resolve_false(proof, other)
+                self.unit_proofs[variable] = proof
+            else:
+                self.unit_proofs[variable] = reason
+
+    # A proof of the unit clause containing the assigned literal of `variable`
+    def unit_proof(self, variable: int) -> Clause:
+        self._prove_units([ variable ])
+        return self.unit_proofs[variable]
+
+    # A proof of the given clause with all of its false literals resolved away
+    def reduced_proof(self, ref: int) -> Clause:
+        false_lits = [ lit for lit in self.arena.literals(ref)
+                       if self.values[lit] is False ]
+        self._prove_units(lit >> 1 for lit in false_lits)
+        proof = self.clause_proof(ref)
+        for lit in false_lits:
+            proof = self._resolve_false(proof, lit)
+        return proof
+
+    # A proof of the empty clause from a clause whose literals are all false
+    def conflict_proof(self, ref: int) -> Clause:
+        return self.reduced_proof(ref)
+
+    # The LRAT hints that assign the given level 0 variables by unit
+    # propagation: the ids of their reasons and of everything those depend on,
+    # each after the reasons it depends on
+    def fixed_hints(self, variables: Iterable[int]) -> List[int]:
+        arena, reasons, ids = self.arena, self.reasons, self.ids
+        hints: List[int] = []
+        visited: Set[int] = set()
+        for root in variables:
+            stack = [ (root, False) ]
+            while stack:
+                variable, expanded = stack.pop()
+                if expanded:
+                    hints.append(ids[reasons[variable]])
+                    continue
+                if variable in visited:
+                    continue
+                visited.add(variable)
+                stack.append((variable, True))
+                stack.extend((lit >> 1, False) for lit in arena.literals(reasons[variable])
+                             if lit >> 1 not in visited)
+        return hints
+
+    # Log the empty clause, derived from a conflict at level 0
+    def log_conflict(self, ref: int) -> None:
+        hints: List[int] = []
+        if self.log.lrat:
+            hints = self.fixed_hints(lit >> 1 for lit in self.arena.literals(ref))
+            hints.append(self.ids[ref])
+        self.added += 1
+        self.log.add([], self.added, hints)
+
+    # The clauses that are not yet satisfied, each reduced by the current
+    # assignment. Equal reductions are the same shared node (see proof.py), so
+    # they are told apart by `id`: hashing a proof would walk all of it.
+    def residual(self) -> List[Clause]:
+        values = self.values
+        proofs: Dict[int, Clause] = {}
+        for ref in self.arena.refs():
+            if not any(values[lit] for lit in self.arena.literals(ref)):
+                proof = self.reduced_proof(ref)
+                proofs.setdefault(id(proof), proof)
+        return list(proofs.values())
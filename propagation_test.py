@@ -0,0 +1,85 @@
+from defns import *
+from dpll import remove_assumption, unit_propagate
+from dpll_test import validate_proof
+from encoding import from_dimacs, to_dimacs
+from propagation import Propagator
+
+def trail(propagator):
+    return [ to_dimacs(lit) for lit in propagator.trail ]
+
+def test_propagation_order():
+    propagator = Propagator(cnf([ [-2, 3], [1], [-1, 2], [-3, -1, 4] ]))
+    assert propagator.propagate() is None
+    # Each literal is propagated after the literals that made it unit
+    assert trail(propagator) == [ 1, 2, 3, 4 ]
+    assert propagator.assignments() == { 1: True, 2: True, 3: True, 4: True }
+    assert all(level == 0 for level in propagator.levels[1:5])
+    # A reason is the ref of the clause that became unit
+    assert sorted(map(to_dimacs, propagator.arena.literals(propagator.reasons[4]))) == [ -3, -1, 4 ]
+
+def test_conflict():
+    formula = cnf([ [1], [-1, 2], [-1, -2], [3, 4] ])
+    propagator = Propagator(formula)
+    conflict = propagator.propagate()
+    assert conflict is not None
+    assert all(propagator.values[lit] is False for lit in propagator.arena.literals(conflict))
+    proof = propagator.conflict_proof(conflict)
+    assert len(proof) == 0
+    validate_proof(proof, formula)
+
+def test_empty_clause_is_pending():
+    propagator = Propagator(cnf([ [1, 2] ]))
+    propagator.add_literals([])
+    assert propagator.pending is not None and propagator.propagate() == propagator.pending
+
+def test_decide_and_backtrack():
+    propagator = Propagator(cnf([ [-1, 2], [-2, 3], [-4, -3], [5] ]))
+    assert propagator.propagate() is None
+    propagator.decide(from_dimacs(1))
+    assert propagator.propagate() is None
+    assert trail(propagator) == [ 5, 1, 2, 3, -4 ]
+    assert propagator.decision_level() == 1 and propagator.decision(1) == from_dimacs(1)
+    assert propagator.levels[4] == 1
+
+    propagator.backtrack(0)
+    assert trail(propagator) == [ 5 ] and propagator.decision_level() == 0
+    assert not any(propagator.is_assigned(v) for v in (1, 2, 3, 4))
+    # The watches still work after backtracking
+    propagator.decide(from_dimacs(4))
+    assert propagator.propagate() is None
+    assert trail(propagator) == [ 5, 4, -3, -2, -1 ]
+
+def test_conflict_under_assumption():
+    formula = cnf([ [-1, 2], [-1, -2], [1, 3] ])
+    propagator = Propagator(formula)
+    propagator.decide(from_dimacs(1))
+    conflict = propagator.propagate()
+    assert conflict is not None
+    # The refutation rests on the assumption; removing it proves its negation
+    proof = propagator.conflict_proof(conflict)
+    assert len(proof) == 0
+    negation = remove_assumption(Assumption(Literal(1, True)), proof)
+    assert negation.literals == { Literal(1, False) }
+    validate_proof(negation, formula)
+
+    propagator.backtrack(0)
+    assert propagator.propagate() is None and trail(propagator) == []
+
+def test_unit_propagate_residual():
+    formula = cnf([ [1], [-1, 2, 3], [-2, 4], [1, 5] ])
+    assignments = {}
+    residual = unit_propagate(formula, assignments)
+    assert assignments == { 1: True }
+    assert sorted(sorted(map(str, clause)) for clause in residual) == [ [ '-2', '4' ], [ '2', '3' ] ]
+    for clause in residual:
+        validate_proof(clause, formula)
+
+def test_unit_propagate_long_chain():
+    # The reduced clause at the end has a proof thousands of resolutions deep
+    chain = [ [1] ] + [ [-i, i + 1] for i in range(1, 3000) ] + [ [-3000, 3001, 3002] ]
+    assignments = {}
+    residual = unit_propagate(cnf(chain), assignments)
+    assert len(assignments) == 3000 and all(assignments.values())
+    assert len(residual) == 1 and set(map(str, residual[0])) == { '3001', '3002' }
+    conflict = unit_propagate(cnf(chain + [ [-3001], [-3002] ]), {})
+    assert len(conflict) == 1 and len(conflict[0]) == 0
@@ -0,0 +1,117 @@
+# Restart policies for the CDCL search.
+#
+# A restart backtracks to level 0 and lets the heuristic choose again from the
+# top. The learned clauses are kept, so no work is lost, but a bad early
+# decision no longer traps the search in a huge subtree. Combined with phase
+# saving (see `Heuristic.unassigned`), which decides each variable with the
+# sign it had last, a restart mostly rebuilds the same assignment, reordered
+# by what the search has learned since.
+#
+# The available policies are
+#
+#   - 'none': never restart
+#   - 'luby': restart after UNIT times the next term of the Luby sequence
+#     (1, 1, 2, 1, 1, 2, 4, 1, ...) conflicts
+#   - 'geometric': restart after FIRST conflicts, then after FACTOR times as
+#     many as the last time
+#   - 'glucose': restart when the learned clauses of the last WINDOW conflicts
+#     are worse, on average, than the ones learned so far, measured by their
+#     LBD (the number of decision levels among their literals, see `cdcl.lbd`)
+#
+# The search tells the policy about every conflict, and asks it whether a
+# restart is due whenever propagation finishes without a conflict.
+
+from collections import deque
+
+# The `i`th term (counting from 1) of the Luby sequence
+def luby(i: int) -> int:
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+class RestartPolicy:
+    def __init__(self):
+        # Conflicts since the last restart
+        self.conflicts = 0
+
+    # Called with the LBD of the clause learned from each conflict
+    def conflict(self, lbd: int) -> None:
+        self.conflicts += 1
+
+    def due(self) -> bool:
+        return False
+
+    def restarted(self) -> None:
+        self.conflicts = 0
+
+class LubyRestarts(RestartPolicy):
+    UNIT = 100
+
+    def __init__(self):
+        super().__init__()
+        self.count = 1
+
+    def due(self) -> bool:
+        return self.conflicts >= self.UNIT * luby(self.count)
+
+    def restarted(self) -> None:
+        super().restarted()
+        self.count += 1
+
+class GeometricRestarts(RestartPolicy):
+    FIRST = 100
+    FACTOR = 1.5
+
+    def __init__(self):
+        super().__init__()
+        self.limit = float(self.FIRST)
+
+    def due(self) -> bool:
+        return self.conflicts >= self.limit
+
+    def restarted(self) -> None:
+        super().restarted()
+        self.limit *= self.FACTOR
+
+class GlucoseRestarts(RestartPolicy):
+    WINDOW = 50
+    K = 0.8
+
+    def __init__(self):
+        super().__init__()
+        self.recent: deque = deque(maxlen=self.WINDOW)
+        self.recent_sum = 0
+        self.total_sum = 0
+        self.total = 0
+
+    def conflict(self, lbd: int) -> None:
+        super().conflict(lbd)
+        if len(self.recent) == self.WINDOW:
+            self.recent_sum -= self.recent[0]
+        self.recent.append(lbd)
+        self.recent_sum += lbd
+        self.total_sum += lbd
+        self.total += 1
+
+    def due(self) -> bool:
+        return (len(self.recent) == self.WINDOW and
+                self.recent_sum / self.WINDOW * self.K > self.total_sum / self.total)
+
+    def restarted(self) -> None:
+        super().restarted()
+        self.recent.clear()
+        self.recent_sum = 0
+
+RESTARTS = {
+    'none': RestartPolicy,
+    'luby': LubyRestarts,
+    'geometric': GeometricRestarts,
+    'glucose': GlucoseRestarts,
+}
+
+def make_restarts(name: str) -> RestartPolicy:
+    if name not in RESTARTS:
+        raise ValueError(f'Unknown restart policy: {name}')
+    return RESTARTS[name]()
@@ -0,0 +1,58 @@
+import pytest
+from config import Config
+from defns import *
+from dpll import dpll
+from heuristics import make_heuristic
+from propagation import Propagator
+from restarts import GeometricRestarts, GlucoseRestarts, LubyRestarts, luby, make_restarts
+
+def test_luby():
+    assert [ luby(i) for i in range(1, 16) ] == [ 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8 ]
+
+def restart_points(policy, lbds):
+    points = []
+    for n, value in enumerate(lbds, start=1):
+        policy.conflict(value)
+        if policy.due():
+            policy.restarted()
+            points.append(n)
+    return points
+
+def test_luby_schedule():
+    assert restart_points(LubyRestarts(), [ 2 ] * 700) == [ 100, 200, 400, 500, 600 ]
+
+def test_geometric_schedule():
+    assert restart_points(GeometricRestarts(), [ 2 ] * 500) == [ 100, 250, 475 ]
+
+def test_glucose_restarts_when_clauses_get_worse():
+    policy = GlucoseRestarts()
+    assert restart_points(policy, [ 3 ] * 200) == []
+    # The window is already full, so a few bad clauses are enough
+    assert restart_points(policy, [ 10 ] * 50) == [ 8 ]
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        make_restarts('sometimes')
+
+def test_phase_saving():
+    propagator = Propagator(cnf([ [1, 2], [-1, 3] ]))
+    heuristic = make_heuristic('first', propagator)
+    heuristic.save_phases = True
+    propagator.decide(heuristic.pick() ^ 1)
+    propagator.propagate()
+    propagator.backtrack(0)
+    assert heuristic.pick() == 1 << 1
+
+@pytest.mark.parametrize('restart', [ 'luby', 'geometric', 'glucose' ])
+def test_pigeonhole(restart, monkeypatch):
+    # Restart often enough to matter on a small formula
+    monkeypatch.setattr(LubyRestarts, 'UNIT', 4)
+    monkeypatch.setattr(GeometricRestarts, 'FIRST', 4)
+    monkeypatch.setattr(GlucoseRestarts, 'WINDOW', 5)
+    holes = 4
+    var = lambda p, h: p * holes + h + 1
+    formula = cnf([ [ var(p, h) for h in range(holes) ] for p in range(holes + 1) ] +
+                  [ [ -var(p, h), -var(q, h) ] for h in range(holes)
+                    for p in range(holes + 1) for q in range(p) ])
+    result = dpll(formula, Config(learn=True, heuristic='vsids', restart=restart))
+    assert not result.sat() and len(result.clause) == 0
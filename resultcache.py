@@ -0,0 +1,282 @@
+# A cache of solver results, keyed by a canonical form of the formula.
+#
+# The same formula is often solved again, with its clauses in another order or
+# its variables renumbered. `ResultCache.solve` puts a formula in canonical
+# form, and only searches if no result is cached for it:
+#
+#     > cache = ResultCache(rename=True)
+#     > cache.solve(cnf([ [1, 2], [-1] ]))
+#     > cache.solve(cnf([ [-7], [7, 3] ])).assignments    # a hit
+#     {7: False, 3: True}
+#
+# The canonical form sorts each clause's literals and the clauses themselves,
+# dropping repeated clauses and tautologies. With `rename`, the variables are
+# also renumbered, in an order that does not depend on their numbers: each
+# variable is labelled by how it occurs (in clauses of which sizes, with which
+# signs), and the labels are refined ROUNDS times by the labels of the clauses
+# the variable occurs in. Variables are then numbered by label, with ties broken
+# by their original numbers, so two renumberings of a formula usually, though
+# not always, get the same form. Either way the key is the SHA-256 digest of the
+# whole canonical form, so a hit always means the formulas are the same up to
+# the renaming.
+#
+# A model is stored in canonical numbering and translated back to the caller's
+# variables on a hit. A refutation is stored by reference: the proof the solver
+# returned, which is reused as it is when the formula's numbering is the same
+# as the one it was found for. Otherwise (or when it comes from disk) the result
+# is an unchecked `Lemma` whose source is the original proof file, if there was
+# one, or SOURCE. UNKNOWN results are not cached.
+#
+# Results live in an LRU in memory of at most `max_bytes` (as estimated by
+# `_size`, which counts a refutation by the distinct nodes of its proof, even
+# those it shares with other proofs), and, with a `directory`, in one JSON file
+# per formula there, the oldest deleted once they take up more than
+# `max_disk_bytes`. `hits`, `misses` and `evictions` (from either) count what
+# the cache has done.
+
+import hashlib
+import json
+import os
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from defns import *
+from config import Config
+from dpll import solve
+from encoding import encode
+from limits import UNKNOWNResult
+from proof import Lemma, pack
+from propagation import Propagator
+
+# How many times the labels of renamed variables are refined
+ROUNDS = 3
+# The source of the `Lemma` of a cached refutation without a proof file
+SOURCE = 'cache'
+# What a proof node costs in memory, roughly: the node and its set of literals
+NODE_BYTES = 800
+
+Formula = Union[Iterable[Clause], Propagator]
+
+@dataclass(frozen=True)
+class Canonical:
+    key: str
+    # The number of each variable of the formula in the canonical form
+    renaming: Dict[int, int]
+
+    # A digest of the renaming, which tells whether two formulas with the same
+    # key were numbered the same way
+    def numbering(self) -> str:
+        items = array('q', [ n for item in sorted(self.renaming.items()) for n in item ])
+        return hashlib.sha256(items.tobytes()).hexdigest()
+
+# The clauses of a formula as sorted lists of packed literals, without
+# tautologies
+def _clauses(formula: Formula) -> List[List[int]]:
+    if isinstance(formula, Propagator):
+        arena = formula.arena
+        clauses = [ list(arena.literals(ref)) for ref in arena.refs() ]
+    else:
+        clauses = [ [ encode(l) for l in clause ] for clause in formula ]
+    result = []
+    for clause in clauses:
+        lits = sorted(set(clause))
+        if not any(lits[i] ^ 1 == lits[i + 1] for i in range(len(lits) - 1)):
+            result.append(lits)
+    return result
+
+# Number the variables by their refined labels (see above)
+def _renaming(clauses: List[List[int]]) -> Dict[int, int]:
+    occurrences: Dict[int, List[Tuple[int, int]]] = {}
+    for index, clause in enumerate(clauses):
+        for lit in clause:
+            occurrences.setdefault(lit >> 1, []).append((index, lit & 1))
+    labels = { variable: hash(tuple(sorted((len(clauses[index]), sign)
+                                           for index, sign in occurring)))
+               for variable, occurring in occurrences.items() }
+    for _ in range(ROUNDS):
+        clause_labels = [ hash(tuple(sorted((labels[lit >> 1], lit & 1) for lit in clause)))
+                          for clause in clauses ]
+        labels = { variable: hash((labels[variable],
+                                   tuple(sorted((clause_labels[index], sign)
+                                                for index, sign in occurring))))
+                   for variable, occurring in occurrences.items() }
+    order = sorted(labels, key=lambda variable: (labels[variable], variable))
+    return { variable: n for n, variable in enumerate(order, start=1) }
+
+# The canonical form of a formula (see above)
+def canonical(formula: Formula, rename: bool = False) -> Canonical:
+    clauses = _clauses(formula)
+    if rename:
+        renaming = _renaming(clauses)
+        clauses = [ sorted(((renaming[lit >> 1] << 1) | (lit & 1)) for lit in clause)
+                    for clause in clauses ]
+    else:
+        renaming = { lit >> 1: lit >> 1 for clause in clauses for lit in clause }
+    clauses = sorted(set(map(tuple, clauses)))
+    sha = hashlib.sha256(b'renamed' if rename else b'plain')
+    for clause in clauses:
+        sha.update(array('i', clause + (0,)).tobytes())
+    return Canonical(sha.hexdigest(), renaming)
+
+# What an entry costs in memory, roughly
+def _size(entry: Tuple[str, object, Optional[str]]) -> int:
+    status, value, _ = entry
+    if status == 'sat':
+        return 256 + 8 * len(value)
+    if isinstance(value, Clause):
+        return 256 + NODE_BYTES * len(pack(value))
+    return 256
+
+class ResultCache:
+    def __init__(self, max_bytes: int = 64 << 20, directory: Optional[str] = None,
+                 max_disk_bytes: int = 1 << 30, rename: bool = False):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.rename = rename
+        # Each key's status, model (canonical signed ints) or proof, and the
+        # numbering the proof was found for, least recently used first
+        self.entries: 'OrderedDict[str, Tuple[str, object, Optional[str]]]' = OrderedDict()
+        # What each entry was estimated to cost, so that a proof is only walked
+        # once
+        self.sizes: Dict[str, int] = {}
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        # How much room the files on disk take up
+        self.disk_size = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_size = sum(entry.stat().st_size for entry in os.scandir(directory)
+                                 if entry.name.endswith('.json'))
+
+    def canonical(self, formula: Formula) -> Canonical:
+        return canonical(formula, self.rename)
+
+    # The cached result for a formula, if there is one
+    def get(self, formula: Formula,
+            form: Optional[Canonical] = None) -> Optional[Union[SATResult, UNSATResult]]:
+        form = form or self.canonical(formula)
+        entry = self.entries.get(form.key)
+        if entry is not None:
+            self.entries.move_to_end(form.key)
+        else:
+            entry = self._read(form.key)
+            if entry is not None:
+                self._remember(form.key, entry)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        status, value, numbering = entry
+        if status == 'sat':
+            model = { abs(n): n > 0 for n in value }
+            return SATResult({ variable: model[n] for variable, n in form.renaming.items()
+                               if n in model })
+        if isinstance(value, Clause) and numbering == form.numbering():
+            return UNSATResult(value)
+        source = value.source if isinstance(value, Lemma) else value
+        return UNSATResult(Lemma([], source if isinstance(source, str) else SOURCE))
+
+    # Cache the result of solving a formula
+    def put(self, formula: Formula, result: Union[SATResult, UNSATResult, UNKNOWNResult],
+            form: Optional[Canonical] = None) -> None:
+        if isinstance(result, UNKNOWNResult):
+            return
+        form = form or self.canonical(formula)
+        if result.sat():
+            renaming = form.renaming
+            entry = ('sat', array('i', sorted(renaming[v] if value else -renaming[v]
+                                              for v, value in result.assignments.items()
+                                              if v in renaming)), None)
+        else:
+            entry = ('unsat', result.clause, form.numbering())
+        self._remember(form.key, entry)
+        self._write(form.key, entry)
+
+    # Solve a formula (see `dpll.solve`), unless its result is cached. A
+    # configuration with a proof file always searches, to write the proof.
+    def solve(self, formula: Formula,
+              config: Optional[Config] = None) -> Union[SATResult, UNSATResult, UNKNOWNResult]:
+        if not isinstance(formula, Propagator):
+            formula = list(formula)
+        form = self.canonical(formula)
+        result = None
+        if config is None or config.proof_file is None:
+            result = self.get(formula, form)
+        if result is None:
+            propagator = formula if isinstance(formula, Propagator) else Propagator(formula)
+            result = solve(propagator, config)
+            self.put(formula, result, form)
+        return result
+
+    def _remember(self, key: str, entry: Tuple[str, object, Optional[str]]) -> None:
+        if self.entries.pop(key, None) is not None:
+            self.size -= self.sizes.pop(key)
+        self.entries[key] = entry
+        self.sizes[key] = _size(entry)
+        self.size += self.sizes[key]
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            evicted, _ = self.entries.popitem(last=False)
+            self.size -= self.sizes.pop(evicted)
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _read(self, key: str) -> Optional[Tuple[str, object, Optional[str]]]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get('status') == 'sat':
+            return 'sat', array('i', record['model']), None
+        return 'unsat', record.get('proof'), record.get('numbering')
+
+    def _write(self, key: str, entry: Tuple[str, object, Optional[str]]) -> None:
+        if self.directory is None:
+            return
+        status, value, numbering = entry
+        if status == 'sat':
+            record = { 'status': 'sat', 'model': value.tolist() }
+        else:
+            # Only a proof file can be referred to from disk
+            record = { 'status': 'unsat', 'numbering': numbering,
+                       'proof': value.source if isinstance(value, Lemma) else None }
+        path = self._path(key)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        try:
+            old = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(temporary, 'w') as f:
+                json.dump(record, f)
+            os.replace(temporary, path)
+            self.disk_size += os.path.getsize(path) - old
+        except OSError:
+            # The disk store is only an optimization
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        if self.disk_size > self.max_disk_bytes:
+            self._trim()
+
+    # Delete the oldest files on disk until they fit in `max_disk_bytes`
+    def _trim(self) -> None:
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                status = entry.stat()
+                files.append((status.st_mtime_ns, status.st_size, entry.path))
+        self.disk_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if self.disk_size <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_size -= size
+            self.evictions += 1
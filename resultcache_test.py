@@ -0,0 +1,108 @@
+import random
+from hypothesis import given, settings, strategies as st
+from config import Config
+from defns import *
+from dpll_test import formulas, satisfies, validate_proof
+from generators import pigeonhole, random_ksat
+from limits import Limits
+from proof import Lemma, pack
+from propagation import Propagator
+from resultcache import NODE_BYTES, SOURCE, ResultCache, canonical
+
+# The formula with its variables renumbered, its clauses shuffled and their
+# literals reordered
+def scramble(formula, seed):
+    rng = random.Random(seed)
+    variables = sorted({ abs(n) for clause in formula for n in clause })
+    renaming = dict(zip(variables, rng.sample(range(1, 10 * len(variables) + 2), len(variables))))
+    clauses = [ rng.sample(clause, len(clause)) for clause in formula ]
+    rng.shuffle(clauses)
+    return [ [ renaming[abs(n)] if n > 0 else -renaming[abs(n)] for n in clause ]
+             for clause in clauses ]
+
+def test_canonical():
+    formula = [ [1, 2, 2], [-1, 3], [3, -1], [1, -1] ]
+    assert canonical(cnf(formula)).key == canonical(Propagator(cnf([ [3, -1], [2, 1] ]))).key
+    assert canonical(cnf(formula)).key != canonical(cnf([ [1, 2], [-1, 4] ])).key
+    assert canonical(cnf(formula)).key != canonical(cnf(formula), rename=True).key
+    renamed = canonical(cnf([ [5, 9], [-5, 2] ]), rename=True)
+    assert renamed.key == canonical(cnf([ [1, 2], [-1, 3] ]), rename=True).key
+    assert sorted(renamed.renaming) == [ 2, 5, 9 ]
+
+@given(st.integers(0, 1000))
+@settings(deadline=None, max_examples=50)
+def test_renamed_formulas_hit(seed):
+    formula = random_ksat(30, 3, 4.26, seed)
+    cache = ResultCache(rename=True)
+    first = cache.solve(cnf(formula), Config(learn=True))
+    other = scramble(formula, seed)
+    second = cache.solve(cnf(other))
+    assert cache.hits == 1 and cache.misses == 1
+    assert first.sat() == second.sat()
+    if second.sat():
+        assert satisfies(second.assignments, cnf(other))
+
+@given(formulas)
+@settings(deadline=None, max_examples=100)
+def test_hits_are_sound(formula):
+    # Whatever the renaming makes of a formula, a hit has the right answer
+    cache = ResultCache(rename=True)
+    truth = cache.solve(formula)
+    assert cache.solve(formula) == truth
+    if truth.sat():
+        assert satisfies(cache.solve(formula).assignments, formula)
+
+def test_unsat_proofs_by_reference():
+    formula = random_ksat(20, 3, 8.0, seed=1)
+    cache = ResultCache(rename=True)
+    result = cache.solve(cnf(formula))
+    validate_proof(result.clause, cnf(formula))
+    # The same numbering gets the same proof back
+    assert cache.solve(cnf(formula)).clause is result.clause
+    # Another numbering gets an unchecked lemma
+    assert cache.solve(cnf(scramble(formula, 1))) == UNSATResult(Lemma([], SOURCE))
+    assert cache.hits == 2
+    # Too symmetric for the labels to tell its variables apart: a miss, but
+    # still the right answer
+    assert not cache.solve(cnf(scramble(pigeonhole(3), 1))).sat()
+
+def test_eviction():
+    cache = ResultCache(max_bytes=2000)
+    for seed in range(10):
+        cache.solve(cnf(random_ksat(20, 3, 3.0, seed)))
+    assert cache.evictions > 0 and cache.size <= 2000
+    assert len(cache.entries) == 10 - cache.evictions
+    cache.solve(cnf(random_ksat(20, 3, 3.0, 0)))
+    assert cache.misses == 11
+
+def test_proofs_count_towards_size():
+    cache = ResultCache()
+    result = cache.solve(cnf(pigeonhole(4)), Config(learn=True))
+    assert cache.size >= NODE_BYTES * len(pack(result.clause))
+    # A proof larger than the whole cache evicts everything before it
+    small = ResultCache(max_bytes=cache.size - 1)
+    small.solve(cnf([ [1] ]))
+    small.solve(cnf(pigeonhole(4)), Config(learn=True))
+    assert small.evictions == 1 and len(small.entries) == 1
+
+def test_disk(tmp_path):
+    formula = random_ksat(40, 3, 3.0, seed=7)
+    directory = str(tmp_path / 'results')
+    ResultCache(directory=directory, rename=True).solve(cnf(formula))
+    cache = ResultCache(directory=directory, rename=True)
+    result = cache.solve(cnf(scramble(formula, 2)))
+    assert cache.hits == 1 and satisfies(result.assignments, cnf(scramble(formula, 2)))
+
+    proof = str(tmp_path / 'proof.drat')
+    ResultCache(directory=directory).solve(cnf(pigeonhole(3)), Config(learn=True, proof_file=proof))
+    cache = ResultCache(directory=directory)
+    assert cache.solve(cnf(pigeonhole(3))) == UNSATResult(Lemma([], proof))
+
+    small = ResultCache(directory=directory, max_disk_bytes=1)
+    small.solve(cnf([ [1] ]))
+    assert small.evictions >= 2 and small.disk_size <= 1
+
+def test_unknown_is_not_cached():
+    cache = ResultCache()
+    cache.solve(cnf(pigeonhole(7)), Config(limits=Limits(conflicts=5)))
+    assert not cache.entries
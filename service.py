@@ -0,0 +1,410 @@
+# A long-running solver service.
+#
+# Running `solver.py` once per query pays every time for starting the
+# interpreter and importing the solver. `SolverService` instead listens on a
+# Unix socket or a TCP port and solves the formulas it is sent in a pool of
+# `workers` processes forked once, when it starts:
+#
+#     $ python3 service.py --socket /tmp/sat.sock --workers 4
+#
+# Requests and responses are JSON objects, one per line. A request is
+#
+#     {"id": 1, "dimacs": "p cnf 2 1\n1 -2 0\n", "deadline": 5.0,
+#      "config": {"learn": true, "heuristic": "vsids"}, "progress": 1.0}
+#
+# where only the formula is required: DIMACS text as "dimacs", or a list of
+# clauses of DIMACS ints as "clauses". The "deadline" is in seconds from when
+# the request was read, waiting for a worker included; "config" sets any of the
+# `Config` fields in OPTIONS; and with "progress", the solver's statistics are
+# sent back every that many seconds while it searches:
+#
+#     {"id": 1, "event": "progress", "stats": {"decisions": 812, ...}}
+#
+# The last response to a request is its result,
+#
+#     {"id": 1, "event": "result", "status": "sat", "model": [1, -2],
+#      "stats": {...}, "latency": {"queued": 0.0, "solve": 0.01, "total": 0.01}}
+#
+# with a status as in batch.py: 'sat', 'unsat', 'unknown' (with a "reason",
+# 'time' when the deadline passed) or 'error' (with an "error" message). The
+# latency is the seconds the request waited for a worker, was solved for, and
+# spent in the service in all. The requests of one connection are solved
+# concurrently and answered as they finish, so the ids tell the responses
+# apart. A request {"id": 2, "metrics": true} is answered at once with the
+# service's counts and latency percentiles (see `Metrics`).
+#
+# At most `max_pending` requests are taken in at a time, waiting or solving.
+# Beyond that the service stops reading from its clients (but for one request
+# read ahead per connection), so that they are held back by their own socket
+# buffers rather than by the service's memory.
+#
+# The solver stops itself at a request's deadline (see `Limits`), and a worker
+# that has not answered GRACE seconds after it is killed and replaced. So is a
+# worker whose client goes away: closing a connection, or shutting it down for
+# writing, cancels all its requests still in progress. (While the service is
+# full it does not read, so it only notices a client has gone once it has room
+# for the client's next request.)
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from batch import result_record, stats_record
+from config import Config
+from dimacs import DimacsError, parse
+from dpll import solve
+from encoding import from_dimacs
+from limits import Limits
+from propagation import Propagator
+
+# The `Config` fields a request can set
+OPTIONS = ('learn', 'heuristic', 'seed', 'polarity', 'restart', 'phase_saving', 'reduce_db',
+           'preprocess', 'local_search', 'phase_init', 'flips')
+# Seconds a worker has after a deadline to stop by itself before it is killed
+GRACE = 1.0
+# The longest request line, in bytes. A connection buffers at most twice this.
+MAX_REQUEST = 64 << 20
+# How many of the latest requests the latency percentiles are taken over
+WINDOW = 1000
+
+# A request's formula (DIMACS text or clauses), `Config` options and progress
+# interval
+Job = Tuple[Optional[str], Optional[list], Dict[str, object], Optional[float]]
+Send = Callable[[Dict[str, object]], Awaitable[None]]
+
+# The propagator for a request's formula
+def _propagator(dimacs: Optional[str], clauses: Optional[list]) -> Propagator:
+    if dimacs is not None:
+        clauses = parse(dimacs, 'dimacs')
+    propagator = Propagator()
+    add = propagator.add_literals
+    for clause in clauses:
+        if (not isinstance(clause, list)
+                or not all(type(n) is int and n != 0 for n in clause)):
+            raise ValueError('each clause must be a list of non-zero ints')
+        add(list(map(from_dimacs, clause)))
+    return propagator
+
+# A worker process: solve each job sent through `connection` (with its time
+# limit), sending back ('progress', stats) while it searches and then
+# ('result', record)
+def _work(connection) -> None:
+    def report(stats) -> None:
+        connection.send(('progress', stats_record(stats)))
+
+    while True:
+        try:
+            dimacs, clauses, options, interval, time_limit = connection.recv()
+        except EOFError:
+            return
+        try:
+            config = Config(**options,
+                            limits=None if time_limit is None else Limits(time=time_limit),
+                            progress=None if interval is None else report,
+                            progress_interval=interval or 1.0)
+            record = result_record(solve(_propagator(dimacs, clauses), config), config)
+        except (DimacsError, ValueError, TypeError) as e:
+            record = { 'status': 'error', 'error': str(e) }
+        except Exception as e:
+            record = { 'status': 'error', 'error': repr(e) }
+        connection.send(('result', record))
+
+# The parts of a request that are passed to the worker, checked as far as can
+# be without parsing the formula
+def _job(request: Dict[str, object]) -> Job:
+    dimacs, clauses = request.get('dimacs'), request.get('clauses')
+    if (dimacs is None) == (clauses is None):
+        raise ValueError('a request needs either "dimacs" or "clauses"')
+    if dimacs is not None and not isinstance(dimacs, str):
+        raise ValueError('"dimacs" must be a string')
+    if clauses is not None and not isinstance(clauses, list):
+        raise ValueError('"clauses" must be a list of clauses')
+    options = request.get('config') or {}
+    if not isinstance(options, dict):
+        raise ValueError('"config" must be an object')
+    for name in options:
+        if name not in OPTIONS:
+            raise ValueError(f'unknown option {name!r}')
+    interval = request.get('progress')
+    if interval is True:
+        interval = 1.0
+    elif interval is False:
+        interval = None
+    for name, value in (('deadline', request.get('deadline')), ('progress', interval)):
+        if value is not None and (type(value) not in (int, float) or value <= 0):
+            raise ValueError(f'"{name}" must be a positive number of seconds')
+    return dimacs, clauses, options, interval
+
+# The 50th, 90th and 99th percentiles and the maximum of some latencies
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    percentiles = { f'p{q}': values[min(len(values) - 1, len(values) * q // 100)]
+                    for q in (50, 90, 99) }
+    percentiles['max'] = values[-1]
+    return percentiles
+
+# What the service has done: how many requests ended with each status, how
+# many were cancelled, and the latencies of the latest WINDOW requests
+class Metrics:
+    def __init__(self, window: int = WINDOW):
+        self.requests = 0
+        self.cancelled = 0
+        self.statuses: Dict[str, int] = {}
+        self.latencies: Deque[Dict[str, float]] = deque(maxlen=window)
+
+    def record(self, status: str, latency: Dict[str, float]) -> None:
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latencies.append(latency)
+
+    def snapshot(self) -> Dict[str, object]:
+        return { 'requests': self.requests, 'cancelled': self.cancelled,
+                 'statuses': dict(self.statuses),
+                 'latency': { part: _percentiles([ latency[part] for latency in self.latencies ])
+                              for part in ('queued', 'solve', 'total') } }
+
+# A worker process and the service's end of its pipe
+class Worker:
+    def __init__(self, context):
+        self.context = context
+        self._start()
+
+    def _start(self) -> None:
+        self.connection, child = self.context.Pipe()
+        self.process = self.context.Process(target=_work, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.alive = True
+
+    # Solve a job within `time_limit` seconds, awaiting `progress` with each
+    # report, and return the result
+    async def solve(self, job: Job, time_limit: Optional[float],
+                    progress: Callable[[Dict[str, object]], Awaitable[None]]) -> Dict[str, object]:
+        loop = asyncio.get_running_loop()
+        messages: asyncio.Queue = asyncio.Queue()
+        descriptor = self.connection.fileno()
+
+        def readable() -> None:
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                loop.remove_reader(descriptor)
+                self.alive = False
+                message = ('result', { 'status': 'error', 'error': 'the solver process died' })
+            messages.put_nowait(message)
+
+        # The worker is waiting for the job, so sending it does not block for
+        # long even when it is large
+        self.connection.send((*job, time_limit))
+        loop.add_reader(descriptor, readable)
+        try:
+            while True:
+                kind, value = await messages.get()
+                if kind == 'result':
+                    return value
+                await progress(value)
+        finally:
+            loop.remove_reader(descriptor)
+
+    # Kill the process, say because its job was cancelled, and start another
+    def restart(self) -> None:
+        self.close()
+        self._start()
+
+    def close(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+class SolverService:
+    def __init__(self, workers: int = 1, max_pending: Optional[int] = None):
+        if workers < 1:
+            raise ValueError('The service needs at least one worker')
+        self.workers = workers
+        self.max_pending = max_pending or 4 * workers
+        self.metrics = Metrics()
+        # Requests taken in and not yet answered
+        self.pending = 0
+        self.pool: List[Worker] = []
+        self.server: Optional[asyncio.AbstractServer] = None
+        # The socket path, or the (host, port) listened on
+        self.address: object = None
+
+    # Start the workers and listen on a Unix socket at `path` or, without one,
+    # on `host` and `port` (0 picks a free port; see `address`)
+    async def start(self, path: Optional[str] = None, host: str = '127.0.0.1',
+                    port: int = 0) -> None:
+        context = multiprocessing.get_context()
+        self.pool = [ Worker(context) for _ in range(self.workers) ]
+        self.idle: asyncio.Queue = asyncio.Queue()
+        for worker in self.pool:
+            self.idle.put_nowait(worker)
+        self.slots = asyncio.Semaphore(self.max_pending)
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._connection, path,
+                                                          limit=MAX_REQUEST)
+            self.address = path
+        else:
+            self.server = await asyncio.start_server(self._connection, host, port,
+                                                     limit=MAX_REQUEST)
+            self.address = self.server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+            self.server = None
+        for worker in self.pool:
+            worker.close()
+
+    async def __aenter__(self) -> 'SolverService':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _connection(self, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+
+        async def send(message: Dict[str, object]) -> None:
+            async with lock:
+                writer.write(json.dumps(message).encode() + b'\n')
+                await writer.drain()
+
+        def done(task: asyncio.Task) -> None:
+            tasks.discard(task)
+            self.pending -= 1
+            self.slots.release()
+
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    # Gone, or sent a line longer than MAX_REQUEST
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                received = time.monotonic()
+                await self.slots.acquire()
+                self.pending += 1
+                task = asyncio.create_task(self._request(line, received, send))
+                tasks.add(task)
+                task.add_done_callback(done)
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    # Answer one request line
+    async def _request(self, line: bytes, received: float, send: Send) -> None:
+        id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+            id = request.get('id')
+            if request.get('metrics'):
+                await send({ 'id': id, 'event': 'metrics', **self.metrics.snapshot(),
+                             'pending': self.pending, 'idle': self.idle.qsize() })
+                return
+            job = _job(request)
+        except ValueError as e:
+            record: Dict[str, object] = { 'status': 'error', 'error': str(e) }
+            started = received
+        else:
+            deadline = request.get('deadline')
+            try:
+                record, started = await self._solve(job, received, deadline, id, send)
+            except ConnectionError:
+                # The client went away while progress was sent
+                self.metrics.cancelled += 1
+                return
+            except asyncio.CancelledError:
+                self.metrics.cancelled += 1
+                raise
+
+        finished = time.monotonic()
+        latency = { 'queued': started - received, 'solve': finished - started,
+                    'total': finished - received }
+        self.metrics.record(str(record['status']), latency)
+        try:
+            await send({ 'id': id, 'event': 'result', **record, 'latency': latency })
+        except ConnectionError:
+            pass
+
+    # Solve a job by its deadline (if any), and return the result and when the
+    # solving started
+    async def _solve(self, job: Job, received: float, deadline: Optional[float], id: object,
+                     send: Send) -> Tuple[Dict[str, object], float]:
+        end = None if deadline is None else received + deadline
+        try:
+            worker = await asyncio.wait_for(self.idle.get(),
+                                            None if end is None else end - time.monotonic())
+        except asyncio.TimeoutError:
+            return { 'status': 'unknown', 'reason': 'time' }, time.monotonic()
+
+        async def progress(stats: Dict[str, object]) -> None:
+            await send({ 'id': id, 'event': 'progress', 'stats': stats })
+
+        started = time.monotonic()
+        time_limit = None if end is None else max(0.0, end - started)
+        try:
+            record = await asyncio.wait_for(worker.solve(job, time_limit, progress),
+                                            None if time_limit is None else time_limit + GRACE)
+        except asyncio.TimeoutError:
+            worker.restart()
+            record = { 'status': 'unknown', 'reason': 'time' }
+        except BaseException:
+            # Cancelled, or the client went away while progress was sent
+            worker.restart()
+            raise
+        else:
+            if not worker.alive:
+                worker.restart()
+        finally:
+            self.idle.put_nowait(worker)
+        return record, started
+
+# Run a service until it is interrupted or terminated
+async def serve(path: Optional[str] = None, host: str = '127.0.0.1', port: int = 0,
+                workers: int = 1, max_pending: Optional[int] = None) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(number, stop.set)
+    async with SolverService(workers, max_pending) as service:
+        await service.start(path, host, port)
+        print(f'c listening on {service.address}', file=sys.stderr, flush=True)
+        await stop.wait()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve SAT solving requests over a socket')
+    parser.add_argument('--socket', help='listen on a Unix socket at this path')
+    parser.add_argument('--host', default='127.0.0.1', help='listen on this host (with --port)')
+    parser.add_argument('--port', type=int, default=0, help='listen on this TCP port')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='solve this many requests at once')
+    parser.add_argument('--max-pending', type=int,
+                        help='take in at most this many requests at once (default: 4 per worker)')
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket, args.host, args.port, args.workers, args.max_pending))
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+from defns import *
+from dpll_test import satisfies
+from generators import pigeonhole, random_ksat
+from service import GRACE, SolverService
+
+def dimacs(formula):
+    variables = max(abs(n) for clause in formula for n in clause)
+    return f'p cnf {variables} {len(formula)}\n' + ''.join(
+        ' '.join(map(str, clause)) + ' 0\n' for clause in formula)
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def connect(cls, service):
+        if isinstance(service.address, str):
+            return cls(*await asyncio.open_unix_connection(service.address))
+        return cls(*await asyncio.open_connection(*service.address))
+
+    async def send(self, **request):
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+
+    async def receive(self):
+        return json.loads(await self.reader.readline())
+
+    # The results of `n` requests by id, and the other responses in order
+    async def results(self, n):
+        results, events = {}, []
+        while len(results) < n:
+            response = await self.receive()
+            if response['event'] == 'result':
+                results[response['id']] = response
+            else:
+                events.append(response)
+        return results, events
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+def run(test, workers=1, max_pending=None, path=None):
+    async def main():
+        async with SolverService(workers, max_pending) as service:
+            await service.start(path)
+            await test(service)
+    asyncio.run(main())
+
+def test_requests(tmp_path):
+    sat = random_ksat(30, 3, 3.0, seed=1)
+    async def test(service):
+        client = await Client.connect(service)
+        await client.send(id=1, dimacs=dimacs(sat), config={ 'learn': True })
+        await client.send(id=2, clauses=pigeonhole(4), deadline=30)
+        await client.send(id=3, dimacs='p cnf 1 1\n2 0\n')
+        await client.send(id=4, clauses=[ [1] ], config={ 'proof_file': '/tmp/x' })
+        await client.send(id=5, clauses=[ [1, 0] ])
+        client.writer.write(b'not json\n')
+        results, _ = await client.results(6)
+        assert results[1]['status'] == 'sat' and satisfies({ abs(n): n > 0 for n in results[1]['model'] }, cnf(sat))
+        assert results[2]['status'] == 'unsat' and results[2]['stats']['conflicts'] > 0
+        assert 'exceeds' in results[3]['error']
+        assert results[4]['error'] == "unknown option 'proof_file'"
+        assert results[5]['status'] == 'error' and results[None]['status'] == 'error'
+        latency = results[1]['latency']
+        assert 0 <= latency['queued'] and 0 < latency['solve'] <= latency['total']
+
+        await client.send(id=7, metrics=True)
+        metrics = await client.receive()
+        assert metrics['requests'] == 6 and metrics['statuses']['error'] == 4
+        assert metrics['latency']['total']['max'] >= metrics['latency']['total']['p50']
+        assert metrics['pending'] == 1 and metrics['idle'] == 2
+        await client.close()
+    run(test, workers=2, path=str(tmp_path / 'sat.sock'))
+    assert not (tmp_path / 'sat.sock').exists()
+
+def test_deadline_and_progress():
+    async def test(service):
+        client = await Client.connect(service)
+        start = time.monotonic()
+        await client.send(id='hard', clauses=pigeonhole(10), deadline=0.5, progress=0.1)
+        results, events = await client.results(1)
+        assert results['hard']['status'] == 'unknown' and results['hard']['reason'] == 'time'
+        assert time.monotonic() - start < 0.5 + GRACE
+        assert events and all(event['event'] == 'progress' for event in events)
+        assert events[-1]['stats']['decisions'] > 0
+        await client.close()
+    # Over TCP this time
+    run(test)
+
+def test_stuck_worker_is_killed(monkeypatch):
+    # A solver that never checks its limits
+    monkeypatch.setattr('service.solve', lambda propagator, config: time.sleep(60))
+    monkeypatch.setattr('service.GRACE', 0.1)
+    async def test(service):
+        client = await Client.connect(service)
+        await client.send(id=1, clauses=[ [1] ], deadline=0.2)
+        results, _ = await client.results(1)
+        assert results[1]['reason'] == 'time' and results[1]['latency']['total'] < 1
+        assert service.pool[0].process.is_alive()
+        await client.close()
+    run(test)
+
+def test_disconnect_cancels():
+    async def test(service):
+        client = await Client.connect(service)
+        await client.send(id=1, clauses=pigeonhole(10), progress=0.05)
+        assert (await client.receive())['event'] == 'progress'
+        first = service.pool[0].process
+        await client.close()
+
+        # The only worker was replaced, and answers the next request
+        client = await Client.connect(service)
+        await client.send(id=2, clauses=[ [1, 2], [-1] ], deadline=5)
+        results, _ = await client.results(1)
+        assert results[2]['model'] == [ -1, 2 ]
+        assert not first.is_alive() and service.pool[0].process is not first
+        assert service.metrics.cancelled == 1
+        await client.close()
+    run(test)
+
+def test_backpressure():
+    async def test(service):
+        client = await Client.connect(service)
+        await client.send(id=1, clauses=pigeonhole(10), deadline=0.5)
+        await client.send(id=2, clauses=[ [1] ])
+        # A worker is free, but the second request is only taken in once the
+        # first is answered
+        first = await client.receive()
+        assert first['id'] == 1 and first['status'] == 'unknown'
+        second = await client.receive()
+        assert second['id'] == 2 and second['latency']['queued'] >= 0.4
+        await client.close()
+    run(test, workers=2, max_pending=1)
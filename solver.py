@@ -1,35 +1,87 @@
-# DO NOT MODIFY THIS FILE
 # This file is set up to be executable as a script, and enable DIMACS
 # format I/O. It calls your DPLL solution in dpll.py.
+#
+# It started out as part of the assignment's stencil, which was not to be
+# modified. It has since gained the flags below for the solver's other modes;
+# without any of them, `python3 solver.py <file.cnf>` reads, solves and prints
+# exactly as the stencil did.
 
 # Run the solver with `python3 solver.py <file.cnf>` (or, if you are on Windows,
 # `python solver.py <file.cnf>`)
 #
 # Display proofs of unsatisfiability by specifying `--proof`, e.g.
 # `python3 solver.py --proof <file.cnf>`
+#
+# Use conflict-driven clause learning instead of plain DPLL with `--learn`, and
+# pick a branching heuristic with `--heuristic` (see heuristics.py) and a
+# restart policy with `--restart` (see restarts.py). Simplify the formula
+# before solving with `--preprocess`.
+#
+# Write a DRAT proof of unsatisfiability to a file while solving with
+# `--proof-file <file>`, which implies `--learn`. Add `--lrat` for an LRAT proof
+# instead, and `--binary-proof` for the binary variant of either format. The
+# proof can be checked with an external checker, e.g. `drat-trim <file.cnf>
+# <proof>`.
+#
+# Run N differently configured solvers in parallel and take the first answer
+# with `--portfolio N` (see portfolio.py), and let them share short learned
+# clauses with `--share`.
+#
+# Split the formula into cubes and solve them with N worker processes with
+# `--cubes N` (see cube.py); `--cube-depth D` sets how many literals each cube
+# can have.
+#
+# Solve each connected component of the formula on its own with `--components
+# N` (see components.py), N at a time in worker processes. With
+# `--propagate-first`, the formula is simplified by unit propagation at level 0
+# before it is split, which can leave more components; they are not split again
+# during the search.
+#
+# Load the input through a binary cache written next to it with `--cache` (see
+# cnfcache.py), so that solving the same file again skips parsing it.
+#
+# Reuse the results of formulas solved before with `--result-cache DIR` (see
+# resultcache.py): results are kept in DIR, keyed by the formula up to the
+# order of its clauses and the numbering of its variables.
+#
+# Print the solver's statistics (see stats.py), including the time spent in each
+# phase of the search, as comment lines with `--stats`.
+#
+# Solve many files in one run with `--batch` (see batch.py): the inputs can then
+# be files, directories, glob patterns and `@manifest` files, solved `--jobs N`
+# at a time with a `--timeout` per file. One JSON line is printed per file as it
+# finishes, and `--proof-dir DIR` writes a proof for every UNSAT file there.
+#
+# Search for a model by local search with `--local-search walksat|probsat` (see
+# localsearch.py), giving up after `--flips N` flips; without a limit it runs
+# until a model is found. With `--portfolio N` (N of at least 2), one of the N
+# solvers runs the local search instead. `--phase-init walksat|probsat` runs a
+# short local search to pick the sign of each decision of the systematic search.
+#
+# To solve many formulas without starting this script for each, run the solver
+# as a service with `python3 service.py --socket PATH` (see service.py).
+#
+# Stop a search early with `--time-limit S`, `--decision-limit N`,
+# `--conflict-limit N` or `--memory-limit MIB` (see limits.py); the answer is
+# then `s UNKNOWN`. The limits apply to each solver of a portfolio, each cube,
+# and each batch file.
 
 import argparse
-from dpll import dpll
+import json
+import sys
+from dpll import solve
+from dimacs import DimacsError, DimacsReader, load
+from config import LOCAL_SEARCH_ALGORITHMS, Config
+from heuristics import HEURISTICS
+from limits import Limits, UNKNOWNResult
+from restarts import RESTARTS
 from typing import Dict
 from defns import *
 
-# Read and parse a cnf file, returning the variable set and clause set
+# Read and parse a cnf file, yielding each clause as a list of ints. The file
+# is streamed (see dimacs.py), so it is never held in memory all at once.
 def read_input(cnf_file: str):
-    with open(cnf_file, 'r') as f:
-        tokens = [int(tok) for line in f.readlines()
-                  if line[0] != 'p' and line[0] != 'c'
-                  for tok in line.strip().split()]
-
-    # Split into clauses delimited by 0
-    # Allow a trailing clause without a terminator
-    i = 0
-    while i < len(tokens):
-        try:
-            n = tokens.index(0, i)
-        except ValueError:
-            n = len(tokens)
-        yield tokens[i:n]
-        i = n + 1
+    yield from DimacsReader(cnf_file)
 
 # Format the result in DIMACS format
 def get_dimacs(assignment: Dict[int, bool]) -> str:
@@ -38,14 +90,183 @@ def get_dimacs(assignment: Dict[int, bool]) -> str:
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('input')
+    parser.add_argument('input', nargs='+')
     parser.add_argument('-p', '--proof', help='display proof tree when UNSAT',
                         action='store_true')
+    parser.add_argument('-l', '--learn', help='use conflict-driven clause learning',
+                        action='store_true')
+    parser.add_argument('--heuristic', help='branching heuristic',
+                        choices=sorted(HEURISTICS), default='first')
+    parser.add_argument('--restart', help='restart policy (with --learn)',
+                        choices=sorted(RESTARTS), default='none')
+    parser.add_argument('--preprocess', help='simplify the formula before solving',
+                        action='store_true')
+    parser.add_argument('--proof-file', help='write a DRAT/LRAT proof to this file',
+                        metavar='FILE')
+    parser.add_argument('--lrat', help='write the proof file in LRAT format',
+                        action='store_true')
+    parser.add_argument('--binary-proof', help='write the proof file in binary',
+                        action='store_true')
+    parser.add_argument('--portfolio', help='run N solvers in parallel', type=int,
+                        metavar='N')
+    parser.add_argument('--share', help='share learned clauses in a portfolio',
+                        action='store_true')
+    parser.add_argument('--cubes', help='solve by cube-and-conquer with N workers',
+                        type=int, metavar='N')
+    parser.add_argument('--cube-depth', help='the most literals in a cube', type=int,
+                        metavar='D')
+    parser.add_argument('--components', help='solve each connected component on its own, '
+                        'with N workers', type=int, metavar='N')
+    parser.add_argument('--propagate-first', help='split components after unit propagation '
+                        'at level 0', action='store_true')
+    parser.add_argument('--cache', help='load the input through a binary cache',
+                        action='store_true')
+    parser.add_argument('--result-cache', help='reuse results of formulas solved before, '
+                        'kept in DIR', metavar='DIR')
+    parser.add_argument('--stats', help='print statistics about the search',
+                        action='store_true')
+    parser.add_argument('--batch', help='solve every file named by the inputs',
+                        action='store_true')
+    parser.add_argument('--jobs', help='files to solve at once in batch mode', type=int,
+                        default=1, metavar='N')
+    parser.add_argument('--timeout', help='seconds per file in batch mode', type=float,
+                        metavar='S')
+    parser.add_argument('--proof-dir', help='write a proof for every UNSAT file here '
+                        '(in batch mode)', metavar='DIR')
+    parser.add_argument('--local-search', help='search for a model by local search',
+                        choices=LOCAL_SEARCH_ALGORITHMS)
+    parser.add_argument('--phase-init', help='pick decision signs by local search first',
+                        choices=LOCAL_SEARCH_ALGORITHMS)
+    parser.add_argument('--flips', help='the most flips local search makes', type=int,
+                        metavar='N')
+    parser.add_argument('--time-limit', help='give up after S seconds', type=float,
+                        metavar='S')
+    parser.add_argument('--decision-limit', help='give up after N decisions', type=int,
+                        metavar='N')
+    parser.add_argument('--conflict-limit', help='give up after N conflicts', type=int,
+                        metavar='N')
+    parser.add_argument('--memory-limit', help='give up above MIB MiB of memory',
+                        type=float, metavar='MIB')
 
     args = parser.parse_args()
-    formula = cnf(read_input(args.input))
-    result = dpll(formula)
-    if result.sat():
+    if args.proof_file is not None and args.preprocess:
+        parser.error('--proof-file cannot be combined with --preprocess')
+    if args.share and args.portfolio is None:
+        parser.error('--share requires --portfolio')
+    if args.share and args.proof_file is not None:
+        parser.error('--share cannot be combined with --proof-file')
+    if args.portfolio is not None and args.portfolio < 1:
+        parser.error('--portfolio needs at least one solver')
+    if args.cubes is not None:
+        if args.cubes < 1:
+            parser.error('--cubes needs at least one worker')
+        if args.portfolio is not None or args.proof_file is not None:
+            parser.error('--cubes cannot be combined with --portfolio or --proof-file')
+    if args.local_search is not None:
+        if args.cubes is not None or args.proof_file is not None or args.proof_dir is not None:
+            parser.error('--local-search cannot be combined with --cubes, --proof-file or '
+                         '--proof-dir')
+        if args.portfolio == 1:
+            # The only solver of a portfolio searches systematically
+            parser.error('--local-search with --portfolio needs at least two solvers')
+    if args.flips is not None and args.local_search is None and args.phase_init is None:
+        parser.error('--flips requires --local-search or --phase-init')
+    if args.components is not None:
+        if args.components < 1:
+            parser.error('--components needs at least one worker')
+        if (args.portfolio is not None or args.cubes is not None or args.proof_file is not None
+                or args.local_search is not None):
+            parser.error('--components cannot be combined with --portfolio, --cubes, '
+                         '--proof-file or --local-search')
+    if args.result_cache is not None and (args.batch or args.portfolio is not None
+                                          or args.cubes is not None
+                                          or args.components is not None):
+        parser.error('--result-cache cannot be combined with --batch, --portfolio, --cubes '
+                     'or --components')
+    if (args.restart != 'none' and not (args.learn or args.proof_file or args.proof_dir)
+            and args.portfolio is None):
+        # A portfolio learns, and its first solver uses this policy
+        parser.error('--restart requires --learn')
+    for flag, limit in (('--time-limit', args.time_limit),
+                        ('--decision-limit', args.decision_limit),
+                        ('--conflict-limit', args.conflict_limit),
+                        ('--memory-limit', args.memory_limit)):
+        if limit is not None and limit <= 0:
+            parser.error(f'{flag} must be positive')
+    if args.propagate_first and args.components is None:
+        parser.error('--propagate-first requires --components')
+    if args.cube_depth is not None and args.cubes is None:
+        parser.error('--cube-depth requires --cubes')
+    if args.batch:
+        if (args.portfolio is not None or args.cubes is not None or args.proof_file is not None
+                or args.components is not None):
+            parser.error('--batch cannot be combined with --portfolio, --cubes, --components '
+                         'or --proof-file')
+        if args.jobs < 1:
+            parser.error('--jobs needs at least one job')
+        if args.proof_dir is not None and args.preprocess:
+            parser.error('--proof-dir cannot be combined with --preprocess')
+    else:
+        if len(args.input) > 1:
+            parser.error('more than one input requires --batch')
+        if args.jobs != 1 or args.timeout is not None or args.proof_dir is not None:
+            parser.error('--jobs, --timeout and --proof-dir require --batch')
+
+    config = Config(learn=args.learn or args.proof_file is not None or args.proof_dir is not None,
+                    heuristic=args.heuristic,
+                    restart=args.restart,
+                    preprocess=args.preprocess,
+                    proof_file=args.proof_file,
+                    proof_format='lrat' if args.lrat else 'drat',
+                    binary_proof=args.binary_proof,
+                    stats=args.stats,
+                    local_search=args.local_search if args.portfolio is None else None,
+                    phase_init=args.phase_init,
+                    flips=args.flips,
+                    limits=Limits(time=args.time_limit, decisions=args.decision_limit,
+                                  conflicts=args.conflict_limit, memory=args.memory_limit))
+    # The other modes are only imported when they are used
+    if args.batch:
+        from batch import expand, solve_files
+        try:
+            files = expand(args.input)
+        except OSError as e:
+            sys.exit(f'error: {e}')
+        for record in solve_files(files, config, args.jobs, args.timeout, args.proof_dir,
+                                  args.cache):
+            print(json.dumps(record), flush=True)
+        sys.exit(0)
+
+    try:
+        if args.cache:
+            from cnfcache import load_cached
+            propagator = load_cached(args.input[0])
+        else:
+            propagator = load(args.input[0])
+    except (DimacsError, OSError) as e:
+        sys.exit(f'error: {e}')
+    if args.portfolio is not None:
+        from portfolio import portfolio
+        result = portfolio(propagator, args.portfolio, config, share=args.share,
+                           local_search=args.local_search)
+    elif args.cubes is not None:
+        from cube import cube_and_conquer
+        result = cube_and_conquer(propagator, args.cubes, config, args.cube_depth)
+    elif args.components is not None:
+        from components import solve_components
+        result = solve_components(propagator, config, args.components,
+                                  args.propagate_first)
+    elif args.result_cache is not None:
+        from resultcache import ResultCache
+        result = ResultCache(directory=args.result_cache, rename=True).solve(propagator, config)
+    else:
+        result = solve(propagator, config)
+    if args.stats and result.stats is not None:
+        print(result.stats.report())
+    if isinstance(result, UNKNOWNResult):
+        print(f'c stopped: {result.reason}')
+        print('s UNKNOWN')
+    elif result.sat():
         print('s SATISFIABLE')
         print(get_dimacs(result.assignments))
     else:
@@ -0,0 +1,83 @@
+# Solver statistics.
+#
+# Every `Propagator` carries a `Stats`, which the search updates as it goes and
+# which ends up on the result (`SATResult.stats` and `UNSATResult.stats`). The
+# counters are
+#
+#   - decisions: literals decided (including assumptions)
+#   - propagations: literals propagated by the watched-literal scheme
+#   - conflicts: clauses found false by propagation
+#   - resolutions: resolution steps taken by conflict analysis
+#   - proof_nodes: proof nodes visited by `remove_assumption`
+#   - learned: clauses learned by CDCL
+#   - restarts, reductions: restarts and learned-clause database reductions
+#   - flips: variables flipped by local search (see `localsearch.py`)
+#
+# Counting costs an integer addition, so it is always on. Timing the phases of
+# the search ('preprocess', 'local_search', 'propagate', 'decide', 'analyze',
+# 'rewrite' and 'reduce') costs two clock reads per step, so it is only done
+# when `timing` is set (see `Config.stats`). With a `progress` callback, the
+# search calls it with the statistics at most every `interval` seconds,
+# checking the clock once per conflict.
+
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Optional
+
+COUNTERS = ('decisions', 'propagations', 'conflicts', 'resolutions', 'proof_nodes',
+            'learned', 'restarts', 'reductions', 'flips')
+
+@dataclass
+class Stats:
+    decisions: int = 0
+    propagations: int = 0
+    conflicts: int = 0
+    resolutions: int = 0
+    proof_nodes: int = 0
+    learned: int = 0
+    restarts: int = 0
+    reductions: int = 0
+    flips: int = 0
+    # Seconds spent in each phase, if `timing`
+    times: Dict[str, float] = field(default_factory=dict)
+
+    timing: bool = False
+    progress: Optional[Callable[['Stats'], None]] = field(default=None, repr=False,
+                                                          compare=False)
+    interval: float = 1.0
+    _next_progress: float = field(default=0.0, repr=False, compare=False)
+
+    # Add the time since `start` (a `time.perf_counter()`) to a phase
+    def time(self, phase: str, start: float) -> None:
+        self.times[phase] = self.times.get(phase, 0.0) + time.perf_counter() - start
+
+    # Report progress if it is time to (only called when `progress` is set)
+    def tick(self) -> None:
+        now = time.perf_counter()
+        if now >= self._next_progress:
+            self._next_progress = now + self.interval
+            self.progress(self)
+
+    # Add another solver's counts and times to these
+    def add(self, other: 'Stats') -> None:
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for phase, seconds in other.times.items():
+            self.times[phase] = self.times.get(phase, 0.0) + seconds
+
+    # A copy that later solving does not change
+    def snapshot(self) -> 'Stats':
+        return replace(self, times=dict(self.times))
+
+    # The statistics as DIMACS comment lines
+    def report(self) -> str:
+        lines = [ f'c {name:<14} {getattr(self, name)}' for name in COUNTERS ]
+        lines += [ f'c time {phase:<12} {seconds:.3f}s'
+                   for phase, seconds in sorted(self.times.items()) ]
+        return '\n'.join(lines)
+
+    # The callback is not sent to other processes (see `portfolio.py`)
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state['progress'] = None
+        return state
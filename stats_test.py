@@ -0,0 +1,68 @@
+import pickle
+from config import Config
+from cube import cube_and_conquer
+from defns import *
+from dpll import dpll, resolve
+from generators import pigeonhole
+from incremental import Solver
+from portfolio import portfolio
+from propagation import Propagator
+from stats import COUNTERS, Stats
+
+def test_dpll_counts():
+    result = dpll(cnf(pigeonhole(3)))
+    stats = result.stats
+    assert stats.decisions > 0 and stats.propagations > 0 and stats.conflicts > 0
+    # Plain DPLL rewrites proofs instead of learning
+    assert stats.proof_nodes > 0
+    assert stats.learned == stats.resolutions == 0
+    assert stats.times == {}
+
+def test_cdcl_counts():
+    result = dpll(cnf(pigeonhole(4)), Config(learn=True, restart='luby'))
+    stats = result.stats
+    assert stats.learned > 0 and stats.resolutions >= stats.learned
+    assert stats.conflicts == stats.learned + 1
+    assert stats.proof_nodes == 0
+
+def test_timing():
+    stats = dpll(cnf(pigeonhole(4)), Config(learn=True, stats=True, preprocess=True)).stats
+    assert { 'preprocess', 'propagate', 'decide', 'analyze' } <= set(stats.times)
+    assert all(seconds >= 0 for seconds in stats.times.values())
+    assert 'c time analyze' in stats.report()
+
+def test_stats_do_not_affect_equality():
+    assert dpll(cnf([ [1] ])) == SATResult({ 1: True })
+
+def test_progress():
+    reports = []
+    config = Config(learn=True, progress=lambda stats: reports.append(stats.conflicts),
+                    progress_interval=0)
+    dpll(cnf(pigeonhole(4)), config)
+    assert len(reports) > 1 and reports == sorted(reports)
+
+def test_add_and_pickle():
+    stats = Stats(decisions=2, times={ 'decide': 1.0 }, progress=print)
+    other = pickle.loads(pickle.dumps(stats))
+    assert other.progress is None and other.decisions == 2
+    stats.add(other)
+    assert stats.decisions == 4 and stats.times == { 'decide': 2.0 }
+    assert [ line.split()[1] for line in stats.report().splitlines()[:len(COUNTERS)] ] == list(COUNTERS)
+
+def test_parallel():
+    formula = cnf(pigeonhole(4))
+    assert portfolio(Propagator(formula), 2).stats.conflicts > 0
+    # Splitting and every cube count
+    stats = cube_and_conquer(Propagator(formula), 1, depth=2).stats
+    alone = dpll(formula).stats
+    assert stats.decisions > alone.decisions
+
+def test_incremental():
+    solver = Solver(cnf([ [1, 2], [-1, 3] ]))
+    first_call = solver.solve([ Literal(3, False) ]).stats
+    second_call = solver.solve([ Literal(1, True) ]).stats
+    assert second_call.decisions > first_call.decisions
+
+def test_resolve_is_quiet(capsys):
+    resolve(Axiom([ Literal(1, True) ]), Axiom([ Literal(1, False) ]))
+    assert capsys.readouterr().out == ''